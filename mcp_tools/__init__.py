@@ -22,6 +22,7 @@ from .video_processing.set_video_bitrate import set_video_bitrate
 from .video_processing.set_video_frame_rate import set_video_frame_rate
 from .video_processing.correct_colors import correct_colors
 from .video_processing.stabilize_video import stabilize_video
+from .video_processing.batch import batch_convert_video_format, batch_set_video_bitrate, batch_set_video_codec, batch_set_video_frame_rate
 
 from .editing.trim_video import trim_video
 from .editing.create_video_from_images import create_video_from_images
@@ -38,7 +39,7 @@ from .overlays.add_image_overlay import add_image_overlay
 # New video effects
 from .video_effects.apply_video_filters import apply_video_filters
 from .video_effects.advanced_transitions import apply_advanced_transitions
-from .video_effects.motion_graphics import create_motion_graphics
+from .video_effects.motion_graphics import create_motion_graphics, create_motion_graphics_stack
 from .video_effects.chroma_key import apply_chroma_key, create_virtual_background, advanced_chroma_key_with_lighting
 from .video_effects.video_morphing import apply_video_morphing, create_shape_morph
 
@@ -51,7 +52,7 @@ from .audio_effects.spatial_audio import create_spatial_audio, create_3d_audio_s
 
 # Phase 2A: Video manipulation
 from .video_manipulation.rotate_flip_video import rotate_video, flip_mirror_video, rotate_and_flip_video, auto_rotate_video
-from .video_manipulation.picture_in_picture import create_picture_in_picture, create_multi_pip, create_animated_pip
+from .video_manipulation.picture_in_picture import create_picture_in_picture, create_multi_pip, create_animated_pip, create_chained_pip, create_pip_batch
 
 # Phase 2A: Frame manipulation
 from .frame_manipulation.extract_frames import extract_frames, extract_frame_at_time, extract_frames_batch, extract_frame_sequence
@@ -103,6 +104,10 @@ ALL_TOOLS = [
     set_video_codec,
     set_video_bitrate,
     set_video_frame_rate,
+    batch_convert_video_format,
+    batch_set_video_bitrate,
+    batch_set_video_codec,
+    batch_set_video_frame_rate,
     correct_colors,
     stabilize_video,
     trim_video,
@@ -119,6 +124,7 @@ ALL_TOOLS = [
     apply_video_filters,
     apply_advanced_transitions,
     create_motion_graphics,
+    create_motion_graphics_stack,
     apply_chroma_key,
     create_virtual_background,
     advanced_chroma_key_with_lighting,
@@ -148,6 +154,8 @@ ALL_TOOLS = [
     create_picture_in_picture,
     create_multi_pip,
     create_animated_pip,
+    create_chained_pip,
+    create_pip_batch,
     # Phase 2A: Frame manipulation
     extract_frames,
     extract_frame_at_time,
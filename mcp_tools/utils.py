@@ -5,15 +5,57 @@ import re
 import tempfile
 import shutil
 import subprocess
+import functools
+import contextlib
+import contextvars
+
+# Encoder/filter threads per ffmpeg run. ffmpeg's throughput levels off and then drops
+# past about 10 threads, so by default a run gets at most that many, leaving the rest of
+# a large machine to concurrent jobs; MCP_FFMPEG_THREADS overrides the default
+_CPU_COUNT = os.cpu_count() or 4
+_FFMPEG_THREADS = int(os.environ.get('MCP_FFMPEG_THREADS') or min(10, _CPU_COUNT))
+_ffmpeg_threads_limit = contextvars.ContextVar('_ffmpeg_threads_limit', default=None)
+
+@contextlib.contextmanager
+def _limit_ffmpeg_threads(threads: int):
+    """Caps the thread counts of _thread_kwargs within this context (e.g. one batch job's share)."""
+    token = _ffmpeg_threads_limit.set(threads)
+    try:
+        yield
+    finally:
+        _ffmpeg_threads_limit.reset(token)
+
+def _batch_threads(workers: int) -> int:
+    """Threads for each of `workers` ffmpeg runs sharing the CPU, at most _FFMPEG_THREADS."""
+    return max(1, min(_FFMPEG_THREADS, _CPU_COUNT // workers))
+
+def _thread_kwargs(vcodec: str = None) -> dict:
+    """Output kwargs that set ffmpeg's encoder and filter thread counts explicitly.
+
+    libx264 is kept on frame threading, which scales better than slice threading.
+    """
+    threads = _ffmpeg_threads_limit.get() or _FFMPEG_THREADS
+    kwargs = {'threads': threads, 'filter_threads': threads, 'filter_complex_threads': threads}
+    if vcodec == 'libx264':
+        kwargs['x264-params'] = 'sliced-threads=0'
+    return kwargs
+
+def _mux_kwargs(output_path: str) -> dict:
+    """Muxer kwargs for a final output: index up front for MP4/MOV, so playback can start while it downloads."""
+    if os.path.splitext(output_path)[1].lower() in ('.mp4', '.m4v', '.mov'):
+        return {'movflags': '+faststart'}
+    return {}
 
 def _run_ffmpeg_with_fallback(input_path: str, output_path: str, primary_kwargs: dict, fallback_kwargs: dict) -> str:
     """Helper to run ffmpeg command with primary kwargs, falling back to other kwargs on ffmpeg.Error."""
+    primary_kwargs = {**_thread_kwargs(primary_kwargs.get('vcodec')), **_mux_kwargs(output_path), **primary_kwargs}
+    fallback_kwargs = {**_thread_kwargs(fallback_kwargs.get('vcodec')), **_mux_kwargs(output_path), **fallback_kwargs}
     try:
-        ffmpeg.input(input_path).output(output_path, **primary_kwargs).run(capture_stdout=True, capture_stderr=True)
+        ffmpeg.input(input_path).output(output_path, **primary_kwargs).run(capture_stderr=True, overwrite_output=True)
         return f"Operation successful (primary method) and saved to {output_path}"
     except ffmpeg.Error as e_primary:
         try:
-            ffmpeg.input(input_path).output(output_path, **fallback_kwargs).run(capture_stdout=True, capture_stderr=True)
+            ffmpeg.input(input_path).output(output_path, **fallback_kwargs).run(capture_stderr=True, overwrite_output=True)
             return f"Operation successful (fallback method) and saved to {output_path}"
         except ffmpeg.Error as e_fallback:
             err_primary_msg = e_primary.stderr.decode('utf8') if e_primary.stderr else str(e_primary)
@@ -24,6 +66,293 @@ def _run_ffmpeg_with_fallback(input_path: str, output_path: str, primary_kwargs:
     except Exception as e:
         return f"An unexpected error occurred: {str(e)}"
 
+# Hardware H.264 encoders in order of preference
+_HW_H264_ENCODERS = ('h264_nvenc', 'h264_qsv', 'h264_videotoolbox', 'h264_amf')
+
+_capability_probes = []
+
+def _capability_probe(probe):
+    """Caches a no-argument ffmpeg capability probe for the life of the process.
+    
+    Each probe spawns ffmpeg, which costs a few hundred milliseconds on some
+    platforms; _invalidate_probes() forgets every cached answer.
+    """
+    cached = functools.lru_cache(maxsize=None)(probe)
+    _capability_probes.append(cached)
+    return cached
+
+def _invalidate_probes():
+    """Clears the cached capability probes, e.g. after swapping the ffmpeg on PATH or in tests."""
+    for probe in _capability_probes:
+        probe.cache_clear()
+
+@_capability_probe
+def _available_encoders() -> frozenset:
+    """Returns the encoder names compiled into the local ffmpeg (probed once per process)."""
+    try:
+        listing = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'],
+                                 capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return frozenset()
+    names = set()
+    for line in listing.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and len(parts[0]) == 6 and parts[1] != '=':
+            names.add(parts[1])
+    return frozenset(names)
+
+@_capability_probe
+def _available_filters() -> frozenset:
+    """Returns the filter names compiled into the local ffmpeg (probed once per process)."""
+    try:
+        listing = subprocess.run(['ffmpeg', '-hide_banner', '-filters'],
+                                 capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return frozenset()
+    names = set()
+    for line in listing.splitlines():
+        parts = line.split()
+        if len(parts) >= 3 and len(parts[0]) == 3 and '->' in parts[2]:
+            names.add(parts[1])
+    return frozenset(names)
+
+def _pick_encoder() -> str:
+    """Returns the preferred H.264 encoder: a hardware one if ffmpeg has it, else libx264."""
+    encoders = _available_encoders()
+    return next((enc for enc in _HW_H264_ENCODERS if enc in encoders), 'libx264')
+
+# VAAPI render node used for Intel/AMD GPU filtering and encoding on Linux
+_VAAPI_DEVICE = '/dev/dri/renderD128'
+
+def _vaapi_device(*filters: str):
+    """Returns the VAAPI render node if ffmpeg has h264_vaapi and the given VAAPI filters
+    and the node exists, else None. Whether the GPU can decode a given input is only
+    known once ffmpeg runs, so callers still need a software fallback.
+    """
+    if 'h264_vaapi' not in _available_encoders() or not set(filters) <= _available_filters():
+        return None
+    return _VAAPI_DEVICE if os.path.exists(_VAAPI_DEVICE) else None
+
+def _run_with_encoder_fallback(run_with_encoder):
+    """Calls run_with_encoder(vcodec) with _pick_encoder(), retrying with libx264 on ffmpeg.Error.
+
+    An encoder can be compiled in without usable hardware behind it, so a
+    hardware failure falls back to software instead of failing the tool.
+    """
+    encoder = _pick_encoder()
+    if encoder != 'libx264':
+        try:
+            return run_with_encoder(encoder)
+        except ffmpeg.Error:
+            pass
+    return run_with_encoder('libx264')
+
+def _audio_copy_args(probe: dict, output_path: str) -> dict:
+    """Output audio kwargs for a filtered re-encode: {'acodec': 'copy'} when output_path's
+    container takes the probed audio codec (or there is no audio), else {} so ffmpeg uses
+    the container's default codec. Deciding up front saves retrying after a failed copy.
+    """
+    audio_stream_info = next((s for s in probe['streams'] if s['codec_type'] == 'audio'), None)
+    copyable = _COPYABLE_AUDIO.get(os.path.splitext(output_path)[1].lower(), frozenset())
+    if audio_stream_info is None or audio_stream_info.get('codec_name') in copyable:
+        return {'acodec': 'copy'}
+    return {}
+
+# Containers that can hold H.264; others (webm, ogv, ...) keep ffmpeg's default codec
+_H264_CONTAINERS = frozenset({'.mp4', '.m4v', '.mov', '.mkv', '.avi', '.ts', '.flv'})
+
+def _run_with_h264_output(output_path: str, run_with_args):
+    """Calls run_with_args(codec_args) with the preferred H.264 encoder for output_path.
+
+    codec_args holds {'vcodec': encoder} (see _run_with_encoder_fallback) when the
+    output container holds H.264, else no codec so ffmpeg picks the container's one,
+    plus the thread settings of _thread_kwargs.
+    """
+    if os.path.splitext(output_path)[1].lower() not in _H264_CONTAINERS:
+        return run_with_args(_thread_kwargs())
+    return _run_with_encoder_fallback(lambda vcodec: run_with_args({'vcodec': vcodec, **_thread_kwargs(vcodec)}))
+
+# Audio codecs each output container takes as-is, so untouched source audio can be stream-copied
+_COPYABLE_AUDIO = {
+    '.mp4': frozenset({'aac', 'mp3'}),
+    '.m4v': frozenset({'aac', 'mp3'}),
+    '.mov': frozenset({'aac', 'mp3'}),
+    '.mkv': frozenset({'aac', 'mp3', 'opus', 'vorbis', 'flac', 'ac3'})
+}
+
+# Fastest reasonable settings per encoder, for intermediate and offline renders
+_FAST_ENCODE_OPTIONS = {
+    'h264_nvenc': {'preset': 'p1', 'tune': 'll', 'rc': 'vbr'},
+    'h264_qsv': {'preset': 'veryfast'},
+    'h264_videotoolbox': {'realtime': 1},
+    'h264_amf': {'quality': 'speed'},
+    'libx264': {'preset': 'ultrafast', 'tune': 'fastdecode', 'x264opts': 'no-scenecut'},
+}
+
+# NVENC preset (p1 fastest .. p7 best) closest to each libx264 preset
+_NVENC_PRESETS = {'ultrafast': 'p1', 'superfast': 'p1', 'veryfast': 'p2', 'faster': 'p3', 'fast': 'p3',
+                  'medium': 'p4', 'slow': 'p6', 'slower': 'p6', 'veryslow': 'p7'}
+
+def _encoder_kwargs(vcodec: str, x264_preset: str, crf: int, x264_tune: str = None) -> dict:
+    """Rate control and speed kwargs for vcodec matching libx264's x264_preset at crf.
+
+    NVENC gets the nearest preset with constant quality crf; other encoders get {} and
+    keep their defaults, having no equivalent knobs. x264_tune only applies to libx264.
+    """
+    if vcodec == 'libx264':
+        return {'preset': x264_preset, 'crf': crf, **({'tune': x264_tune} if x264_tune else {})}
+    if vcodec == 'h264_nvenc':
+        return {'preset': _NVENC_PRESETS[x264_preset], 'rc': 'vbr', 'cq': crf}
+    return {}
+
+# Encoder settings for the quality_profile option of the geometry and color tools, as
+# libx264 (preset, crf, tune); _encoder_kwargs carries them over to other encoders
+_QUALITY_PROFILES = {
+    'archive': ('slow', 18, None),
+    'balanced': ('medium', 23, None),
+    'fast': ('veryfast', 24, None),
+    'preview': ('ultrafast', 28, 'fastdecode'),
+}
+
+def _quality_kwargs(vcodec: str, quality_profile: str) -> dict:
+    """Output kwargs of a _QUALITY_PROFILES entry for vcodec (see _encoder_kwargs)."""
+    return _encoder_kwargs(vcodec, *_QUALITY_PROFILES[quality_profile])
+
+def _invalid_quality_profile(quality_profile: str):
+    """Returns a tool error message for an unknown quality_profile, else None."""
+    if quality_profile not in _QUALITY_PROFILES:
+        return f"Error: Invalid quality_profile '{quality_profile}'. Must be one of: {', '.join(_QUALITY_PROFILES)}"
+    return None
+
+# Encoder settings that keep libx264's frame lookahead small
+_LOW_MEMORY_X264 = {
+    'preset': 'superfast',
+    'tune': 'zerolatency',
+    'x264-params': 'rc-lookahead=10:ref=1:bframes=0'
+}
+
+# libx264 settings for fast preview/draft renders where quality is secondary
+_DRAFT_X264 = {'preset': 'ultrafast', 'crf': 28, 'tune': 'fastdecode'}
+
+@contextlib.contextmanager
+def _draft_cpu_affinity(enabled: bool = True):
+    """Pins the calling thread, and the ffmpeg it spawns, to half of its CPUs for draft renders.
+
+    Keeping ffmpeg's slice threads on fewer cores reduces cross-socket cache
+    traffic. Only effective on Linux, where sched_setaffinity(0) applies to the
+    calling thread alone (other threads are unaffected) and is inherited by child
+    processes; the previous affinity is restored on exit.
+    """
+    if not enabled or not hasattr(os, 'sched_setaffinity'):
+        yield
+        return
+    previous = os.sched_getaffinity(0)
+    cpus = sorted(previous)
+    os.sched_setaffinity(0, set(cpus[:max(1, len(cpus) // 2)]))
+    try:
+        yield
+    finally:
+        os.sched_setaffinity(0, previous)
+
+def _run_ffmpeg_piped(output, bufsize: int = 1 << 20) -> tuple:
+    """Runs a compiled ffmpeg-python output with large stdout/stderr pipe buffers.
+
+    ffmpeg can stall writing its log to a small pipe on long encodes, so the
+    process is launched directly with a 1 MB buffer instead of `output.run()`.
+    `output` may also be a complete ffmpeg argument list. Raises ffmpeg.Error on
+    a non-zero exit so callers keep their error handling.
+    """
+    args = output if isinstance(output, list) else output.compile(overwrite_output=True)
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=bufsize)
+    out, err = proc.communicate()
+    if proc.returncode:
+        raise ffmpeg.Error('ffmpeg', out, err)
+    return out, err
+
+def _run_ffmpeg_cmd(cmd: list[str]) -> None:
+    """Run an ffmpeg command line, raising ffmpeg.Error on failure like ffmpeg-python does."""
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode:
+        raise ffmpeg.Error('ffmpeg', result.stdout, result.stderr)
+
+def _run_ffmpeg_pipelined(filter_output, output_path: str, bufsize: int = 4 << 20, **encode_kwargs) -> None:
+    """Runs decode+filter and encode as two ffmpeg processes joined by a pipe.
+
+    `filter_output` must be an ffmpeg-python output writing NUT to 'pipe:1'
+    (typically rawvideo). A second process reads it from stdin and encodes to
+    `output_path` with `encode_kwargs`, so heavy filtering and encoding overlap
+    instead of competing inside one process. Raises ffmpeg.Error if either
+    stage fails.
+    """
+    encoder = ffmpeg.input('pipe:0', format='nut').output(output_path, **encode_kwargs)
+    with tempfile.TemporaryFile() as filter_log:
+        filter_proc = subprocess.Popen(filter_output.compile(overwrite_output=True),
+                                       stdout=subprocess.PIPE, stderr=filter_log, bufsize=bufsize)
+        encode_proc = subprocess.Popen(encoder.compile(overwrite_output=True),
+                                       stdin=filter_proc.stdout, stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE, bufsize=bufsize)
+        filter_proc.stdout.close()  # encoder owns the read end now
+        out, err = encode_proc.communicate()
+        filter_proc.wait()
+        # A failing encoder kills the filter stage with a broken pipe, so its log comes
+        # first and the filter's is only added when that stage failed too
+        failures = [err] if encode_proc.returncode else []
+        if filter_proc.returncode:
+            filter_log.seek(0)
+            failures.append(filter_log.read())
+        if failures:
+            raise ffmpeg.Error('ffmpeg', out, b'\n'.join(failures))
+
+def _cached_temp_png(name: str, render) -> str:
+    """Path of the PNG `name` in the temp dir, calling render(path) to create it if missing.
+
+    render writes to a unique temp file that is then moved onto the final name, so
+    concurrent callers and later runs never see a half-written image. Exceptions
+    from render propagate after the temp file is removed.
+    """
+    path = os.path.join(tempfile.gettempdir(), name)
+    if os.path.exists(path):
+        return path
+    fd, partial = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.png')
+    os.close(fd)
+    try:
+        render(partial)
+        os.replace(partial, path)
+    except BaseException:
+        os.unlink(partial)
+        raise
+    return path
+
+def _validate_input(path: str) -> str:
+    """Error message if the input file at path is missing or empty, else None.
+
+    A single stat() answers both, where os.path.exists plus a later size check
+    would cost two round trips on a network filesystem.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return f"Error: Input video file not found at {path}"
+    if stat.st_size == 0:
+        return f"Error: Input video file is empty: {path}"
+    return None
+
+def _cached_probe(path: str, stat: os.stat_result = None) -> dict:
+    """ffmpeg.probe(path), cached per file version (path, mtime, size).
+
+    Tools run back to back on one clip pay for the ffprobe subprocess once, while a
+    rewritten file gets a new mtime/size and is probed again. A caller that already
+    stat()ed the file passes the result as `stat` to skip a second stat call. The
+    returned dict is shared between callers and must not be modified.
+    """
+    if stat is None:
+        stat = os.stat(path)
+    return _probe_file_version(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+@functools.lru_cache(maxsize=256)
+def _probe_file_version(path: str, mtime_ns: int, size: int) -> dict:
+    return ffmpeg.probe(path)
+
 def _parse_time_to_seconds(time_str: str) -> float:
     """Converts HH:MM:SS.mmm or seconds string to float seconds."""
     if isinstance(time_str, (int, float)):
@@ -41,7 +370,7 @@ def _parse_time_to_seconds(time_str: str) -> float:
 def _get_media_properties(media_path: str) -> dict:
     """Probes media file and returns key properties."""
     try:
-        probe = ffmpeg.probe(media_path)
+        probe = _cached_probe(media_path)
         video_stream_info = next((s for s in probe['streams'] if s['codec_type'] == 'video'), None)
         audio_stream_info = next((s for s in probe['streams'] if s['codec_type'] == 'audio'), None)
         
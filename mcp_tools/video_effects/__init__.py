@@ -1,6 +1,6 @@
 from .apply_video_filters import apply_video_filters
 from .advanced_transitions import apply_advanced_transitions
-from .motion_graphics import create_motion_graphics
+from .motion_graphics import create_motion_graphics, create_motion_graphics_stack
 from .chroma_key import apply_chroma_key, create_virtual_background, advanced_chroma_key_with_lighting
 from .video_morphing import apply_video_morphing, create_shape_morph
 
@@ -8,6 +8,7 @@ __all__ = [
     "apply_video_filters",
     "apply_advanced_transitions", 
     "create_motion_graphics",
+    "create_motion_graphics_stack",
     "apply_chroma_key",
     "create_virtual_background",
     "advanced_chroma_key_with_lighting",
@@ -1,11 +1,14 @@
 import ffmpeg
 import os
+from ..utils import (_run_ffmpeg_piped, _run_ffmpeg_pipelined, _run_with_encoder_fallback,
+                     _get_media_properties, _draft_cpu_affinity, _DRAFT_X264, _LOW_MEMORY_X264)
 
 def apply_chroma_key(foreground_video_path: str, background_video_path: str, 
                     output_video_path: str, key_color: str = "green",
                     similarity: float = 0.3, blend: float = 0.1,
                     spill_removal: bool = True, edge_softening: bool = True,
-                    custom_params: dict = None) -> str:
+                    custom_params: dict = None, low_memory: bool = False,
+                    pipelined: bool = False, draft: bool = False) -> str:
     """Applies chroma key (green screen) effect to replace a specific color with background video.
     
     Args:
@@ -15,9 +18,19 @@ def apply_chroma_key(foreground_video_path: str, background_video_path: str,
         key_color: Color to key out ('green', 'blue', 'red', or hex value like '#00FF00')
         similarity: How similar colors will be keyed (0.0 to 1.0, higher = more aggressive)
         blend: Blending amount for smooth edges (0.0 to 1.0)
-        spill_removal: Whether to remove color spill from the key color
+        spill_removal: Whether to remove color spill from the key color (green or blue
+            keys only; ffmpeg's despill has no other modes)
         edge_softening: Whether to apply edge softening for smoother compositing
-        custom_params: Optional dictionary for advanced chroma key parameters
+        custom_params: Optional dictionary for advanced chroma key parameters.
+            'spill' (dict) overrides the despill options (default mix 0.7, expand 0.0).
+            'legacy_softening' (bool) restores the alphaextract/gblur/alphamerge edge path.
+        low_memory: Use a low-latency x264 configuration (superfast preset, zerolatency
+            tune, short lookahead, no B-frames). Cuts encoder memory by roughly two thirds
+            at the cost of a few percent compression efficiency.
+        pipelined: Run keying/compositing and encoding as two ffmpeg processes connected
+            by a pipe, so the heavy filter stage does not starve the encoder.
+        draft: Fast preview render (libx264 ultrafast, CRF 28, fastdecode tune) with
+            ffmpeg pinned to half of the CPUs on Linux.
     
     Returns:
         A status message indicating success or failure.
@@ -54,9 +67,6 @@ def apply_chroma_key(foreground_video_path: str, background_video_path: str,
         foreground = ffmpeg.input(foreground_video_path)
         background = ffmpeg.input(background_video_path)
         
-        # Build filter chain
-        filter_chain = []
-        
         # Step 1: Basic chroma key
         fg_stream = foreground.video
         
@@ -73,31 +83,50 @@ def apply_chroma_key(foreground_video_path: str, background_video_path: str,
         fg_keyed = fg_stream.filter('chromakey', **chromakey_params)
         
         # Step 2: Spill removal (remove color contamination)
-        if spill_removal:
+        # despill only handles green and blue screens
+        despill_type = _despill_type(chroma_color)
+        if spill_removal and despill_type:
             spill_params = custom_params.get('spill', {
-                'spillmix': 0.7,
-                'spillexpand': 0.0
+                'mix': 0.7,
+                'expand': 0.0
             })
-            fg_keyed = fg_keyed.filter('despill', color=chroma_color, **spill_params)
+            fg_keyed = fg_keyed.filter('despill', type=despill_type, **spill_params)
         
         # Step 3: Edge enhancement and softening
         if edge_softening:
             # Apply slight blur to alpha channel for smoother edges
-            fg_keyed = fg_keyed.filter('alphaextract').filter('gblur', sigma=1.0).filter('alphamerge', fg_keyed)
+            if custom_params.get('legacy_softening', False):
+                keyed = fg_keyed.filter_multi_output('split')
+                alpha = keyed.stream(1).filter('alphaextract').filter('gblur', sigma=1.0)
+                fg_keyed = ffmpeg.filter([keyed.stream(0), alpha], 'alphamerge')
+            else:
+                # Blur only the alpha plane in place (planes=8) instead of extract/blur/merge
+                fg_keyed = fg_keyed.filter('gblur', sigma=1.0, planes=8)
         
         # Step 4: Background preparation
         bg_stream = background.video
         
-        # Scale background to match foreground if needed
-        bg_scaled = bg_stream.filter('scale', 
-                                   width='iw', 
-                                   height='ih',
-                                   force_original_aspect_ratio='decrease').filter(
-                                   'pad', 
-                                   width='iw',
-                                   height='ih',
-                                   x='(ow-iw)/2',
-                                   y='(oh-ih)/2')
+        # Scale background to match foreground only if needed
+        fg_props = _get_media_properties(foreground_video_path)
+        bg_props = _get_media_properties(background_video_path)
+        fg_size = (fg_props['width'], fg_props['height'])
+        bg_size = (bg_props['width'], bg_props['height'])
+
+        if fg_size == bg_size:
+            bg_scaled = bg_stream
+        elif fg_size[0] * bg_size[1] == fg_size[1] * bg_size[0]:
+            # Same aspect ratio: a plain scale lands exactly on the foreground size
+            bg_scaled = bg_stream.filter('scale', width=fg_size[0], height=fg_size[1])
+        else:
+            bg_scaled = bg_stream.filter('scale',
+                                       width=fg_size[0],
+                                       height=fg_size[1],
+                                       force_original_aspect_ratio='decrease').filter(
+                                       'pad',
+                                       width=fg_size[0],
+                                       height=fg_size[1],
+                                       x='(ow-iw)/2',
+                                       y='(oh-ih)/2')
         
         # Step 5: Composite foreground over background
         composited = bg_scaled.overlay(fg_keyed, x=0, y=0)
@@ -110,17 +139,28 @@ def apply_chroma_key(foreground_video_path: str, background_video_path: str,
                                          gs=custom_params.get('green_shadows', 0), 
                                          bs=custom_params.get('blue_shadows', 0))
         
-        # Output with audio from foreground
-        output = ffmpeg.output(
-            composited,
-            foreground.audio,
-            output_video_path,
-            vcodec='libx264',
-            pix_fmt='yuv420p',
-            acodec='copy'
-        )
+        def run(vcodec):
+            encode_kwargs = {'vcodec': vcodec, 'pix_fmt': 'yuv420p', 'acodec': 'copy'}
+            if low_memory and vcodec == 'libx264':
+                encode_kwargs.update(_LOW_MEMORY_X264)
+            if draft and vcodec == 'libx264':
+                encode_kwargs.update(_DRAFT_X264)
+            
+            # Output with audio from foreground, when it has any
+            streams = [composited, foreground.audio] if fg_props['has_audio'] else [composited]
+            if pipelined:
+                output = ffmpeg.output(*streams, 'pipe:1',
+                                       format='nut', vcodec='rawvideo', acodec='copy')
+            else:
+                output = ffmpeg.output(*streams, output_video_path, **encode_kwargs)
+            
+            if pipelined:
+                _run_ffmpeg_pipelined(output, output_video_path, **encode_kwargs)
+            else:
+                _run_ffmpeg_piped(output)
         
-        output.run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+        with _draft_cpu_affinity(draft):
+            _run_with_encoder_fallback(run)
         
         return f"Chroma key applied successfully. Key color: {key_color}, Similarity: {similarity}, Blend: {blend}. Output saved to {output_video_path}"
         
@@ -133,7 +173,8 @@ def apply_chroma_key(foreground_video_path: str, background_video_path: str,
 
 def create_virtual_background(foreground_video_path: str, background_image_path: str,
                             output_video_path: str, effect_type: str = "blur",
-                            key_color: str = "green", intensity: float = 1.0) -> str:
+                            key_color: str = "green", intensity: float = 1.0,
+                            draft: bool = False) -> str:
     """Creates virtual background effects with various styles.
     
     Args:
@@ -143,6 +184,8 @@ def create_virtual_background(foreground_video_path: str, background_image_path:
         effect_type: Background effect type ('blur', 'replace', 'color_shift', 'artistic')
         key_color: Color to key out if using chroma key
         intensity: Effect intensity (0.0 to 2.0)
+        draft: Fast preview render (libx264 ultrafast, CRF 28, fastdecode tune) with
+            ffmpeg pinned to half of the CPUs on Linux.
     
     Returns:
         A status message indicating success or failure.
@@ -182,15 +225,19 @@ def create_virtual_background(foreground_video_path: str, background_image_path:
             # Simple overlay without keying
             composited = bg_stream.overlay(fg_stream)
         
-        output = ffmpeg.output(
-            composited,
-            foreground.audio,
-            output_video_path,
-            vcodec='libx264',
-            acodec='copy'
-        )
+        def run(vcodec):
+            output = ffmpeg.output(
+                composited,
+                foreground.audio,
+                output_video_path,
+                vcodec=vcodec,
+                acodec='copy',
+                **(_DRAFT_X264 if draft and vcodec == 'libx264' else {})
+            )
+            _run_ffmpeg_piped(output)
         
-        output.run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+        with _draft_cpu_affinity(draft):
+            _run_with_encoder_fallback(run)
         
         return f"Virtual background created successfully with {effect_type} effect. Output saved to {output_video_path}"
         
@@ -204,7 +251,8 @@ def create_virtual_background(foreground_video_path: str, background_image_path:
 def advanced_chroma_key_with_lighting(foreground_video_path: str, background_video_path: str,
                                     output_video_path: str, key_color: str = "green",
                                     auto_lighting: bool = True, shadow_opacity: float = 0.3,
-                                    highlight_threshold: float = 0.8) -> str:
+                                    highlight_threshold: float = 0.8, low_memory: bool = False,
+                                    draft: bool = False) -> str:
     """Advanced chroma key with automatic lighting adjustment and shadow preservation.
     
     Args:
@@ -215,6 +263,11 @@ def advanced_chroma_key_with_lighting(foreground_video_path: str, background_vid
         auto_lighting: Whether to automatically adjust lighting to match background
         shadow_opacity: Opacity of preserved shadows (0.0 to 1.0)
         highlight_threshold: Threshold for highlight detection (0.0 to 1.0)
+        low_memory: Use a low-latency x264 configuration (superfast preset, zerolatency
+            tune, short lookahead, no B-frames). Cuts encoder memory by roughly two thirds
+            at the cost of a few percent compression efficiency.
+        draft: Fast preview render (libx264 ultrafast, CRF 28, fastdecode tune) with
+            ffmpeg pinned to half of the CPUs on Linux.
     
     Returns:
         A status message indicating success or failure.
@@ -254,16 +307,22 @@ def advanced_chroma_key_with_lighting(foreground_video_path: str, background_vid
         # Final composite with shadow preservation
         composited = bg_stream.overlay(shadow_mask, x=0, y=0, format='auto').overlay(fg_keyed, x=0, y=0)
         
-        output = ffmpeg.output(
-            composited,
-            foreground.audio,
-            output_video_path,
-            vcodec='libx264',
-            pix_fmt='yuv420p',
-            acodec='copy'
-        )
-        
-        output.run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+        def run(vcodec):
+            encode_kwargs = {'vcodec': vcodec, 'pix_fmt': 'yuv420p', 'acodec': 'copy'}
+            if low_memory and vcodec == 'libx264':
+                encode_kwargs.update(_LOW_MEMORY_X264)
+            if draft and vcodec == 'libx264':
+                encode_kwargs.update(_DRAFT_X264)
+            output = ffmpeg.output(
+                composited,
+                foreground.audio,
+                output_video_path,
+                **encode_kwargs
+            )
+            _run_ffmpeg_piped(output)
+        
+        with _draft_cpu_affinity(draft):
+            _run_with_encoder_fallback(run)
         
         return f"Advanced chroma key with lighting applied successfully. Output saved to {output_video_path}"
         
@@ -271,4 +330,18 @@ def advanced_chroma_key_with_lighting(foreground_video_path: str, background_vid
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
         return f"Error applying advanced chroma key: {error_message}"
     except Exception as e:
-        return f"An unexpected error occurred: {str(e)}"
\ No newline at end of file
+        return f"An unexpected error occurred: {str(e)}"
+
+
+def _despill_type(chroma_color: str):
+    """Returns despill's 'green'/'blue' type for a key color, or None for other colors."""
+    try:
+        rgb = int(chroma_color.replace('#', '').replace('0x', '').replace('0X', ''), 16)
+    except ValueError:
+        return None
+    red, green, blue = (rgb >> 16) & 0xFF, (rgb >> 8) & 0xFF, rgb & 0xFF
+    if green > max(red, blue):
+        return 'green'
+    if blue > max(red, green):
+        return 'blue'
+    return None
@@ -1,10 +1,22 @@
 import ffmpeg
 import os
 import math
+import re
+import hashlib
+from functools import lru_cache
+from ..utils import _run_ffmpeg_piped, _draft_cpu_affinity, _DRAFT_X264, _cached_temp_png
+
+# Optional imports with graceful fallback
+try:
+    from PIL import Image, ImageDraw, ImageFont
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
 
 def create_motion_graphics(input_video_path: str, output_video_path: str,
                           graphics_type: str, start_time: float = 0.0, 
-                          duration: float = 5.0, custom_params: dict = None) -> str:
+                          duration: float = 5.0, custom_params: dict = None,
+                          draft: bool = False) -> str:
     """Creates animated motion graphics overlays on video content.
     
     Args:
@@ -24,6 +36,8 @@ def create_motion_graphics(input_video_path: str, output_video_path: str,
         start_time: Start time for the graphics in seconds
         duration: Duration of the graphics animation in seconds
         custom_params: Dictionary with graphics-specific parameters
+        draft: Fast preview render (libx264 ultrafast, CRF 28, fastdecode tune) with
+            ffmpeg pinned to half of the CPUs on Linux.
     
     Returns:
         A status message indicating success or failure.
@@ -34,39 +48,18 @@ def create_motion_graphics(input_video_path: str, output_video_path: str,
     custom_params = custom_params or {}
     
     try:
-        # Define motion graphics configurations
-        graphics_configs = {
-            'animated_text': _create_animated_text,
-            'geometric_shapes': _create_geometric_shapes,
-            'particle_system': _create_particle_system,
-            'progress_bar': _create_progress_bar,
-            'counter': _create_counter,
-            'waveform': _create_waveform,
-            'oscilloscope': _create_oscilloscope,
-            'spinning_logo': _create_spinning_logo,
-            'sliding_panels': _create_sliding_panels,
-            'burst_animation': _create_burst_animation
-        }
-        
-        if graphics_type not in graphics_configs:
-            available_types = ', '.join(graphics_configs.keys())
+        if graphics_type not in _GRAPHICS_BUILDERS:
+            available_types = ', '.join(_GRAPHICS_BUILDERS.keys())
             return f"Error: Unknown graphics type '{graphics_type}'. Available types: {available_types}"
         
         # Generate the filter complex for the motion graphics
-        filter_complex = graphics_configs[graphics_type](
+        filter_complex = _GRAPHICS_BUILDERS[graphics_type](
             start_time, duration, custom_params
         )
         
         if input_video_path:
             # Overlay on existing video
-            input_stream = ffmpeg.input(input_video_path)
-            output = ffmpeg.output(
-                input_stream,
-                output_video_path,
-                filter_complex=filter_complex,
-                vcodec='libx264',
-                acodec='copy'
-            ).global_args('-map', '[vout]', '-map', '0:a?')
+            output = _overlay_args(input_video_path, output_video_path, filter_complex, draft)
         else:
             # Create graphics-only video
             color_source = ffmpeg.input(
@@ -80,10 +73,12 @@ def create_motion_graphics(input_video_path: str, output_video_path: str,
                 filter_complex=filter_complex,
                 map='[vout]',
                 vcodec='libx264',
-                pix_fmt='yuv420p'
+                pix_fmt='yuv420p',
+                **(_DRAFT_X264 if draft else {})
             )
         
-        output.run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+        with _draft_cpu_affinity(draft):
+            _run_ffmpeg_piped(output)
         
         return f"Motion graphics '{graphics_type}' created successfully. Duration: {duration}s. Output saved to {output_video_path}"
         
@@ -94,6 +89,109 @@ def create_motion_graphics(input_video_path: str, output_video_path: str,
         return f"An unexpected error occurred: {str(e)}"
 
 
+def create_motion_graphics_stack(input_video_path: str, output_video_path: str,
+                                specs: list, draft: bool = False) -> str:
+    """Applies several motion graphics overlays to a video in a single encode pass.
+    
+    Each spec is chained into one filter graph, so the source video is decoded
+    and encoded once instead of once per create_motion_graphics call.
+    
+    Args:
+        input_video_path: Path to the source video file
+        output_video_path: Path to save the video with motion graphics
+        specs: List of dictionaries, applied in order. Each accepts:
+            - 'graphics_type': Any type supported by create_motion_graphics (required)
+            - 'start_time': Start time for the graphics in seconds (default 0.0)
+            - 'duration': Duration of the graphics animation in seconds (default 5.0)
+            - 'custom_params': Dictionary with graphics-specific parameters
+        draft: Fast preview render (libx264 ultrafast, CRF 28, fastdecode tune) with
+            ffmpeg pinned to half of the CPUs on Linux.
+    
+    Returns:
+        A status message indicating success or failure.
+    """
+    if not os.path.exists(input_video_path):
+        return f"Error: Input video file not found at {input_video_path}"
+    
+    if not specs:
+        return "Error: At least one graphics spec is required"
+    
+    for spec in specs:
+        if not isinstance(spec, dict):
+            return f"Error: Each graphics spec must be a dictionary, got {spec!r}"
+        graphics_type = spec.get('graphics_type')
+        if graphics_type not in _GRAPHICS_BUILDERS:
+            available_types = ', '.join(_GRAPHICS_BUILDERS.keys())
+            return f"Error: Unknown graphics type '{graphics_type}'. Available types: {available_types}"
+    
+    try:
+        filter_parts = []
+        for i, spec in enumerate(specs):
+            body = _GRAPHICS_BUILDERS[spec['graphics_type']](
+                spec.get('start_time', 0.0),
+                spec.get('duration', 5.0),
+                spec.get('custom_params') or {}
+            )
+            input_label = '[0:v]' if i == 0 else f'[stage{i}]'
+            output_label = '[vout]' if i == len(specs) - 1 else f'[stage{i + 1}]'
+            filter_parts.append(_relabel_graphics_filter(body, i, input_label, output_label))
+        
+        filter_complex = ';'.join(filter_parts)
+        
+        output = _overlay_args(input_video_path, output_video_path, filter_complex, draft)
+        
+        with _draft_cpu_affinity(draft):
+            _run_ffmpeg_piped(output)
+        
+        applied = ', '.join(spec['graphics_type'] for spec in specs)
+        return f"Motion graphics stack ({applied}) created successfully in a single pass. Output saved to {output_video_path}"
+        
+    except ffmpeg.Error as e:
+        error_message = e.stderr.decode('utf8') if e.stderr else str(e)
+        return f"Error creating motion graphics stack: {error_message}"
+    except Exception as e:
+        return f"An unexpected error occurred: {str(e)}"
+
+
+def _overlay_args(input_video_path: str, output_video_path: str, filter_complex: str,
+                  draft: bool) -> list:
+    """ffmpeg command line encoding filter_complex's [vout] over the input video, with
+    the input's audio (if any) copied.
+    
+    The -map options must precede the output file; ffmpeg-python's global_args would
+    append them after it, where ffmpeg ignores them.
+    """
+    args = ffmpeg.input(input_video_path).output(
+        output_video_path,
+        filter_complex=filter_complex,
+        vcodec='libx264',
+        acodec='copy',
+        **(_DRAFT_X264 if draft else {})
+    ).compile(overwrite_output=True)
+    output_index = len(args) - 1 - args[::-1].index(output_video_path)
+    return args[:output_index] + ['-map', '[vout]', '-map', '0:a?'] + args[output_index:]
+
+
+def _relabel_graphics_filter(body: str, index: int, input_label: str, output_label: str) -> str:
+    """Rewires a single-graphic filter complex so it can be chained with others.
+    
+    The video input/output pads are swapped for the given labels and any
+    intermediate labels (e.g. [waves], [logo]) get a per-stage suffix so they
+    do not collide across stages.
+    """
+    def rename(match):
+        label = match.group(1)
+        if label == '0:v':
+            return input_label
+        if label == 'vout':
+            return output_label
+        if label == '0:a':
+            return match.group(0)
+        return f'[{label}_{index}]'
+    
+    return re.sub(r'\[([^\]]+)\]', rename, body.strip())
+
+
 def _create_animated_text(start_time: float, duration: float, params: dict) -> str:
     """Create animated text graphics filter complex."""
     text = params.get('text', 'Sample Text')
@@ -103,6 +201,11 @@ def _create_animated_text(start_time: float, duration: float, params: dict) -> s
     x_pos = params.get('x_pos', '(w-text_w)/2')
     y_pos = params.get('y_pos', '(h-text_h)/2')
     
+    # Text that only moves can be rendered once and blitted instead of rasterized per frame
+    atlas_path = None
+    if animation in ('slide_in', 'bounce'):
+        atlas_path = _render_text_atlas(text, font_size, font_color, params.get('font_file'))
+    
     if animation == 'typewriter':
         # Typewriter effect - reveal characters one by one
         filter_complex = f'''
@@ -120,6 +223,18 @@ def _create_animated_text(start_time: float, duration: float, params: dict) -> s
         x={x_pos}:y={y_pos}:alpha='{alpha_expr}':
         enable='between(t,{start_time},{start_time + duration})'[vout]
         '''
+    elif atlas_path:
+        x_expr = _to_overlay_expr(x_pos)
+        y_expr = _to_overlay_expr(y_pos)
+        if animation == 'slide_in':
+            x_expr = f'if(between(t,{start_time},{start_time + duration}),-main_w+(main_w+overlay_w)*(t-{start_time})/{duration},{x_expr})'
+        else:
+            y_expr = f'{y_expr}+sin((t-{start_time})*2*PI)*20'
+        filter_complex = f'''
+        movie={atlas_path}[txt];
+        [0:v][txt]overlay=x='{x_expr}':y='{y_expr}':
+        enable='between(t,{start_time},{start_time + duration})'[vout]
+        '''
     elif animation == 'slide_in':
         # Slide in from left
         x_expr = f'if(between(t,{start_time},{start_time + duration}),-w+(w+text_w)*(t-{start_time})/{duration},{x_pos})'
@@ -140,6 +255,48 @@ def _create_animated_text(start_time: float, duration: float, params: dict) -> s
     return filter_complex
 
 
+@lru_cache(maxsize=32)
+def _load_font(font_file: str, font_size: int):
+    """Loads (and caches) a Pillow font, falling back to the bundled default."""
+    if font_file:
+        return ImageFont.truetype(font_file, font_size)
+    try:
+        return ImageFont.load_default(size=font_size)
+    except TypeError:  # Pillow < 10.1 has no sized default font
+        return ImageFont.load_default()
+
+
+def _render_text_atlas(text: str, font_size: int, color: str, font_file: str = None) -> str:
+    """Renders text once to a transparent PNG and returns its path.
+    
+    Returns None when Pillow is unavailable or cannot handle the font/color, in
+    which case callers fall back to drawtext.
+    """
+    if not PIL_AVAILABLE:
+        return None
+    
+    def render(path):
+        font = _load_font(font_file, font_size)
+        left, top, right, bottom = ImageDraw.Draw(Image.new('RGBA', (1, 1))).textbbox((0, 0), text, font=font)
+        image = Image.new('RGBA', (max(right - left, 1), max(bottom - top, 1)), (0, 0, 0, 0))
+        ImageDraw.Draw(image).text((-left, -top), text, font=font, fill=color)
+        image.save(path)
+    
+    key = hashlib.sha1(f'{text}|{font_size}|{color}|{font_file}'.encode('utf8')).hexdigest()[:16]
+    try:
+        return _cached_temp_png(f'text_{key}.png', render)
+    except (OSError, ValueError):
+        return None
+
+
+def _to_overlay_expr(expr) -> str:
+    """Translates a drawtext position expression to overlay filter variables."""
+    expr = re.sub(r'\btext_w\b', 'overlay_w', str(expr))
+    expr = re.sub(r'\btext_h\b', 'overlay_h', expr)
+    expr = re.sub(r'\bw\b', 'main_w', expr)
+    return re.sub(r'\bh\b', 'main_h', expr)
+
+
 def _create_geometric_shapes(start_time: float, duration: float, params: dict) -> str:
     """Create animated geometric shapes filter complex."""
     shape_type = params.get('shape', 'circle')  # circle, rectangle, line, triangle
@@ -333,4 +490,19 @@ def _create_burst_animation(start_time: float, duration: float, params: dict) ->
     enable='between(t,{start_time},{start_time + duration})'[vout]
     '''
     
-    return filter_complex
\ No newline at end of file
+    return filter_complex
+
+
+# Graphics type -> filter complex builder
+_GRAPHICS_BUILDERS = {
+    'animated_text': _create_animated_text,
+    'geometric_shapes': _create_geometric_shapes,
+    'particle_system': _create_particle_system,
+    'progress_bar': _create_progress_bar,
+    'counter': _create_counter,
+    'waveform': _create_waveform,
+    'oscilloscope': _create_oscilloscope,
+    'spinning_logo': _create_spinning_logo,
+    'sliding_panels': _create_sliding_panels,
+    'burst_animation': _create_burst_animation
+}
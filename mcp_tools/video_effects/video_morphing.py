@@ -1,6 +1,23 @@
 import ffmpeg
+import hashlib
+import math
 import os
+import re
+import shutil
+import subprocess
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from ..utils import (_run_with_encoder_fallback, _run_ffmpeg_cmd, _get_media_properties, _available_filters,
+                     _FAST_ENCODE_OPTIONS, _cached_temp_png, _thread_kwargs, _batch_threads,
+                     _limit_ffmpeg_threads)
+
+# Optional imports with graceful fallback
+try:
+    from PIL import Image, ImageColor, ImageDraw
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
 
 def apply_video_morphing(input_videos: list[str], output_video_path: str,
                         morph_type: str = "smooth", morph_duration: float = 2.0,
@@ -11,7 +28,7 @@ def apply_video_morphing(input_videos: list[str], output_video_path: str,
         input_videos: List of video file paths to morph between
         output_video_path: Path to save the morphed video
         morph_type: Type of morphing effect. Options:
-            - 'smooth': Smooth blending between clips
+            - 'smooth': Smooth crossfade from each clip into the next
             - 'warp': Geometric warping transition
             - 'liquid': Liquid-like flowing transition
             - 'spiral': Spiral morphing effect
@@ -21,7 +38,10 @@ def apply_video_morphing(input_videos: list[str], output_video_path: str,
             - 'ripple_morph': Ripple-based morphing
         morph_duration: Duration of each morph transition in seconds
         easing: Easing function ('linear', 'ease_in', 'ease_out', 'ease_in_out')
-        custom_params: Optional dictionary for morph-specific parameters
+        custom_params: Optional dictionary for morph-specific parameters. 'distortion_quality'
+            ('draft' or 'full', default 'draft') sets the resolution distortion maps are computed at.
+            'fast_transition' (default False) renders spiral, zoom_morph, stretch and ripple_morph
+            as their closest built-in xfade transition, which is much faster but looks simpler
     
     Returns:
         A status message indicating success or failure.
@@ -39,55 +59,118 @@ def apply_video_morphing(input_videos: list[str], output_video_path: str,
     custom_params = custom_params or {}
     
     try:
-        # Define morphing configurations
-        morph_configs = {
-            'smooth': _create_smooth_morph,
-            'warp': _create_warp_morph,
-            'liquid': _create_liquid_morph,
-            'spiral': _create_spiral_morph,
-            'zoom_morph': _create_zoom_morph,
-            'twist': _create_twist_morph,
-            'stretch': _create_stretch_morph,
-            'ripple_morph': _create_ripple_morph
-        }
-        
-        if morph_type not in morph_configs:
-            available_morphs = ', '.join(morph_configs.keys())
+        if morph_type not in _MORPH_CONFIGS:
+            available_morphs = ', '.join(_MORPH_CONFIGS.keys())
             return f"Error: Unknown morph type '{morph_type}'. Available morphs: {available_morphs}"
         
-        # Load input videos
-        inputs = []
-        for video_path in input_videos:
-            inputs.append(ffmpeg.input(video_path))
+        # Check the morph's filters against the local ffmpeg build (an empty probe means
+        # ffmpeg could not be listed, in which case the run itself reports the problem)
+        morph_fn = _MORPH_CONFIGS[morph_type]
+        available_filters = _available_filters()
+        missing_filters = _MORPH_FILTERS[morph_type] - available_filters if available_filters else set()
+        if missing_filters == {'xfade'}:
+            # ffmpeg before 4.3 has no xfade; crossfade with blend instead
+            morph_fn = _create_blend_morph
+        elif missing_filters:
+            return f"Error: The installed ffmpeg lacks filters required for '{morph_type}': {', '.join(sorted(missing_filters))}"
         
-        # Generate morph filter complex
-        filter_complex_parts = []
-        current_output = '[0:v]'
+        # Opt-in: swap the hand-built graph for xfade's compiled equivalent, which then
+        # takes the crossfade timeline and segment rendering of the smooth morph
+        transition = _XFADE_EQUIVALENTS.get(morph_type, 'fade') if custom_params.get('fast_transition') else 'fade'
+        if transition != 'fade' and (not available_filters or 'xfade' in available_filters):
+            morph_fn = _create_smooth_morph
+            custom_params = dict(custom_params, transition=transition)
         
-        for i in range(len(input_videos) - 1):
-            next_input = f'[{i+1}:v]'
-            transition_output = f'[v{i}]' if i < len(input_videos) - 2 else '[vout]'
-            
-            morph_filter = morph_configs[morph_type](
-                current_output, next_input, transition_output,
-                morph_duration, easing, custom_params
+        # Probe every clip concurrently up front, so an unreadable or audio-only input is
+        # reported before any encoding starts (probes are I/O bound, threads suffice)
+        with ThreadPoolExecutor(max_workers=min(len(input_videos), 8)) as executor:
+            probes = list(executor.map(_probe_clip, input_videos))
+        for video_path, probe in zip(input_videos, probes):
+            if isinstance(probe, str):
+                return f"Error: Could not read {video_path}: {probe}"
+            if not probe['has_video']:
+                return f"Error: No video stream found in {video_path}"
+        clip_props = probes
+        frame_rate = clip_props[0]['avg_fps'] or 30
+        frame_size = (clip_props[0]['width'], clip_props[0]['height'])
+        
+        # Crossfades play clips back to back, so each xfade needs the time at which
+        # the running output reaches the end of the clip being faded out
+        offsets = [0.0] * (len(input_videos) - 1)
+        if morph_fn is _create_smooth_morph:
+            elapsed = 0.0
+            for i, props in enumerate(clip_props[:-1]):
+                elapsed += props['duration'] - morph_duration
+                offsets[i] = max(elapsed, 0.0)
+        
+        # Back-to-back crossfades are independent of each other, so longer clip lists
+        # render one segment per transition concurrently and join them without re-encoding.
+        # Inputs our encoder could have produced additionally stream-copy the parts of each
+        # clip no crossfade touches
+        if morph_fn is _create_smooth_morph and len(input_videos) >= 4:
+            with ThreadPoolExecutor(max_workers=min(len(input_videos), 8)) as executor:
+                packets = list(executor.map(_passthrough_packets, input_videos))
+            if len({(props['width'], props['height']) for props in clip_props}) > 1:
+                packets = [([], []) for _ in input_videos]
+            _run_with_encoder_fallback(
+                lambda vcodec: _render_crossfade_segments(input_videos, clip_props, packets,
+                                                          output_video_path, morph_duration, easing, vcodec,
+                                                          transition)
             )
-            filter_complex_parts.append(morph_filter)
-            current_output = transition_output
+            return f"Video morphing '{morph_type}' applied successfully between {len(input_videos)} videos. Duration: {morph_duration}s each. Output saved to {output_video_path}"
         
-        filter_complex = ';'.join(filter_complex_parts)
+        # Long clip lists overflow the command line, so the graph goes to ffmpeg as a script
+        # file, written chain by chain as it is generated instead of being joined in memory
+        script_file = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+        filter_script_path = script_file.name
+        with script_file:
+            # Bring every clip to 4:2:0 at the first clip's size before anything else, so
+            # blend/xfade never trigger an automatic conversion to RGB or a larger format
+            for i, props in enumerate(clip_props):
+                normalize = 'format=yuv420p'
+                if (props['width'], props['height']) != frame_size:
+                    normalize = f'scale={frame_size[0]}:{frame_size[1]},{normalize}'
+                _write_graph_chain(script_file, f'[{i}:v]{normalize}[in{i}]')
+            
+            # Generate morph filter complex
+            current_output = '[in0]'
+            
+            for i in range(len(input_videos) - 1):
+                next_input = f'[in{i+1}]'
+                transition_output = f'[v{i}]' if i < len(input_videos) - 2 else '[vmix]'
+                
+                morph_filter = morph_fn(
+                    current_output, next_input, transition_output,
+                    morph_duration, easing, dict(custom_params, offset=offsets[i], frame_rate=frame_rate, frame_size=frame_size)
+                )
+                _write_graph_chain(script_file, morph_filter)
+                current_output = transition_output
+            
+            # Hand the encoder semi-planar 4:2:0, which hardware encoders take natively (blend
+            # itself only works on planar formats, so this goes on the final output only)
+            script_file.write('[vmix]format=nv12[vout]')
         
-        # Create output
-        output = ffmpeg.output(
-            *inputs,
-            output_video_path,
-            filter_complex=filter_complex,
-            map='[vout]',
-            vcodec='libx264',
-            pix_fmt='yuv420p'
-        )
+        # Create output (GPU encoder when available, fastest preset either way). The command
+        # is built by hand: ffmpeg-python would also -map every input stream next to [vout]
+        def run(vcodec):
+            cmd = ['ffmpeg', '-y']
+            for video_path in input_videos:
+                cmd.extend(['-fflags', '+genpts', '-i', video_path])
+            cmd.extend([
+                '-filter_complex_script', filter_script_path,
+                '-map', '[vout]',
+                *_thread_args(vcodec),
+                '-avoid_negative_ts', 'make_zero',
+                *_encode_args(vcodec, pix_fmt='nv12'),
+                *_mux_args(output_video_path),
+                output_video_path
+            ])
+            _run_ffmpeg_cmd(cmd)
         
-        output.run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+        try:
+            _run_with_encoder_fallback(run)
+        finally:
+            os.unlink(filter_script_path)
         
         return f"Video morphing '{morph_type}' applied successfully between {len(input_videos)} videos. Duration: {morph_duration}s each. Output saved to {output_video_path}"
         
@@ -98,64 +181,239 @@ def apply_video_morphing(input_videos: list[str], output_video_path: str,
         return f"An unexpected error occurred: {str(e)}"
 
 
+def _write_graph_chain(script_file, chain: str) -> None:
+    """Append one ';'-terminated chain to a filter script.
+    
+    The helpers return indented multi-line graphs; line breaks and indentation are
+    dropped (spaces inside a line are kept, sendcmd timelines need them).
+    """
+    script_file.write(re.sub(r'\s*\n\s*', '', chain))
+    script_file.write(';')
+
+
+def _render_crossfade_segments(input_videos: list[str], clip_props: list[dict], packets: list[tuple],
+                               output_video_path: str, duration: float, easing: str, vcodec: str,
+                               transition: str = 'fade') -> None:
+    """Render each crossfade as a separate ffmpeg job, stream-copy what lies between them, then concat.
+    
+    A clip's first `duration` seconds play inside the previous crossfade and its last
+    `duration` seconds inside the next one. `packets` holds each clip's
+    `_passthrough_packets`. Copied interiors have to start and end on keyframes, so the
+    re-encoded crossfade segments run on to the nearest keyframe.
+    
+    The joined stream keeps a single set of H.264 parameter sets (the first segment's),
+    so a clip is only copied when its SPS/PPS are byte-identical to what `vcodec`
+    produces for it; every other clip is re-encoded whole.
+    """
+    with ThreadPoolExecutor(max_workers=min(len(input_videos), 8)) as executor:
+        copyable = list(executor.map(
+            lambda args: bool(args[1][0]) and _copy_matches_encoder(args[0], vcodec), zip(input_videos, packets)))
+    keyframes = [clip_packets[0] if copy else [] for clip_packets, copy in zip(packets, copyable)]
+    
+    last = len(input_videos) - 1
+    heads = []
+    for i, props in enumerate(clip_props):
+        head_end = 0.0 if i == 0 else next((k for k in keyframes[i] if k >= duration), duration)
+        heads.append(head_end)
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        commands = []
+        segment_paths = []
+        
+        def add_segment(cmd, encode=True):
+            segment_path = os.path.join(temp_dir, f'segment_{len(segment_paths):03d}.mkv')
+            segment_paths.append(segment_path)
+            commands.append((cmd, encode, segment_path))
+        
+        for i, video_path in enumerate(input_videos):
+            clip_end = clip_props[i]['duration']
+            start = heads[i]
+            copy_limit = clip_end if i == last else clip_end - duration
+            copy_end = start
+            if i == 0 or start in keyframes[i]:
+                copy_end = clip_end if i == last else max(
+                    (k for k in keyframes[i] if start <= k <= copy_limit), default=start)
+            if keyframes[i] and copy_end > start:
+                # Seek just past the keyframe so the demuxer lands on it rather than the one before,
+                # and cut by packet count: a stream-copy -t also lets in the next keyframe's packet.
+                # GOPs are closed, so the packets up to the next keyframe are those timed before it
+                end = math.inf if i == last else copy_end
+                frame_count = sum(start <= t < end for t in packets[i][1])
+                add_segment(['ffmpeg', '-y', '-ss', str(start + 0.001) if start else '0', '-i', video_path,
+                             '-frames:v', str(frame_count), '-map', '0:v:0', '-c', 'copy'], encode=False)
+                start = copy_end
+            
+            if i < last:
+                offset = max(clip_end - start - duration, 0.0)
+                xfade = _create_smooth_morph('[0:v]', '[1:v]', '[vout]', duration, easing,
+                                             {'offset': offset, 'transition': transition})
+                add_segment(['ffmpeg', '-y', '-ss', str(start), '-i', video_path,
+                             '-t', str(heads[i + 1]), '-i', input_videos[i + 1],
+                             '-filter_complex', xfade, '-map', '[vout]', *_encode_args(vcodec)])
+            elif start < clip_end:
+                add_segment(['ffmpeg', '-y', '-ss', str(start), '-i', video_path,
+                             '-map', '0:v:0', *_encode_args(vcodec)])
+        
+        # Each job is an ffmpeg process, so threads only wait on them; the encodes split the
+        # CPU between them rather than each starting a thread per core
+        workers = max(1, min(len(commands), (os.cpu_count() or 2) // 2))
+        threads = _batch_threads(workers)
+        
+        def run_segment(command):
+            cmd, encode, segment_path = command
+            # Set in the worker thread, since the limit is per-context
+            with _limit_ffmpeg_threads(threads):
+                _run_ffmpeg_cmd([*cmd, *(_thread_args(vcodec) if encode else []), segment_path])
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(run_segment, commands))
+        
+        concat_list_path = os.path.join(temp_dir, 'segments.txt')
+        with open(concat_list_path, 'w') as concat_list:
+            for segment_path in segment_paths:
+                concat_list.write(f"file '{segment_path}'\n")
+        _run_ffmpeg_cmd(['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', concat_list_path,
+                         '-c', 'copy', *_mux_args(output_video_path), output_video_path])
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def _probe_clip(video_path: str):
+    """Media properties of a clip, or the probe error message if it cannot be read."""
+    try:
+        return _get_media_properties(video_path)
+    except RuntimeError as e:
+        return str(e)
+
+
+def _passthrough_packets(video_path: str) -> tuple[list[float], list[float]]:
+    """Keyframe times and packet times (decode order) of a clip whose video could be stream-copied.
+    
+    Both lists are empty when the clip cannot be copied: codecs or pixel formats other
+    than our H.264 output, missing timestamps, or open GOPs (frames after a keyframe
+    that display before it cannot be cut off at that keyframe).
+    """
+    try:
+        probe = ffmpeg.probe(video_path, select_streams='v:0', show_entries='packet=pts_time,flags')
+    except ffmpeg.Error:
+        return [], []
+    stream = probe['streams'][0] if probe.get('streams') else {}
+    if stream.get('codec_name') != 'h264' or stream.get('pix_fmt') != 'yuv420p':
+        return [], []
+    keyframes, packet_times = [], []
+    for packet in probe.get('packets', []):
+        if 'pts_time' not in packet:
+            return [], []
+        pts = float(packet['pts_time'])
+        if packet.get('flags', '').startswith('K'):
+            keyframes.append(pts)
+        elif keyframes and pts < keyframes[-1]:
+            return [], []
+        packet_times.append(pts)
+    return sorted(keyframes), packet_times
+
+
+def _copy_matches_encoder(video_path: str, vcodec: str) -> bool:
+    """Whether the clip's H.264 parameter sets equal those `vcodec` writes when re-encoding it."""
+    source = _h264_parameter_sets(['-map', '0:v:0', '-c:v', 'copy', '-bsf:v', 'h264_mp4toannexb'], video_path)
+    return bool(source) and source == _h264_parameter_sets(['-map', '0:v:0', *_encode_args(vcodec)], video_path)
+
+
+def _h264_parameter_sets(codec_args: list[str], video_path: str) -> frozenset:
+    """SPS and PPS NAL units of the first frame ffmpeg writes for video_path with codec_args."""
+    result = subprocess.run(['ffmpeg', '-v', 'error', '-i', video_path, '-frames:v', '1', *codec_args,
+                             '-f', 'h264', 'pipe:1'], capture_output=True)
+    if result.returncode:
+        return frozenset()
+    nal_units = re.split(b'\x00\x00\x01', result.stdout)
+    # NAL unit types 7 and 8; the zero byte of a 4-byte start code trails the previous unit
+    return frozenset(nal.rstrip(b'\x00') for nal in nal_units if nal and nal[0] & 0x1F in (7, 8))
+
+
+def _encode_args(vcodec: str, pix_fmt: str = 'yuv420p') -> list[str]:
+    """Video encoder arguments shared by every morph render."""
+    # No B-frames and two reference frames: cheaper to encode and drains the encoder sooner,
+    # at little cost for morphed content
+    args = ['-c:v', vcodec, '-pix_fmt', pix_fmt, '-bf', '0', '-refs', '2']
+    for option, value in _FAST_ENCODE_OPTIONS.get(vcodec, {}).items():
+        args.extend([f'-{option}', str(value)])
+    return args
+
+
+def _thread_args(vcodec: str) -> list[str]:
+    """Encoder and filter thread arguments from _thread_kwargs, for a hand-built morph command."""
+    args = []
+    for option, value in _thread_kwargs(vcodec).items():
+        args.extend([f'-{option}', str(value)])
+    return args
+
+
+def _mux_args(output_path: str) -> list[str]:
+    """Muxer arguments for a final morph output: index up front for MP4/MOV so it streams."""
+    if os.path.splitext(output_path)[1].lower() in ('.mp4', '.m4v', '.mov'):
+        return ['-movflags', '+faststart', '-write_tmcd', '0']
+    return []
+
+
 def _create_smooth_morph(input1: str, input2: str, output: str, duration: float, easing: str, params: dict) -> str:
     """Create smooth morphing transition."""
-    alpha_curve = _get_easing_curve(easing, duration)
-    return f"{input1}{input2}blend=all_mode=normal:all_opacity='{alpha_curve}':enable='between(t,0,{duration})'{output}"
+    offset = params.get('offset', 0)
+    transition = params.get('transition', 'fade')
+    
+    # xfade's built-in transitions are compiled; eased fades go through a custom
+    # expression on the transition progress (P runs from 1 down to 0 in xfade).
+    # Other built-in transitions have their own fixed pacing, so easing does not apply
+    if easing == 'linear' or transition != 'fade':
+        return f"{input1}{input2}xfade=transition={transition}:duration={duration}:offset={offset}{output}"
+    
+    alpha_curve = _get_easing_curve(easing, duration, progress='(1-P)')
+    return f"{input1}{input2}xfade=transition=custom:expr='A*(1-{alpha_curve})+B*{alpha_curve}':duration={duration}:offset={offset}{output}"
+
+
+def _create_blend_morph(input1: str, input2: str, output: str, duration: float, easing: str, params: dict) -> str:
+    """Create plain blended crossfade (used when ffmpeg lacks xfade)."""
+    return f"{_blend_pair(input1, input2, output, duration, easing, params)}{output}"
 
 
 def _create_warp_morph(input1: str, input2: str, output: str, duration: float, easing: str, params: dict) -> str:
     """Create geometric warping morph transition."""
     warp_strength = params.get('warp_strength', 0.5)
+    envelope = _morph_envelope(duration, f"in/{params.get('frame_rate', 30)}")
     
-    # Create warping effect using perspective filter
-    perspective_expr = f"x/(W+{warp_strength}*W*sin(t*2*PI/{duration})):y/(H+{warp_strength}*H*cos(t*2*PI/{duration}))"
+    # Keystone the blended frame: pull the top corners inwards and release them again
+    inset = f"{warp_strength}*W/4*{envelope}"
     
     return f"""
-    {input1}perspective=interpolation=linear:
-    x0='0':y0='0':x1='W':y1='0':x2='W':y2='H':x3='0':y3='H':
-    enable='between(t,0,{duration/2})'[warped1];
-    {input2}perspective=interpolation=linear:
-    x0='0':y0='0':x1='W':y1='0':x2='W':y2='H':x3='0':y3='H':
-    enable='between(t,{duration/2},{duration})'[warped2];
-    [warped1][warped2]blend=all_mode=normal:all_opacity='if(lt(t,{duration/2}),1-t/{duration/2},t/{duration/2}-0.5)'{output}
+    {_blend_pair(input1, input2, output, duration, easing, params)},
+    perspective=x0='{inset}':y0=0:x1='W-{inset}':y1=0:x2=0:y2=H:x3=W:y3=H:
+    interpolation=linear:eval=frame{output}
     """
 
 
 def _create_liquid_morph(input1: str, input2: str, output: str, duration: float, easing: str, params: dict) -> str:
     """Create liquid-like flowing morph transition."""
     flow_speed = params.get('flow_speed', 1.0)
-    viscosity = params.get('viscosity', 0.5)
+    tag = output.strip('[]')
+    envelope = _morph_envelope(duration)
     
-    # Simulate liquid flow using displacement mapping
+    # The flow offset is uniform across the frame, so shift the blend over itself
+    # with overlay instead of resampling every pixel through geq
     return f"""
-    {input1}format=rgba,geq=
-    r='r(X+10*sin(T*{flow_speed}),Y+10*cos(T*{flow_speed}))':
-    g='g(X+10*sin(T*{flow_speed}),Y+10*cos(T*{flow_speed}))':
-    b='b(X+10*sin(T*{flow_speed}),Y+10*cos(T*{flow_speed}))':
-    a='a(X,Y)*(1-T/{duration})':
-    enable='between(t,0,{duration})'[liquid1];
-    {input2}format=rgba,geq=
-    r='r(X-10*sin(T*{flow_speed}),Y-10*cos(T*{flow_speed}))':
-    g='g(X-10*sin(T*{flow_speed}),Y-10*cos(T*{flow_speed}))':
-    b='b(X-10*sin(T*{flow_speed}),Y-10*cos(T*{flow_speed}))':
-    a='a(X,Y)*(T/{duration})':
-    enable='between(t,0,{duration})'[liquid2];
-    [liquid1][liquid2]overlay{output}
+    {_blend_pair(input1, input2, output, duration, easing, params)},split[{tag}_bg][{tag}_fg];
+    [{tag}_bg][{tag}_fg]overlay=x='10*sin(t*{flow_speed})*{envelope}':y='10*cos(t*{flow_speed})*{envelope}':
+    enable='between(t,0,{duration})'{output}
     """
 
 
 def _create_spiral_morph(input1: str, input2: str, output: str, duration: float, easing: str, params: dict) -> str:
     """Create spiral morphing effect."""
     spiral_speed = params.get('spiral_speed', 2.0)
-    spiral_tightness = params.get('tightness', 1.0)
     
+    # Whole turns over the transition, so the frame lands upright again
     return f"""
-    {input1}rotate='t*{spiral_speed}*2*PI/{duration}':ow=rotw(t*{spiral_speed}*2*PI/{duration}):oh=roth(t*{spiral_speed}*2*PI/{duration}):
-    enable='between(t,0,{duration})'[spiral1];
-    {input2}rotate='-t*{spiral_speed}*2*PI/{duration}':ow=rotw(-t*{spiral_speed}*2*PI/{duration}):oh=roth(-t*{spiral_speed}*2*PI/{duration}):
-    enable='between(t,0,{duration})'[spiral2];
-    [spiral1][spiral2]blend=all_mode=normal:all_opacity='t/{duration}'{output}
+    {_blend_pair(input1, input2, output, duration, easing, params)},
+    rotate='{round(spiral_speed)}*2*PI*clip(t/{duration},0,1)':fillcolor=black{output}
     """
 
 
@@ -164,19 +422,19 @@ def _create_zoom_morph(input1: str, input2: str, output: str, duration: float, e
     zoom_factor = params.get('zoom_factor', 2.0)
     zoom_center_x = params.get('center_x', 0.5)
     zoom_center_y = params.get('center_y', 0.5)
+    envelope = _morph_envelope(duration, f"in/{params.get('frame_rate', 30)}")
     
-    # Zoom out first video while zooming in second
-    scale_out = f"1+{zoom_factor}*t/{duration}"
-    scale_in = f"{zoom_factor}-{zoom_factor}*t/{duration}"
+    # Zoom into the blend and back out, sampling the source window through perspective
+    # so the frame size never changes mid-graph
+    zoom = f"(1+{zoom_factor - 1}*{envelope})"
+    left = f"{zoom_center_x}*W*(1-1/{zoom})"
+    top = f"{zoom_center_y}*H*(1-1/{zoom})"
     
     return f"""
-    {input1}scale=iw*{scale_out}:ih*{scale_out},
-    crop=iw:ih:(iw-ow)/2:(ih-oh)/2:
-    enable='between(t,0,{duration})'[zoom_out];
-    {input2}scale=iw*{scale_in}:ih*{scale_in},
-    crop=iw:ih:(iw-ow)/2:(ih-oh)/2:
-    enable='between(t,0,{duration})'[zoom_in];
-    [zoom_out][zoom_in]blend=all_mode=normal:all_opacity='t/{duration}'{output}
+    {_blend_pair(input1, input2, output, duration, easing, params)},
+    perspective=x0='{left}':y0='{top}':x1='{left}+W/{zoom}':y1='{top}':
+    x2='{left}':y2='{top}+H/{zoom}':x3='{left}+W/{zoom}':y3='{top}+H/{zoom}':
+    interpolation=linear:eval=frame{output}
     """
 
 
@@ -184,22 +442,16 @@ def _create_twist_morph(input1: str, input2: str, output: str, duration: float,
     """Create twisting morph transition."""
     twist_angle = params.get('twist_angle', 360)
     twist_radius = params.get('radius', 0.5)
+    tag = output.strip('[]')
+    envelope = _morph_envelope(duration)
     
-    # Apply twisting distortion
+    # Apply twisting distortion (a uniform per-frame offset, done as an overlay shift)
     twist_expr = f"(t/{duration})*{twist_angle}*PI/180"
     
     return f"""
-    {input1}geq=
-    r='r(X+{twist_radius}*W*cos({twist_expr}),Y+{twist_radius}*H*sin({twist_expr}))':
-    g='g(X+{twist_radius}*W*cos({twist_expr}),Y+{twist_radius}*H*sin({twist_expr}))':
-    b='b(X+{twist_radius}*W*cos({twist_expr}),Y+{twist_radius}*H*sin({twist_expr}))':
-    enable='between(t,0,{duration})'[twisted1];
-    {input2}geq=
-    r='r(X-{twist_radius}*W*cos({twist_expr}),Y-{twist_radius}*H*sin({twist_expr}))':
-    g='g(X-{twist_radius}*W*cos({twist_expr}),Y-{twist_radius}*H*sin({twist_expr}))':
-    b='b(X-{twist_radius}*W*cos({twist_expr}),Y-{twist_radius}*H*sin({twist_expr}))':
-    enable='between(t,0,{duration})'[twisted2];
-    [twisted1][twisted2]blend=all_mode=normal:all_opacity='t/{duration}'{output}
+    {_blend_pair(input1, input2, output, duration, easing, params)},split[{tag}_bg][{tag}_fg];
+    [{tag}_bg][{tag}_fg]overlay=x='{twist_radius}*main_w*cos({twist_expr})*{envelope}':y='{twist_radius}*main_h*sin({twist_expr})*{envelope}':
+    enable='between(t,0,{duration})'{output}
     """
 
 
@@ -207,23 +459,18 @@ def _create_stretch_morph(input1: str, input2: str, output: str, duration: float
     """Create stretching/squashing morph transition."""
     stretch_factor = params.get('stretch_factor', 2.0)
     direction = params.get('direction', 'horizontal')  # horizontal, vertical, both
+    envelope = _morph_envelope(duration, f"in/{params.get('frame_rate', 30)}")
     
-    if direction == 'horizontal':
-        scale_expr1 = f"1+{stretch_factor}*sin(t*PI/{duration}):1"
-        scale_expr2 = f"1+{stretch_factor}*cos(t*PI/{duration}):1"
-    elif direction == 'vertical':
-        scale_expr1 = f"1:1+{stretch_factor}*sin(t*PI/{duration})"
-        scale_expr2 = f"1:1+{stretch_factor}*cos(t*PI/{duration})"
-    else:  # both
-        scale_expr1 = f"1+{stretch_factor}*sin(t*PI/{duration}):1+{stretch_factor}*cos(t*PI/{duration})"
-        scale_expr2 = f"1+{stretch_factor}*cos(t*PI/{duration}):1+{stretch_factor}*sin(t*PI/{duration})"
+    # Stretch by sampling a narrower centred source window back onto the full frame
+    stretch = f"(1+{stretch_factor}*{envelope})"
+    x_inset = f"W*({stretch}-1)/(2*{stretch})" if direction in ('horizontal', 'both') else "0"
+    y_inset = f"H*({stretch}-1)/(2*{stretch})" if direction in ('vertical', 'both') else "0"
     
     return f"""
-    {input1}scale={scale_expr1}:
-    enable='between(t,0,{duration})'[stretched1];
-    {input2}scale={scale_expr2}:
-    enable='between(t,0,{duration})'[stretched2];
-    [stretched1][stretched2]blend=all_mode=normal:all_opacity='t/{duration}'{output}
+    {_blend_pair(input1, input2, output, duration, easing, params)},
+    perspective=x0='{x_inset}':y0='{y_inset}':x1='W-{x_inset}':y1='{y_inset}':
+    x2='{x_inset}':y2='H-{y_inset}':x3='W-{x_inset}':y3='H-{y_inset}':
+    interpolation=linear:eval=frame{output}
     """
 
 
@@ -232,23 +479,58 @@ def _create_ripple_morph(input1: str, input2: str, output: str, duration: float,
     ripple_frequency = params.get('frequency', 5.0)
     ripple_amplitude = params.get('amplitude', 20.0)
     ripple_speed = params.get('speed', 2.0)
+    tag = output.strip('[]')
+    width, height = params.get('frame_size', (1280, 720))
+    envelope = _morph_envelope(duration, 'T')
     
-    # Create ripple distortion effect
-    ripple_x = f"X+{ripple_amplitude}*sin((X+Y)*{ripple_frequency}/100+t*{ripple_speed})"
-    ripple_y = f"Y+{ripple_amplitude}*cos((X+Y)*{ripple_frequency}/100+t*{ripple_speed})"
+    # Ripple displacement maps (128 = no offset) in YUV; SW/SH keep the chroma planes in
+    # step with luma. Draft quality evaluates them at quarter resolution and scales back up,
+    # which is indistinguishable for a smooth wave at a sixteenth of the geq work
+    map_scale = 1 if params.get('distortion_quality', 'draft') == 'full' else 4
+    phase = f"(X/SW+Y/SH)*{ripple_frequency * map_scale}/100+T*{ripple_speed}"
+    x_map = f"128+{ripple_amplitude}*SW*{envelope}*sin({phase})"
+    y_map = f"128+{ripple_amplitude}*SH*{envelope}*cos({phase})"
+    shrink, grow = (f"scale=iw/{map_scale}:ih/{map_scale},", f",scale={width}:{height}") if map_scale > 1 else ("", "")
     
     return f"""
-    {input1}geq=r='r({ripple_x},{ripple_y})':g='g({ripple_x},{ripple_y})':b='b({ripple_x},{ripple_y})':
-    enable='between(t,0,{duration})'[rippled1];
-    {input2}geq=r='r({ripple_x},{ripple_y})':g='g({ripple_x},{ripple_y})':b='b({ripple_x},{ripple_y})':
-    enable='between(t,0,{duration})'[rippled2];
-    [rippled1][rippled2]blend=all_mode=normal:all_opacity='t/{duration}'{output}
+    {_blend_pair(input1, input2, output, duration, easing, params)},split=3[{tag}_src][{tag}_xref][{tag}_yref];
+    [{tag}_xref]{shrink}geq=lum='{x_map}':cb='{x_map}':cr='{x_map}'{grow}[{tag}_xmap];
+    [{tag}_yref]{shrink}geq=lum='{y_map}':cb='{y_map}':cr='{y_map}'{grow}[{tag}_ymap];
+    [{tag}_src][{tag}_xmap][{tag}_ymap]displace=edge=smear:
+    enable='between(t,0,{duration})'{output}
+    """
+
+
+def _blend_pair(input1: str, input2: str, output: str, duration: float, easing: str, params: dict) -> str:
+    """Blend two clips over the transition in one pass; distortions are applied to the result.
+    
+    The easing is sampled once per frame into a sendcmd timeline that steps the native
+    normal-mode opacity, rather than evaluating an easing expression for every pixel.
     """
+    tag = output.strip('[]')
+    target = f"blend@{tag}"
+    # Normal mode outputs A*opacity + B*(1-opacity), so opacity runs from 1 down to 0
+    timeline = ';'.join(f"{time:.3f} {target} all_opacity {1 - progress:.4f}"
+                        for time, progress in _sampled_easing(easing, duration, params.get('frame_rate', 30)))
+    return (f"{input1}sendcmd=c='{timeline}'[{tag}_timed];"
+            f"[{tag}_timed]{input2}{target}=all_mode=normal:all_opacity=1")
+
+
+def _sampled_easing(easing: str, duration: float, frame_rate: float, max_samples: int = 240) -> list[tuple[float, float]]:
+    """Samples an easing curve over the transition as (time, progress) pairs, about one per frame."""
+    curve = _EASING_FUNCTIONS.get(easing, _EASING_FUNCTIONS['linear'])
+    steps = max(1, min(max_samples - 1, math.ceil(duration * frame_rate)))
+    return [(duration * i / steps, curve(i / steps)) for i in range(steps + 1)]
 
 
-def _get_easing_curve(easing: str, duration: float) -> str:
+def _morph_envelope(duration: float, time: str = 't') -> str:
+    """Distortion strength that rises from 0 and settles back to 0 over the transition."""
+    return f"sin(PI*clip({time}/{duration},0,1))"
+
+
+def _get_easing_curve(easing: str, duration: float, progress: str = None) -> str:
     """Generate easing curve expression for smooth transitions."""
-    t_norm = f"t/{duration}"
+    t_norm = progress or f"t/{duration}"
     
     easing_curves = {
         'linear': t_norm,
@@ -261,6 +543,48 @@ def _get_easing_curve(easing: str, duration: float) -> str:
     return easing_curves.get(easing, t_norm)
 
 
+# Python counterparts of _get_easing_curve, for sampled timelines
+_EASING_FUNCTIONS = MappingProxyType({
+    'linear': lambda p: p,
+    'ease_in': lambda p: p ** 2,
+    'ease_out': lambda p: 1 - (1 - p) ** 2,
+    'ease_in_out': lambda p: 2 * p ** 2 if p < 0.5 else 1 - 2 * (1 - p) ** 2,
+    'bounce': lambda p: p * (2 - p)
+})
+
+
+_MORPH_CONFIGS = MappingProxyType({
+    'smooth': _create_smooth_morph,
+    'warp': _create_warp_morph,
+    'liquid': _create_liquid_morph,
+    'spiral': _create_spiral_morph,
+    'zoom_morph': _create_zoom_morph,
+    'twist': _create_twist_morph,
+    'stretch': _create_stretch_morph,
+    'ripple_morph': _create_ripple_morph
+})
+
+# Built-in xfade transitions closest to a hand-built morph, used with custom_params['fast_transition']
+_XFADE_EQUIVALENTS = MappingProxyType({
+    'spiral': 'circleopen',
+    'zoom_morph': 'zoomin',
+    'stretch': 'hlwind',
+    'ripple_morph': 'pixelize'
+})
+
+# ffmpeg filters each morph's graph relies on
+_MORPH_FILTERS = MappingProxyType({
+    'smooth': frozenset({'xfade'}),
+    'warp': frozenset({'blend', 'perspective'}),
+    'liquid': frozenset({'blend', 'split', 'overlay'}),
+    'spiral': frozenset({'blend', 'rotate'}),
+    'zoom_morph': frozenset({'blend', 'perspective'}),
+    'twist': frozenset({'blend', 'split', 'overlay'}),
+    'stretch': frozenset({'blend', 'perspective'}),
+    'ripple_morph': frozenset({'blend', 'split', 'scale', 'geq', 'displace'})
+})
+
+
 def create_shape_morph(input_video_path: str, output_video_path: str,
                       shape_sequence: list[str], morph_duration: float = 2.0,
                       shape_color: str = "white", background_color: str = "black") -> str:
@@ -284,31 +608,69 @@ def create_shape_morph(input_video_path: str, output_video_path: str,
         return f"Error: Input video file not found at {input_video_path}"
     
     try:
-        input_stream = ffmpeg.input(input_video_path)
-        
-        # Create shape sequence with morphing
-        shape_filters = []
         total_duration = len(shape_sequence) * morph_duration
         
+        # Consecutive repeats of a shape are one continuous appearance
+        runs = []
         for i, shape in enumerate(shape_sequence):
-            start_time = i * morph_duration
-            end_time = (i + 1) * morph_duration
+            if runs and runs[-1][0] == shape:
+                runs[-1][2] = (i + 1) * morph_duration
+            else:
+                runs.append([shape, i * morph_duration, (i + 1) * morph_duration])
+        
+        # Shapes rendered once to PNG are composited with overlay, instead of rasterising
+        # them with drawbox/drawtext on every frame; consecutive shapes crossfade briefly
+        shape_images = [_render_shape_png(shape, shape_color) for shape, _, _ in runs]
+        image_inputs = []
+        if all(shape_images):
+            fade = min(morph_duration / 4, 0.5)
+            filter_parts = []
+            current_output = '[0:v]'
+            for i, (shape_image, (_, start_time, end_time)) in enumerate(zip(shape_images, runs)):
+                image_inputs.extend(['-loop', '1', '-t', str(end_time), '-i', shape_image])
+                
+                transition_output = f'[s{i}]' if i < len(runs) - 1 else '[vout]'
+                filter_parts.append(_create_shape_image_overlay(
+                    current_output, f'[{i + 1}:v]', transition_output, start_time, end_time, fade))
+                current_output = transition_output
+            video_args = ['-filter_complex', ';'.join(filter_parts),
+                          '-filter_complex_threads', str(os.cpu_count() or 1), '-map', '[vout]']
+        else:
+            # Shapes that draw identically (circle and square share a box) become one filter
+            # enabled over all of their windows
+            shape_windows = {}
+            for shape, start_time, end_time in runs:
+                windows = shape_windows.setdefault(_shape_filter(shape, shape_color), [])
+                if windows and windows[-1][1] == start_time:
+                    windows[-1] = (windows[-1][0], end_time)
+                else:
+                    windows.append((start_time, end_time))
+            shape_filters = [_create_shape_overlay(shape_filter, windows)
+                             for shape_filter, windows in shape_windows.items()]
             
-            shape_filter = _create_shape_overlay(shape, start_time, end_time, shape_color, background_color)
-            shape_filters.append(shape_filter)
+            # Chain the shape overlays; each is gated by its own enable window, so
+            # outside it the filter passes frames straight through
+            video_args = ['-vf', ','.join(shape_filters), '-map', '0:v:0']
         
-        # Combine all shape overlays
-        filter_complex = f"[0:v]{';'.join(shape_filters)}[vout]"
+        # Only carry an audio mapping when there is audio to copy
+        try:
+            has_audio = _get_media_properties(input_video_path)['has_audio']
+        except RuntimeError:
+            has_audio = True
+        audio_args = ['-map', '0:a?', '-c:a', 'copy'] if has_audio else ['-an']
         
-        output = ffmpeg.output(
-            input_stream,
-            output_video_path,
-            filter_complex=filter_complex,
-            vcodec='libx264',
-            acodec='copy'
-        ).global_args('-map', '[vout]', '-map', '0:a?')
+        def run(vcodec):
+            _run_ffmpeg_cmd([
+                'ffmpeg', '-y', '-i', input_video_path, *image_inputs,
+                *video_args,
+                *audio_args,
+                '-threads', '0',
+                *_encode_args(vcodec),
+                *_mux_args(output_video_path),
+                output_video_path
+            ])
         
-        output.run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+        _run_with_encoder_fallback(run)
         
         return f"Shape morphing created successfully with {len(shape_sequence)} shapes. Total duration: {total_duration}s. Output saved to {output_video_path}"
         
@@ -319,10 +681,8 @@ def create_shape_morph(input_video_path: str, output_video_path: str,
         return f"An unexpected error occurred: {str(e)}"
 
 
-def _create_shape_overlay(shape: str, start_time: float, end_time: float, color: str, bg_color: str) -> str:
-    """Create overlay filter for a specific shape."""
-    duration = end_time - start_time
-    
+def _shape_filter(shape: str, color: str) -> str:
+    """Drawing filter for a specific shape."""
     shape_configs = {
         'circle': f"drawbox=x=(w-100)/2:y=(h-100)/2:w=100:h=100:color={color}:thickness=fill",
         'square': f"drawbox=x=(w-100)/2:y=(h-100)/2:w=100:h=100:color={color}:thickness=fill",
@@ -331,6 +691,72 @@ def _create_shape_overlay(shape: str, start_time: float, end_time: float, color:
         'heart': f"drawtext=text='♥':fontsize=100:fontcolor={color}:x=(w-text_w)/2:y=(h-text_h)/2"
     }
     
-    shape_filter = shape_configs.get(shape, shape_configs['circle'])
+    return shape_configs.get(shape, shape_configs['circle'])
+
+
+def _create_shape_overlay(shape_filter: str, windows: list[tuple[float, float]]) -> str:
+    """Create overlay filter enabled over each of the given (start, end) windows."""
+    enable = '+'.join(f"between(t,{start_time},{end_time})" for start_time, end_time in windows)
+    return f"{shape_filter}:enable='{enable}'"
+
+
+def _create_shape_image_overlay(main_input: str, shape_input: str, output: str,
+                                start_time: float, end_time: float, fade: float) -> str:
+    """Create overlay of a pre-rendered shape image, faded in and out at the edges of its window."""
+    return (f"{shape_input}format=rgba,"
+            f"fade=t=in:st={start_time}:d={fade}:alpha=1,"
+            f"fade=t=out:st={end_time - fade}:d={fade}:alpha=1[{output.strip('[]')}_shape];"
+            f"{main_input}[{output.strip('[]')}_shape]overlay=(W-w)/2:(H-h)/2:eof_action=pass:"
+            f"enable='between(t,{start_time},{end_time})'{output}")
+
+
+_SHAPE_PNG_CACHE = {}
+
+
+def _render_shape_png(shape: str, color: str, size: int = 100) -> str:
+    """Renders a shape once to a transparent PNG and returns its path.
+    
+    Returns None when Pillow is unavailable or cannot parse the color, in which
+    case callers fall back to drawbox/drawtext.
+    """
+    key = (shape, color, size)
+    if key in _SHAPE_PNG_CACHE:
+        return _SHAPE_PNG_CACHE[key]
+    if not PIL_AVAILABLE:
+        return None
+    
+    def render(path):
+        fill = ImageColor.getrgb(color)
+        # Draw at 4x and downsample for smooth edges
+        scale = 4
+        extent = size * scale
+        image = Image.new('RGBA', (extent, extent), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        if shape == 'square':
+            draw.rectangle((0, 0, extent - 1, extent - 1), fill=fill)
+        elif shape == 'triangle':
+            draw.polygon([(extent / 2, 0), (extent - 1, extent - 1), (0, extent - 1)], fill=fill)
+        elif shape == 'star':
+            points = []
+            for i in range(10):
+                radius = extent / 2 if i % 2 == 0 else extent / 5
+                angle = math.pi * i / 5 - math.pi / 2
+                points.append((extent / 2 + radius * math.cos(angle), extent / 2 + radius * math.sin(angle)))
+            draw.polygon(points, fill=fill)
+        elif shape == 'heart':
+            lobe = extent / 2
+            draw.ellipse((0, 0, lobe, lobe), fill=fill)
+            draw.ellipse((extent - lobe, 0, extent - 1, lobe), fill=fill)
+            draw.polygon([(0, lobe / 2 + lobe / 8), (extent - 1, lobe / 2 + lobe / 8), (extent / 2, extent - 1)], fill=fill)
+        else:
+            draw.ellipse((0, 0, extent - 1, extent - 1), fill=fill)
+        image.resize((size, size), Image.LANCZOS).save(path)
+    
+    digest = hashlib.sha1(f'{shape}|{color}|{size}'.encode('utf8')).hexdigest()[:16]
+    try:
+        shape_path = _cached_temp_png(f'shape_{digest}.png', render)
+    except (OSError, ValueError):
+        return None
     
-    return f"{shape_filter}:enable='between(t,{start_time},{end_time})'"
\ No newline at end of file
+    _SHAPE_PNG_CACHE[key] = shape_path
+    return shape_path
@@ -1,5 +1,5 @@
 from .rotate_flip_video import rotate_video, flip_mirror_video, rotate_and_flip_video, auto_rotate_video
-from .picture_in_picture import create_picture_in_picture, create_multi_pip, create_animated_pip
+from .picture_in_picture import create_picture_in_picture, create_multi_pip, create_animated_pip, create_chained_pip, create_pip_batch
 
 __all__ = [
     "rotate_video",
@@ -9,4 +9,6 @@ __all__ = [
     "create_picture_in_picture",
     "create_multi_pip",
     "create_animated_pip",
+    "create_chained_pip",
+    "create_pip_batch",
 ]
\ No newline at end of file
@@ -1,10 +1,240 @@
+import contextlib
 import ffmpeg
+import functools
+import math
 import os
+import subprocess
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from ..utils import (_run_with_encoder_fallback, _run_ffmpeg_cmd, _cached_probe, _mux_kwargs, _thread_kwargs,
+                     _batch_threads, _limit_ffmpeg_threads, _FAST_ENCODE_OPTIONS, _COPYABLE_AUDIO)
+
+VideoInfo = namedtuple('VideoInfo', ['width', 'height', 'duration', 'fps', 'audio_codec'])
+
+# Concurrent PiP renders per process. Every render already spreads over several cores,
+# so extra simultaneous calls (e.g. parallel MCP requests) wait for a slot instead of
+# oversubscribing the CPU
+_PIP_RENDER_SLOTS = max(1, (os.cpu_count() or 2) // 2)
+_pip_render_slots = threading.BoundedSemaphore(_PIP_RENDER_SLOTS)
+_pip_active_renders = 0
+_pip_active_lock = threading.Lock()
+
+# PiP renders are previews, so libx264 trades compression for turnaround by default
+# (hardware encoders use their _FAST_ENCODE_OPTIONS entry instead)
+_PIP_X264_OPTIONS = {
+    'preset': 'veryfast',
+    'tune': 'fastdecode'
+}
+
+# Overlay (x, y) per multi-PiP position, from (index, overlay w/h, main w/h, margin);
+# later overlays in the same position are stacked away from the edge
+_MULTI_PIP_POSITIONS = {
+    'top_left': lambda i, ow, oh, mw, mh, m: (m, m + i * (oh + 10)),
+    'top_right': lambda i, ow, oh, mw, mh, m: (mw - ow - m, m + i * (oh + 10)),
+    'bottom_left': lambda i, ow, oh, mw, mh, m: (m, mh - oh - m - i * (oh + 10)),
+    'bottom_right': lambda i, ow, oh, mw, mh, m: (mw - ow - m, mh - oh - m - i * (oh + 10)),
+    'center': lambda i, ow, oh, mw, mh, m: ((mw - ow) // 2 + i * 50, (mh - oh) // 2 + i * 50),
+}
+
+# Single-PiP positions as overlay (x, y) expressions with a 20px margin
+_PIP_POSITIONS = {
+    'top_left': ('20', '20'),
+    'top_right': ('main_w-overlay_w-20', '20'),
+    'bottom_left': ('20', 'main_h-overlay_h-20'),
+    'bottom_right': ('main_w-overlay_w-20', 'main_h-overlay_h-20'),
+    'center': ('(main_w-overlay_w)/2', '(main_h-overlay_h)/2'),
+    'top_center': ('(main_w-overlay_w)/2', '20'),
+    'bottom_center': ('(main_w-overlay_w)/2', 'main_h-overlay_h-20')
+}
+
+
+# Animation presets for create_animated_pip and create_pip_batch
+_ANIMATION_PRESETS = {
+    'slide_in_out': {
+        'timing': {'start': 5.0, 'duration': 15.0},
+        'animation': {'type': 'slide_in', 'direction': 'right', 'duration': 2.0},
+        'position': 'bottom_right',
+        'overlay_size': '30%'
+    },
+    'fade_in_out': {
+        'timing': {'start': 3.0, 'duration': 20.0},
+        'animation': {'type': 'fade_in', 'duration': 2.0},
+        'position': 'top_left',
+        'overlay_size': '25%'
+    },
+    'zoom_in_out': {
+        'timing': {'start': 2.0, 'duration': 10.0},
+        'animation': {'type': 'fade_in', 'duration': 1.5},
+        'position': 'center',
+        'overlay_size': '40%'
+    },
+    'bounce_in': {
+        'timing': {'start': 1.0, 'duration': 25.0},
+        'animation': {'type': 'slide_in', 'direction': 'top', 'duration': 1.0},
+        'position': 'top_right',
+        'overlay_size': '20%'
+    },
+    'rotate_in': {
+        'timing': {'start': 4.0, 'duration': 12.0},
+        'animation': {'type': 'fade_in', 'duration': 1.5},
+        'position': 'bottom_left',
+        'overlay_size': '35%'
+    }
+}
+
+
+def _probe_video(path: str) -> VideoInfo:
+    """Probe a video's dimensions, duration, frame rate and audio codec.
+    
+    Goes through _cached_probe, so repeated calls on an unchanged file skip the
+    ffprobe subprocess.
+    """
+    probe = _cached_probe(path)
+    video_stream = next(s for s in probe['streams'] if s['codec_type'] == 'video')
+    audio_stream = next((s for s in probe['streams'] if s['codec_type'] == 'audio'), None)
+    num, _, den = video_stream.get('avg_frame_rate', '0/0').partition('/')
+    fps = int(num) / int(den) if den and int(den) else 0.0
+    return VideoInfo(
+        width=int(video_stream['width']),
+        height=int(video_stream['height']),
+        duration=float(probe['format'].get('duration', 0.0)),
+        fps=fps,
+        audio_codec=audio_stream.get('codec_name') if audio_stream else None
+    )
+
+
+def _check_overlay(path: str):
+    """Probe an overlay for validation: its VideoInfo, None if missing, or an error message."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return _probe_video(path)
+    except ffmpeg.Error as e:
+        return e.stderr.decode('utf8') if e.stderr else str(e)
+    except StopIteration:
+        return "no video stream found"
+
+
+def _audio_codec_for(main_video_path: str, output_path: str) -> str:
+    """Stream-copy the main audio when the output container accepts its codec, else AAC.
+    
+    Containers without copyable codecs are decided without probing the main video.
+    """
+    copyable = _COPYABLE_AUDIO.get(os.path.splitext(output_path)[1].lower())
+    if not copyable:
+        return 'aac'
+    return 'copy' if _probe_video(main_video_path).audio_codec in copyable else 'aac'
+
+
+def _encode_options(output_path: str, vcodec: str, encoder_opts: dict = None) -> dict:
+    """Output kwargs for a PiP render: fast encoder defaults, caller overrides on top."""
+    options = dict(_PIP_X264_OPTIONS if vcodec == 'libx264' else _FAST_ENCODE_OPTIONS.get(vcodec, {}))
+    thread_kwargs = _thread_kwargs(vcodec)
+    options['threads'] = thread_kwargs['threads']
+    if 'x264-params' in thread_kwargs:
+        options['x264-params'] = thread_kwargs['x264-params']
+    options.update(_mux_kwargs(output_path))
+    options.update(encoder_opts or {})
+    return options
+
+
+@contextlib.contextmanager
+def _pip_render_slot():
+    """Hold one of the render slots, with ffmpeg threads capped at this render's share of the
+    CPU among the renders running when it starts (see _thread_kwargs)."""
+    global _pip_active_renders
+    with _pip_render_slots:
+        with _pip_active_lock:
+            _pip_active_renders += 1
+            threads = _batch_threads(_pip_active_renders)
+        try:
+            with _limit_ffmpeg_threads(threads):
+                yield
+        finally:
+            with _pip_active_lock:
+                _pip_active_renders -= 1
+
+
+def _pip_thread_args() -> list[str]:
+    """Global options pinning a PiP render's filter threads to its share of the CPU."""
+    thread_kwargs = _thread_kwargs()
+    return ['-filter_complex_threads', str(thread_kwargs['filter_complex_threads']),
+            '-filter_threads', str(thread_kwargs['filter_threads'])]
+
+
+def _pip_output_args(output_path: str, vcodec: str, main_video_path: str, encoder_opts: dict = None,
+                     video_label: str = '[vout]') -> list[str]:
+    """Map/codec arguments that encode a PiP graph's video_label plus the main audio to output_path."""
+    args = ['-map', video_label, '-map', '0:a?', '-vcodec', vcodec, '-pix_fmt', 'yuv420p',
+            '-acodec', _audio_codec_for(main_video_path, output_path)]
+    for key, value in _encode_options(output_path, vcodec, encoder_opts).items():
+        args.extend([f'-{key}', str(value)])
+    return args + [output_path]
+
+
+def _run_pip_chain(commands: list[list[str]]) -> None:
+    """Run ffmpeg command lines as one pipeline, each process feeding the next on stdin.
+    
+    Every command but the last must write NUT to 'pipe:1'. Logs go to temp files so a
+    chatty stage cannot block on a full stderr pipe; raises ffmpeg.Error carrying the
+    logs of the stages that failed.
+    """
+    procs = []
+    logs = []
+    upstream = None
+    try:
+        for i, cmd in enumerate(commands):
+            log = tempfile.TemporaryFile()
+            logs.append(log)
+            last = i == len(commands) - 1
+            proc = subprocess.Popen(cmd, stdin=upstream,
+                                    stdout=subprocess.DEVNULL if last else subprocess.PIPE,
+                                    stderr=log, bufsize=4 << 20)
+            if upstream is not None:
+                upstream.close()  # the new stage owns the read end now
+            upstream = proc.stdout
+            procs.append(proc)
+        for proc in procs:
+            proc.wait()
+        # A failing stage breaks the pipe for its neighbours too, so report every failed log
+        failures = []
+        for proc, log in zip(procs, logs):
+            if proc.returncode:
+                log.seek(0)
+                failures.append(log.read())
+        if failures:
+            raise ffmpeg.Error('ffmpeg', None, b'\n'.join(failures))
+    finally:
+        for proc in procs:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+        for log in logs:
+            log.close()
+
+
+def _render_pip_graph(input_args: list[str], filter_complex: str, output_path: str,
+                      main_video_path: str, encoder_opts: dict = None) -> None:
+    """Encode a hand-built PiP filter graph ending in [vout] over the given inputs (main video first).
+    
+    Prefers a hardware H.264 encoder, falling back to libx264; the main video's audio is carried over.
+    """
+    def run(vcodec):
+        cmd = ['ffmpeg', '-y', *_pip_thread_args(), *input_args, '-filter_complex', filter_complex,
+               *_pip_output_args(output_path, vcodec, main_video_path, encoder_opts)]
+        _run_ffmpeg_cmd(cmd)
+    
+    with _pip_render_slot():
+        _run_with_encoder_fallback(run)
+
 
 def create_picture_in_picture(main_video_path: str, overlay_video_path: str, 
                             output_video_path: str, position: str = "top_right",
                             overlay_size: str = "25%", border: dict = None,
-                            timing: dict = None, animation: dict = None) -> str:
+                            timing: dict = None, animation: dict = None,
+                            encoder_opts: dict = None) -> str:
     """Creates picture-in-picture video with customizable overlay positioning and effects.
     
     Args:
@@ -25,10 +255,14 @@ def create_picture_in_picture(main_video_path: str, overlay_video_path: str,
         timing: Optional timing configuration:
             - {'start': 10.0, 'duration': 30.0} (start at 10s for 30s)
             - {'start': 0, 'end': 60} (from start to 60s)
+            - {'start': 10.0, 'duration': 30.0, 'trim': True} (output only that window)
         animation: Optional animation configuration:
             - {'type': 'fade_in', 'duration': 2.0}
             - {'type': 'slide_in', 'direction': 'right', 'duration': 1.5}
             - {'type': 'custom', 'x': '100', 'y': '50'} (custom position)
+        encoder_opts: Optional output options overriding the fast encoder defaults,
+            e.g. {'preset': 'medium', 'crf': 20}. A hardware H.264 encoder is used when
+            available, with libx264 as the fallback
     
     Returns:
         A status message indicating success or failure.
@@ -40,203 +274,28 @@ def create_picture_in_picture(main_video_path: str, overlay_video_path: str,
         return f"Error: Overlay video file not found at {overlay_video_path}"
     
     try:
-        # Load input videos
-        main_input = ffmpeg.input(main_video_path)
-        overlay_input = ffmpeg.input(overlay_video_path)
-        
-        # Get main video properties
-        main_probe = ffmpeg.probe(main_video_path)
-        main_video_stream = next(s for s in main_probe['streams'] if s['codec_type'] == 'video')
-        main_width = int(main_video_stream['width'])
-        main_height = int(main_video_stream['height'])
-        
-        # Process overlay video
-        overlay_stream = overlay_input.video
-        
-        # Apply timing if specified
-        if timing:
-            start_time = timing.get('start', 0)
-            if 'duration' in timing:
-                duration = timing['duration']
-                overlay_stream = ffmpeg.input(overlay_video_path, ss=start_time, t=duration).video
-            elif 'end' in timing:
-                duration = timing['end'] - start_time
-                overlay_stream = ffmpeg.input(overlay_video_path, ss=start_time, t=duration).video
-        
-        # Calculate overlay dimensions
-        if overlay_size.endswith('%'):
-            # Percentage of main video width
-            percentage = float(overlay_size.rstrip('%')) / 100
-            overlay_width = int(main_width * percentage)
-            overlay_height = int(overlay_width * 9 / 16)  # Assume 16:9 aspect ratio, adjust if needed
-        elif 'x' in overlay_size:
-            # Fixed dimensions
-            overlay_width, overlay_height = map(int, overlay_size.split('x'))
-        elif overlay_size == 'auto':
-            # Auto-size to 25% width maintaining aspect ratio
-            overlay_width = int(main_width * 0.25)
-            overlay_height = int(overlay_width * 9 / 16)
-        else:
-            return f"Error: Invalid overlay_size format '{overlay_size}'"
-        
-        # Scale overlay video
-        overlay_stream = overlay_stream.filter('scale', overlay_width, overlay_height)
-        
-        # Calculate position coordinates
-        margin = 20  # Default margin from edges
+        # The main video is only probed where its properties are actually needed
+        # (percentage sizes, timing checks, audio stream-copy), and then only once
         
-        position_coords = {
-            'top_left': (margin, margin),
-            'top_right': (main_width - overlay_width - margin, margin),
-            'bottom_left': (margin, main_height - overlay_height - margin),
-            'bottom_right': (main_width - overlay_width - margin, main_height - overlay_height - margin),
-            'center': ((main_width - overlay_width) // 2, (main_height - overlay_height) // 2),
-            'top_center': ((main_width - overlay_width) // 2, margin),
-            'bottom_center': ((main_width - overlay_width) // 2, main_height - overlay_height - margin)
-        }
+        # An overlay window outside the main video leaves nothing to composite
+        if timing and not timing.get('trim') and _copy_if_overlay_hidden(main_video_path, timing, output_video_path):
+            return f"Overlay timing lies outside the main video, so it was copied unchanged. Output saved to {output_video_path}"
         
-        if position == 'custom' and animation and 'x' in animation and 'y' in animation:
-            x_pos = animation['x']
-            y_pos = animation['y']
-        elif position in position_coords:
-            x_pos, y_pos = position_coords[position]
-        else:
-            return f"Error: Invalid position '{position}'"
+        main_args, overlay_args, filter_complex = _build_pip_filtergraph(main_video_path, overlay_video_path, {
+            'position': position,
+            'overlay_size': overlay_size,
+            'border': border,
+            'timing': timing,
+            'animation': animation
+        })
         
-        # Add border if specified
-        if border:
-            border_width = border.get('width', 2)
-            border_color = border.get('color', 'white')
-            border_style = border.get('style', 'solid')
-            
-            if border_style == 'solid':
-                # Add solid border using pad filter
-                overlay_stream = overlay_stream.filter(
-                    'pad',
-                    width=overlay_width + 2 * border_width,
-                    height=overlay_height + 2 * border_width,
-                    x=border_width,
-                    y=border_width,
-                    color=border_color
-                )
-                # Adjust position for border
-                x_pos = max(0, x_pos - border_width)
-                y_pos = max(0, y_pos - border_width)
-                
-            elif border_style == 'shadow':
-                # Add drop shadow effect
-                shadow_offset = border_width
-                shadow_stream = overlay_stream.filter(
-                    'pad',
-                    width=overlay_width + shadow_offset,
-                    height=overlay_height + shadow_offset,
-                    x=shadow_offset,
-                    y=shadow_offset,
-                    color='black@0.5'
-                )
-                # Overlay original on shadow
-                overlay_stream = shadow_stream.overlay(overlay_stream, x=0, y=0)
-        
-        # Apply animation if specified
-        if animation:
-            anim_type = animation.get('type', 'none')
-            anim_duration = animation.get('duration', 1.0)
-            
-            if anim_type == 'fade_in':
-                # Fade in animation
-                overlay_stream = overlay_stream.filter(
-                    'fade',
-                    type='in',
-                    duration=anim_duration
-                )
-                
-            elif anim_type == 'slide_in':
-                direction = animation.get('direction', 'left')
-                
-                if direction == 'left':
-                    # Slide in from left
-                    start_x = -overlay_width
-                    end_x = x_pos
-                    x_expr = f"if(lt(t,{anim_duration}),{start_x}+({end_x}-{start_x})*t/{anim_duration},{end_x})"
-                    
-                elif direction == 'right':
-                    # Slide in from right  
-                    start_x = main_width
-                    end_x = x_pos
-                    x_expr = f"if(lt(t,{anim_duration}),{start_x}+({end_x}-{start_x})*t/{anim_duration},{end_x})"
-                    
-                elif direction == 'top':
-                    # Slide in from top
-                    start_y = -overlay_height
-                    end_y = y_pos
-                    y_expr = f"if(lt(t,{anim_duration}),{start_y}+({end_y}-{start_y})*t/{anim_duration},{end_y})"
-                    x_expr = str(x_pos)
-                    
-                elif direction == 'bottom':
-                    # Slide in from bottom
-                    start_y = main_height
-                    end_y = y_pos
-                    y_expr = f"if(lt(t,{anim_duration}),{start_y}+({end_y}-{start_y})*t/{anim_duration},{end_y})"
-                    x_expr = str(x_pos)
-                
-                # For left/right slides, y is constant
-                if direction in ['left', 'right']:
-                    y_expr = str(y_pos)
-                
-                # Note: Dynamic positioning would require more complex filter setup
-                # For now, use static position
-                x_pos = x_expr if isinstance(x_expr, (int, str)) and str(x_expr).isdigit() else x_pos
-                y_pos = y_expr if isinstance(y_expr, (int, str)) and str(y_expr).isdigit() else y_pos
-        
-        # Apply PiP overlay
-        if timing:
-            # Time-limited overlay
-            start_time = timing.get('start', 0)
-            if 'duration' in timing:
-                end_time = start_time + timing['duration']
-            elif 'end' in timing:
-                end_time = timing['end']
-            else:
-                end_time = None
-            
-            if end_time:
-                enable_expr = f"between(t,{start_time},{end_time})"
-                pip_stream = main_input.video.overlay(
-                    overlay_stream,
-                    x=x_pos,
-                    y=y_pos,
-                    enable=enable_expr
-                )
-            else:
-                pip_stream = main_input.video.overlay(
-                    overlay_stream,
-                    x=x_pos,
-                    y=y_pos
-                )
-        else:
-            # Full duration overlay
-            pip_stream = main_input.video.overlay(
-                overlay_stream,
-                x=x_pos,
-                y=y_pos
-            )
-        
-        # Handle audio - mix both tracks or use main audio
-        audio_stream = main_input.audio
-        
-        # Create output
-        output = ffmpeg.output(
-            pip_stream,
-            audio_stream,
-            output_video_path,
-            vcodec='libx264',
-            acodec='aac'
-        )
-        
-        output.run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+        # Create output (GPU encoder when available)
+        _render_pip_graph(main_args + overlay_args, filter_complex, output_video_path, main_video_path, encoder_opts)
         
         return f"Picture-in-picture video created successfully. Position: {position}, Size: {overlay_size}. Output saved to {output_video_path}"
         
+    except ValueError as e:
+        return f"Error: {e}"
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
         return f"Error creating picture-in-picture: {error_message}"
@@ -244,8 +303,188 @@ def create_picture_in_picture(main_video_path: str, overlay_video_path: str,
         return f"An unexpected error occurred: {str(e)}"
 
 
+PipSpec = namedtuple('PipSpec', ['width_fraction', 'fixed_size', 'x', 'y', 'border', 'fade_duration'])
+
+
+def _freeze(settings: dict):
+    return tuple(sorted(settings.items())) if settings else None
+
+
+def _pip_spec(position: str, overlay_size: str, border: dict, animation: dict) -> PipSpec:
+    """Resolve PiP settings to a PipSpec, memoized per distinct configuration."""
+    key = (position, overlay_size, _freeze(border), _freeze(animation))
+    try:
+        return _compile_pip_spec(*key)
+    except TypeError:
+        # Unhashable setting values cannot be cached, but still compile
+        return _compile_pip_spec.__wrapped__(*key)
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_pip_spec(position: str, overlay_size: str, border_key: tuple, animation_key: tuple) -> PipSpec:
+    """Partially evaluate the PiP settings into what the graph builder needs.
+    
+    Only the main video's width is left open (percentage sizes). Raises ValueError
+    for an invalid size or position.
+    """
+    border = dict(border_key or ())
+    animation = dict(animation_key or ())
+    
+    # Calculate overlay dimensions
+    width_fraction = fixed_size = None
+    if overlay_size.endswith('%'):
+        # Percentage of main video width
+        width_fraction = float(overlay_size.rstrip('%')) / 100
+    elif 'x' in overlay_size:
+        # Fixed dimensions
+        fixed_size = tuple(map(int, overlay_size.split('x')))
+    elif overlay_size == 'auto':
+        # Auto-size to 25% width maintaining aspect ratio
+        width_fraction = 0.25
+    else:
+        raise ValueError(f"Invalid overlay_size format '{overlay_size}'")
+    
+    # Calculate position coordinates (overlay expressions, evaluated against the final
+    # overlay size, so borders and shadows are kept inside the margin)
+    if position == 'custom' and 'x' in animation and 'y' in animation:
+        x_pos = animation['x']
+        y_pos = animation['y']
+    elif position in _PIP_POSITIONS:
+        x_pos, y_pos = _PIP_POSITIONS[position]
+    else:
+        raise ValueError(f"Invalid position '{position}'")
+    
+    border_spec = None
+    if border:
+        border_style = border.get('style', 'solid')
+        border_width = border.get('width', 2)
+        if border_style in ('solid', 'shadow'):
+            border_spec = (border_style, border_width, border.get('color', 'white'))
+        # Custom pixel positions place the video itself, so a solid border goes around it
+        if border_style == 'solid' and isinstance(x_pos, (int, float)) and isinstance(y_pos, (int, float)):
+            x_pos = max(0, x_pos - border_width)
+            y_pos = max(0, y_pos - border_width)
+    
+    # Only fade_in changes the render; slide_in keeps the static position, since a
+    # moving overlay would need per-frame x/y evaluation
+    fade_duration = None
+    if animation.get('type') == 'fade_in':
+        fade_duration = animation.get('duration', 1.0)
+    
+    return PipSpec(width_fraction, fixed_size, x_pos, y_pos, border_spec, fade_duration)
+
+
+def _overlay_window(timing: dict) -> tuple:
+    """(start, end) of the overlay on the main video's timeline; end is None when open-ended."""
+    start_time = end_time = None
+    if timing:
+        start_time = timing.get('start', 0)
+        if 'duration' in timing:
+            end_time = start_time + timing['duration']
+        elif 'end' in timing:
+            end_time = timing['end']
+    return start_time, end_time
+
+
+def _copy_if_overlay_hidden(main_video_path: str, timing: dict, output_path: str) -> bool:
+    """Stream-copy the main video to output_path when the overlay window misses it entirely.
+    
+    Returns True if the copy was made; False when the overlay is visible (or the copy
+    failed, e.g. a codec the output container cannot hold) and a full render is needed.
+    """
+    start_time, end_time = _overlay_window(timing)
+    if start_time is None:
+        return False
+    main_info = _probe_video(main_video_path)
+    if not ((end_time is not None and end_time <= 0) or (main_info.duration and start_time >= main_info.duration)):
+        return False
+    cmd = ['ffmpeg', '-y', '-i', main_video_path, '-map', '0', '-c', 'copy']
+    if os.path.splitext(output_path)[1].lower() in ('.mp4', '.m4v', '.mov'):
+        cmd.extend(['-movflags', '+faststart'])
+    try:
+        _run_ffmpeg_cmd(cmd + [output_path])
+    except ffmpeg.Error:
+        return False
+    return True
+
+
+def _build_pip_filtergraph(main_video_path: str, overlay_video_path: str, config: dict,
+                           piped: bool = False, main_label: str = '[0:v]', overlay_index: int = 1,
+                           tag: str = '') -> tuple:
+    """Build the ffmpeg inputs and overlay graph for one PiP configuration.
+    
+    `config` holds the position, overlay_size, border, timing and animation settings
+    of create_picture_in_picture. With `piped` the main frames are read as NUT from
+    stdin and main_video_path is only probed for its size.
+    
+    Returns (main_input_args, overlay_input_args, filter_complex). The graph reads
+    `main_label` and input `overlay_index` and ends in [vout<tag>]; `tag` keeps the
+    labels of several graphs in one filter_complex apart. Raises ValueError for an
+    invalid size or position.
+    """
+    timing = config.get('timing')
+    start_time, end_time = _overlay_window(timing)
+    
+    # timing['trim'] cuts the output down to the overlay window. The main video is then
+    # seeked on the input side (a keyframe jump) instead of being decoded from zero
+    trim = bool(timing and timing.get('trim'))
+    main_args = ['-f', 'nut'] if piped else []
+    if trim:
+        main_args.extend(['-ss', str(start_time)])
+        if end_time is not None:
+            main_args.extend(['-t', str(end_time - start_time)])
+    main_args.extend(['-i', 'pipe:0' if piped else main_video_path])
+    
+    # Overlay video, cut to the timing window with input options when one is set
+    overlay_args = []
+    if end_time is not None:
+        overlay_args.extend(['-ss', str(start_time), '-t', str(end_time - start_time)])
+    overlay_args.extend(['-i', overlay_video_path])
+    
+    # Size, position, border and animation depend only on the settings, so they are
+    # resolved once per distinct configuration and reused (see _compile_pip_spec)
+    spec = _pip_spec(config['position'], config['overlay_size'], config.get('border'), config.get('animation'))
+    if spec.fixed_size:
+        overlay_width, overlay_height = spec.fixed_size
+    else:
+        overlay_width = int(_probe_video(main_video_path).width * spec.width_fraction)
+        overlay_height = int(overlay_width * 9 / 16)  # Assume 16:9 aspect ratio, adjust if needed
+    
+    # The overlay branch is one linear chain, apart from the shadow's split
+    chains = []
+    overlay_chain = f'[{overlay_index}:v]scale={overlay_width}:{overlay_height}'
+    if spec.border:
+        border_style, border_width, border_color = spec.border
+        
+        if border_style == 'solid':
+            # Add solid border using pad filter
+            overlay_chain += (f',pad={overlay_width + 2 * border_width}:{overlay_height + 2 * border_width}'
+                              f':{border_width}:{border_width}:color={border_color}')
+        
+        elif border_style == 'shadow':
+            # Add drop shadow effect: a padded copy underneath, the video on top
+            shadow_offset = border_width
+            chains.append(f'{overlay_chain},split[ovtop{tag}][ovbase{tag}]')
+            chains.append(f'[ovbase{tag}]pad={overlay_width + shadow_offset}:{overlay_height + shadow_offset}'
+                          f':{shadow_offset}:{shadow_offset}:color=black@0.5[ovshadow{tag}]')
+            overlay_chain = f'[ovshadow{tag}][ovtop{tag}]overlay=0:0'
+    
+    # Apply animation if specified
+    if spec.fade_duration is not None:
+        overlay_chain += f',fade=type=in:duration={spec.fade_duration}'
+    chains.append(f'{overlay_chain}[ov{tag}]')
+    
+    # Apply PiP overlay, time-limited unless the output is already trimmed to the window
+    enable = ''
+    if end_time and not trim:
+        enable = f":enable='between(t,{start_time},{end_time})'"
+    chains.append(f"{main_label}[ov{tag}]overlay=x='{spec.x}':y='{spec.y}'{enable}[vout{tag}]")
+    
+    return main_args, overlay_args, ';'.join(chains)
+
+
 def create_multi_pip(main_video_path: str, overlay_videos: list[dict], 
-                    output_video_path: str, layout: str = "auto") -> str:
+                    output_video_path: str, layout: str = "auto", encoder_opts: dict = None) -> str:
     """Creates multiple picture-in-picture overlays on a single main video.
     
     Args:
@@ -257,6 +496,7 @@ def create_multi_pip(main_video_path: str, overlay_videos: list[dict],
             - 'timing': Optional timing configuration
         output_video_path: Path to save the multi-PiP video
         layout: Layout preset ('auto', 'corners', 'sides', 'grid')
+        encoder_opts: Optional output options overriding the fast encoder defaults
     
     Returns:
         A status message indicating success or failure.
@@ -271,18 +511,22 @@ def create_multi_pip(main_video_path: str, overlay_videos: list[dict],
     for i, overlay in enumerate(overlay_videos):
         if 'path' not in overlay:
             return f"Error: Overlay {i+1} missing 'path' field"
-        if not os.path.exists(overlay['path']):
+    
+    # Stat and probe the overlays concurrently (I/O bound, threads suffice), so slow
+    # storage costs the longest single check rather than the sum of all of them
+    with ThreadPoolExecutor(max_workers=min(len(overlay_videos), 8)) as executor:
+        probes = list(executor.map(_check_overlay, [overlay['path'] for overlay in overlay_videos]))
+    for i, (overlay, probe) in enumerate(zip(overlay_videos, probes)):
+        if probe is None:
             return f"Error: Overlay video {i+1} not found at {overlay['path']}"
+        if isinstance(probe, str):
+            return f"Error: Could not read overlay video {i+1} at {overlay['path']}: {probe}"
     
     try:
-        main_input = ffmpeg.input(main_video_path)
-        current_stream = main_input.video
-        
         # Get main video dimensions
-        main_probe = ffmpeg.probe(main_video_path)
-        main_video_stream = next(s for s in main_probe['streams'] if s['codec_type'] == 'video')
-        main_width = int(main_video_stream['width'])
-        main_height = int(main_video_stream['height'])
+        main_info = _probe_video(main_video_path)
+        main_width = main_info.width
+        main_height = main_info.height
         
         # Auto-assign positions if using layout presets
         if layout == "corners" and len(overlay_videos) <= 4:
@@ -318,12 +562,13 @@ def create_multi_pip(main_video_path: str, overlay_videos: list[dict],
                         overlay['animation'] = {}
                     overlay['animation'].update({'x': x, 'y': y})
         
-        # Process each overlay
+        # Build the whole graph as one filter_complex: every overlay is scaled on its own
+        # input label, the overlays are chained onto the main video, and the pixel format
+        # is fixed once at the tail instead of between overlays
+        scale_chains = []
+        overlay_chains = []
+        current_label = '[0:v]'
         for i, overlay_config in enumerate(overlay_videos):
-            overlay_path = overlay_config['path']
-            overlay_input = ffmpeg.input(overlay_path)
-            overlay_stream = overlay_input.video
-            
             # Apply size
             size = overlay_config.get('size', '20%')
             if size.endswith('%'):
@@ -336,29 +581,21 @@ def create_multi_pip(main_video_path: str, overlay_videos: list[dict],
                 overlay_width = int(main_width * 0.2)
                 overlay_height = int(overlay_width * 9 / 16)
             
-            overlay_stream = overlay_stream.filter('scale', overlay_width, overlay_height)
+            scale_chains.append(f'[{i + 1}:v]scale={overlay_width}:{overlay_height}[o{i}]')
             
             # Calculate position
             position = overlay_config.get('position', 'top_left')
             margin = 20 + i * 10  # Slight offset for multiple overlays
             
-            position_coords = {
-                'top_left': (margin, margin + i * (overlay_height + 10)),
-                'top_right': (main_width - overlay_width - margin, margin + i * (overlay_height + 10)),
-                'bottom_left': (margin, main_height - overlay_height - margin - i * (overlay_height + 10)),
-                'bottom_right': (main_width - overlay_width - margin, main_height - overlay_height - margin - i * (overlay_height + 10)),
-                'center': ((main_width - overlay_width) // 2 + i * 50, (main_height - overlay_height) // 2 + i * 50),
-            }
-            
             if position == 'custom' and 'animation' in overlay_config:
                 x_pos = overlay_config['animation'].get('x', 100)
                 y_pos = overlay_config['animation'].get('y', 100)
-            elif position in position_coords:
-                x_pos, y_pos = position_coords[position]
             else:
-                x_pos, y_pos = position_coords['top_left']
+                position_fn = _MULTI_PIP_POSITIONS.get(position, _MULTI_PIP_POSITIONS['top_left'])
+                x_pos, y_pos = position_fn(i, overlay_width, overlay_height, main_width, main_height, margin)
             
             # Apply timing if specified
+            enable = ''
             timing = overlay_config.get('timing')
             if timing:
                 start_time = timing.get('start', 0)
@@ -370,28 +607,19 @@ def create_multi_pip(main_video_path: str, overlay_videos: list[dict],
                     end_time = None
                 
                 if end_time:
-                    enable_expr = f"between(t,{start_time},{end_time})"
-                    current_stream = current_stream.overlay(
-                        overlay_stream,
-                        x=x_pos,
-                        y=y_pos,
-                        enable=enable_expr
-                    )
-                else:
-                    current_stream = current_stream.overlay(overlay_stream, x=x_pos, y=y_pos)
-            else:
-                current_stream = current_stream.overlay(overlay_stream, x=x_pos, y=y_pos)
+                    enable = f":enable='between(t,{start_time},{end_time})'"
+            
+            next_label = f'[bg{i}]'
+            overlay_chains.append(f'{current_label}[o{i}]overlay={x_pos}:{y_pos}{enable}{next_label}')
+            current_label = next_label
         
-        # Create output
-        output = ffmpeg.output(
-            current_stream,
-            main_input.audio,
-            output_video_path,
-            vcodec='libx264',
-            acodec='aac'
-        )
+        filter_complex = ';'.join(scale_chains + overlay_chains + [f'{current_label}format=yuv420p[vout]'])
         
-        output.run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+        # Create output (GPU encoder when available)
+        input_args = ['-i', main_video_path]
+        for overlay in overlay_videos:
+            input_args.extend(['-i', overlay['path']])
+        _render_pip_graph(input_args, filter_complex, output_video_path, main_video_path, encoder_opts)
         
         return f"Multi picture-in-picture video created successfully with {len(overlay_videos)} overlays using '{layout}' layout. Output saved to {output_video_path}"
         
@@ -402,8 +630,74 @@ def create_multi_pip(main_video_path: str, overlay_videos: list[dict],
         return f"An unexpected error occurred: {str(e)}"
 
 
+def create_chained_pip(main_video_path: str, stages: list[dict], output_video_path: str,
+                       encoder_opts: dict = None) -> str:
+    """Applies several picture-in-picture passes in sequence without intermediate files.
+    
+    Each stage reads the previous stage's frames as raw video over a pipe, so only the
+    final output is encoded and nothing is written to disk in between.
+    
+    Args:
+        main_video_path: Path to the main/background video
+        stages: List of PiP passes, applied in order. Each holds 'overlay_path' plus any
+            of create_picture_in_picture's 'position', 'overlay_size', 'border', 'timing'
+            and 'animation' settings
+        output_video_path: Path to save the final video
+        encoder_opts: Optional output options overriding the fast encoder defaults
+    
+    Returns:
+        A status message indicating success or failure.
+    """
+    if not os.path.exists(main_video_path):
+        return f"Error: Main video file not found at {main_video_path}"
+    
+    if not stages:
+        return "Error: No PiP stages provided"
+    
+    for i, stage in enumerate(stages):
+        if 'overlay_path' not in stage:
+            return f"Error: Stage {i+1} missing 'overlay_path' field"
+        if not os.path.exists(stage['overlay_path']):
+            return f"Error: Overlay video for stage {i+1} not found at {stage['overlay_path']}"
+    
+    try:
+        # Overlays keep the frame size, so every stage sizes against the main video
+        configs = [dict({'position': 'top_right', 'overlay_size': '25%'}, **stage) for stage in stages]
+        graphs = [
+            _build_pip_filtergraph(main_video_path, config['overlay_path'], config, piped=i > 0)
+            for i, config in enumerate(configs)
+        ]
+        
+        def run(vcodec):
+            commands = [
+                ['ffmpeg', '-y', *_pip_thread_args(), *main_args, *overlay_args, '-filter_complex', filter_complex,
+                 '-map', '[vout]', '-map', '0:a?',
+                 '-vcodec', 'rawvideo', '-acodec', 'copy', '-f', 'nut', 'pipe:1']
+                for main_args, overlay_args, filter_complex in graphs[:-1]
+            ]
+            main_args, overlay_args, filter_complex = graphs[-1]
+            commands.append(['ffmpeg', '-y', *_pip_thread_args(), *main_args, *overlay_args, '-filter_complex', filter_complex,
+                             *_pip_output_args(output_video_path, vcodec, main_video_path, encoder_opts)])
+            _run_pip_chain(commands)
+        
+        # Create output (GPU encoder when available)
+        with _pip_render_slot():
+            _run_with_encoder_fallback(run)
+        
+        return f"Chained picture-in-picture video created successfully with {len(stages)} stages. Output saved to {output_video_path}"
+        
+    except ValueError as e:
+        return f"Error: {e}"
+    except ffmpeg.Error as e:
+        error_message = e.stderr.decode('utf8') if e.stderr else str(e)
+        return f"Error creating chained picture-in-picture: {error_message}"
+    except Exception as e:
+        return f"An unexpected error occurred: {str(e)}"
+
+
 def create_animated_pip(main_video_path: str, overlay_video_path: str,
-                       output_video_path: str, animation_preset: str = "slide_in_out") -> str:
+                       output_video_path: str, animation_preset: str = "slide_in_out",
+                       encoder_opts: dict = None) -> str:
     """Creates picture-in-picture with predefined animation presets.
     
     Args:
@@ -416,56 +710,110 @@ def create_animated_pip(main_video_path: str, overlay_video_path: str,
             - 'zoom_in_out': Zoom in from center, zoom out
             - 'bounce_in': Bouncing entrance animation
             - 'rotate_in': Rotating entrance animation
+        encoder_opts: Optional output options overriding the fast encoder defaults
     
     Returns:
         A status message indicating success or failure.
     """
-    # Animation presets with specific configurations
-    animation_configs = {
-        'slide_in_out': {
-            'timing': {'start': 5.0, 'duration': 15.0},
-            'animation': {'type': 'slide_in', 'direction': 'right', 'duration': 2.0},
-            'position': 'bottom_right',
-            'overlay_size': '30%'
-        },
-        'fade_in_out': {
-            'timing': {'start': 3.0, 'duration': 20.0},
-            'animation': {'type': 'fade_in', 'duration': 2.0},
-            'position': 'top_left',
-            'overlay_size': '25%'
-        },
-        'zoom_in_out': {
-            'timing': {'start': 2.0, 'duration': 10.0},
-            'animation': {'type': 'fade_in', 'duration': 1.5},
-            'position': 'center',
-            'overlay_size': '40%'
-        },
-        'bounce_in': {
-            'timing': {'start': 1.0, 'duration': 25.0},
-            'animation': {'type': 'slide_in', 'direction': 'top', 'duration': 1.0},
-            'position': 'top_right',
-            'overlay_size': '20%'
-        },
-        'rotate_in': {
-            'timing': {'start': 4.0, 'duration': 12.0},
-            'animation': {'type': 'fade_in', 'duration': 1.5},
-            'position': 'bottom_left',
-            'overlay_size': '35%'
-        }
-    }
-    
-    if animation_preset not in animation_configs:
-        available_presets = ', '.join(animation_configs.keys())
+    if animation_preset not in _ANIMATION_PRESETS:
+        available_presets = ', '.join(_ANIMATION_PRESETS.keys())
         return f"Error: Unknown animation preset '{animation_preset}'. Available presets: {available_presets}"
     
-    config = animation_configs[animation_preset]
-    
-    return create_picture_in_picture(
-        main_video_path=main_video_path,
-        overlay_video_path=overlay_video_path,
-        output_video_path=output_video_path,
-        position=config['position'],
-        overlay_size=config['overlay_size'],
-        timing=config['timing'],
-        animation=config['animation']
-    )
\ No newline at end of file
+    config = _ANIMATION_PRESETS[animation_preset]
+    
+    if not os.path.exists(main_video_path):
+        return f"Error: Main video file not found at {main_video_path}"
+    
+    if not os.path.exists(overlay_video_path):
+        return f"Error: Overlay video file not found at {overlay_video_path}"
+    
+    try:
+        # Build the preset's graph directly and encode it in a single ffmpeg run
+        if _copy_if_overlay_hidden(main_video_path, config['timing'], output_video_path):
+            return f"Overlay timing lies outside the main video, so it was copied unchanged. Output saved to {output_video_path}"
+        
+        main_args, overlay_args, filter_complex = _build_pip_filtergraph(main_video_path, overlay_video_path, config)
+        
+        _render_pip_graph(main_args + overlay_args, filter_complex, output_video_path, main_video_path, encoder_opts)
+        
+        return f"Animated picture-in-picture video created successfully with '{animation_preset}' preset. Output saved to {output_video_path}"
+        
+    except ValueError as e:
+        return f"Error: {e}"
+    except ffmpeg.Error as e:
+        error_message = e.stderr.decode('utf8') if e.stderr else str(e)
+        return f"Error creating animated picture-in-picture: {error_message}"
+    except Exception as e:
+        return f"An unexpected error occurred: {str(e)}"
+
+
+def create_pip_batch(main_video_path: str, overlay_video_path: str, output_video_paths: list[str],
+                     animation_presets: list[str], encoder_opts: dict = None) -> str:
+    """Renders several animated PiP presets of the same clip pair in one ffmpeg run.
+    
+    The main video is decoded once and split between the presets, instead of once per
+    create_animated_pip call.
+    
+    Args:
+        main_video_path: Path to the main video
+        overlay_video_path: Path to the overlay video
+        output_video_paths: One output path per preset, in the same order
+        animation_presets: Presets to render (see create_animated_pip)
+        encoder_opts: Optional output options overriding the fast encoder defaults
+    
+    Returns:
+        A status message indicating success or failure.
+    """
+    if not animation_presets:
+        return "Error: No animation presets provided"
+    
+    if len(output_video_paths) != len(animation_presets):
+        return f"Error: Expected {len(animation_presets)} output paths, got {len(output_video_paths)}"
+    
+    unknown = [preset for preset in animation_presets if preset not in _ANIMATION_PRESETS]
+    if unknown:
+        available_presets = ', '.join(_ANIMATION_PRESETS.keys())
+        return f"Error: Unknown animation preset '{unknown[0]}'. Available presets: {available_presets}"
+    
+    if not os.path.exists(main_video_path):
+        return f"Error: Main video file not found at {main_video_path}"
+    
+    if not os.path.exists(overlay_video_path):
+        return f"Error: Overlay video file not found at {overlay_video_path}"
+    
+    try:
+        # One main input split N ways; each preset keeps its own overlay input, since
+        # the presets seek the overlay to different windows
+        count = len(animation_presets)
+        main_labels = [f'[main{i}]' for i in range(count)]
+        chains = [f"[0:v]split={count}{''.join(main_labels)}" if count > 1 else '[0:v]null[main0]']
+        input_args = ['-i', main_video_path]
+        for i, preset in enumerate(animation_presets):
+            _, overlay_args, filter_complex = _build_pip_filtergraph(
+                main_video_path, overlay_video_path, _ANIMATION_PRESETS[preset],
+                main_label=main_labels[i], overlay_index=i + 1, tag=str(i)
+            )
+            input_args.extend(overlay_args)
+            chains.append(filter_complex)
+        filter_complex = ';'.join(chains)
+        
+        def run(vcodec):
+            cmd = ['ffmpeg', '-y', *_pip_thread_args(), *input_args, '-filter_complex', filter_complex]
+            for i, output_path in enumerate(output_video_paths):
+                cmd.extend(_pip_output_args(output_path, vcodec, main_video_path, encoder_opts,
+                                            video_label=f'[vout{i}]'))
+            _run_ffmpeg_cmd(cmd)
+        
+        # Create outputs (GPU encoder when available)
+        with _pip_render_slot():
+            _run_with_encoder_fallback(run)
+        
+        return f"Batch picture-in-picture created successfully for {count} presets ({', '.join(animation_presets)}). Outputs saved to {', '.join(output_video_paths)}"
+        
+    except ValueError as e:
+        return f"Error: {e}"
+    except ffmpeg.Error as e:
+        error_message = e.stderr.decode('utf8') if e.stderr else str(e)
+        return f"Error creating batch picture-in-picture: {error_message}"
+    except Exception as e:
+        return f"An unexpected error occurred: {str(e)}"
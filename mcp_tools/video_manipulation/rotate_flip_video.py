@@ -2,9 +2,150 @@ import ffmpeg
 import os
 import math
 
+from ..utils import (_run_with_encoder_fallback, _pick_encoder, _available_filters, _thread_kwargs, _cached_probe,
+                     _mux_kwargs, _quality_kwargs, _invalid_quality_profile)
+
+# transpose_npp directions for each lossless rotation (180° is two clockwise turns)
+_NPP_TRANSPOSE = {90: ('clock',), 180: ('clock', 'clock'), 270: ('cclock',)}
+
+# Clockwise quarter-turn rotation followed by an optional flip, reduced to the one
+# equivalent filter pass. 180° is hflip+vflip rather than two transposes: vflip only
+# reverses the line order, so the pair costs a single copy instead of two full passes
+_ORIENTATION_FILTERS = {
+    (0, None): (),
+    (0, 'horizontal'): (('hflip',),),
+    (0, 'vertical'): (('vflip',),),
+    (0, 'both'): (('hflip',), ('vflip',)),
+    (90, None): (('transpose', 1),),
+    (90, 'horizontal'): (('transpose', 0),),
+    (90, 'vertical'): (('transpose', 3),),
+    (90, 'both'): (('transpose', 2),),
+    (180, None): (('hflip',), ('vflip',)),
+    (180, 'horizontal'): (('vflip',),),
+    (180, 'vertical'): (('hflip',),),
+    (180, 'both'): (),
+    (270, None): (('transpose', 2),),
+    (270, 'horizontal'): (('transpose', 3),),
+    (270, 'vertical'): (('transpose', 0),),
+    (270, 'both'): (('transpose', 1),),
+}
+
+
+# flip_mirror_video operations as (rotation, flip) entries of _ORIENTATION_FILTERS.
+# The diagonal flips are transposes: 90° plus a horizontal or vertical flip
+_FLIP_OPERATIONS = {
+    'horizontal': (0, 'horizontal'),
+    'hflip': (0, 'horizontal'),
+    'vertical': (0, 'vertical'),
+    'vflip': (0, 'vertical'),
+    'both': (0, 'both'),
+    'diagonal': (90, 'horizontal'),
+    'anti_diagonal': (90, 'vertical'),
+}
+
+
+# rotate fillcolor for each solid fill mode of rotate_video
+_FILL_COLORS = {'black': 'black', 'white': 'white', 'transparent': 'none'}
+
+
+def _millidegrees(rotation_angle: float, rotation_type: str) -> int:
+    """Rounds an angle in degrees or radians to whole millidegrees.
+    
+    Quarter-turn checks on the integer are exact, so 90.0000001° or math.pi/2 radians
+    still take the lossless paths that float modulo would miss.
+    """
+    degrees = rotation_angle if rotation_type == "degrees" else math.degrees(rotation_angle)
+    return int(round(degrees * 1000))
+
+
+def _apply_orientation(video_stream, rotation: int, flip: str = None):
+    """Rotates video_stream clockwise by 0/90/180/270 degrees, then flips it, in one filter pass."""
+    for name, *args in _ORIENTATION_FILTERS[(rotation % 360, flip)]:
+        video_stream = video_stream.filter(name, *args)
+    return video_stream
+
+
+def _apply_geometry(video_stream, angle_milli: int = 0, flip: str = None,
+                    fillcolor: str = 'black', use_transpose: bool = True):
+    """Rotates video_stream clockwise by angle_milli millidegrees, then flips it.
+    
+    Quarter turns fold into the flip as one transpose/flip pass (see
+    _ORIENTATION_FILTERS) unless use_transpose is off. Other angles use a single
+    rotate node, without interpolation within 0.01 rad of a quarter turn, followed by
+    the flip.
+    """
+    if use_transpose and angle_milli % 90000 == 0:
+        return _apply_orientation(video_stream, angle_milli // 1000, flip)
+    
+    rotate_args = {'angle': math.radians(angle_milli / 1000), 'fillcolor': fillcolor}
+    offset = angle_milli % 90000
+    if min(offset, 90000 - offset) < 573:
+        rotate_args['bilinear'] = 0
+    return _apply_orientation(video_stream.filter('rotate', **rotate_args), 0, flip)
+
+
+def _encode_with_audio(video_stream, audio_stream, output_video_path: str,
+                       quality_profile: str = 'fast', **output_args) -> None:
+    """Encodes video_stream plus audio_stream with the preferred H.264 encoder (GPU when available)."""
+    def run(vcodec):
+        ffmpeg.output(
+            video_stream,
+            audio_stream,
+            output_video_path,
+            vcodec=vcodec,
+            **_quality_kwargs(vcodec, quality_profile),
+            **_thread_kwargs(vcodec),
+            **_mux_kwargs(output_video_path),
+            **output_args
+        ).run(capture_stderr=True, overwrite_output=True)
+    
+    _run_with_encoder_fallback(run)
+
+
+def _stream_copy(input_video_path: str, output_video_path: str) -> None:
+    """Remuxes the input unchanged, for operations that leave every pixel in place."""
+    ffmpeg.input(input_video_path).output(output_video_path, c='copy', avoid_negative_ts='make_zero',
+                                          **_mux_kwargs(output_video_path)).run(
+        capture_stderr=True, overwrite_output=True
+    )
+
+
+def _rotate_on_gpu(input_video_path: str, output_video_path: str, angle: int,
+                   quality_profile: str = 'fast') -> bool:
+    """Rotates by 90, 180 or 270 degrees without frames leaving the GPU.
+    
+    Decodes with CUDA, transposes with transpose_npp and encodes with NVENC, so no
+    raw frame is copied between host and device. Returns False when the host lacks
+    NVENC/NPP or the pipeline fails (e.g. a codec NVDEC can't decode), leaving the
+    caller to rotate on the CPU.
+    """
+    if _pick_encoder() != 'h264_nvenc' or 'transpose_npp' not in _available_filters():
+        return False
+    
+    input_stream = ffmpeg.input(input_video_path, hwaccel='cuda', hwaccel_output_format='cuda')
+    video_stream = input_stream.video
+    for direction in _NPP_TRANSPOSE[angle]:
+        video_stream = video_stream.filter('transpose_npp', dir=direction)
+    
+    try:
+        ffmpeg.output(
+            video_stream,
+            input_stream.audio,
+            output_video_path,
+            vcodec='h264_nvenc',
+            acodec='copy',
+            **_quality_kwargs('h264_nvenc', quality_profile),
+            **_mux_kwargs(output_video_path)
+        ).run(capture_stderr=True, overwrite_output=True)
+    except ffmpeg.Error:
+        return False
+    return True
+
+
 def rotate_video(input_video_path: str, output_video_path: str,
                 rotation_angle: float, rotation_type: str = "degrees",
-                fill_mode: str = "black", maintain_quality: bool = True) -> str:
+                fill_mode: str = "black", maintain_quality: bool = True,
+                quality_profile: str = "fast") -> str:
     """Rotates video by specified angle with various options for handling aspect ratio changes.
     
     Args:
@@ -21,6 +162,9 @@ def rotate_video(input_video_path: str, output_video_path: str,
             - 'mirror': Mirror edge pixels
             - 'transparent': Transparent fill (for supported formats)
         maintain_quality: Whether to use lossless rotation for 90° increments
+        quality_profile: Encoder speed/quality trade-off for re-encoded output:
+            'archive' (slow, CRF 18), 'balanced' (libx264 defaults), 'fast' (veryfast,
+            CRF 24) or 'preview' (ultrafast, CRF 28)
     
     Returns:
         A status message indicating success or failure.
@@ -28,71 +172,36 @@ def rotate_video(input_video_path: str, output_video_path: str,
     if not os.path.exists(input_video_path):
         return f"Error: Input video file not found at {input_video_path}"
     
+    profile_error = _invalid_quality_profile(quality_profile)
+    if profile_error:
+        return profile_error
+    
     try:
-        input_stream = ffmpeg.input(input_video_path)
+        rotation_desc = f"{rotation_angle}°" if rotation_type == "degrees" else f"{rotation_angle} rad"
+        angle_milli = _millidegrees(rotation_angle, rotation_type)
+        lossless = maintain_quality and angle_milli % 90000 == 0
         
-        # Convert angle to radians if needed
-        if rotation_type == "degrees":
-            angle_rad = math.radians(rotation_angle)
-        else:
-            angle_rad = rotation_angle
+        # Full turns change nothing, so the streams are copied instead of re-encoded
+        if lossless and angle_milli % 360000 == 0:
+            _stream_copy(input_video_path, output_video_path)
+            return f"Video rotated successfully by {rotation_desc} with {fill_mode} fill. Output saved to {output_video_path}"
         
-        # Check if it's a 90-degree increment for lossless rotation
-        if maintain_quality and rotation_type == "degrees" and rotation_angle % 90 == 0:
-            # Use transpose for lossless 90-degree rotations
-            video_stream = input_stream.video
-            
-            if rotation_angle % 360 == 90:
-                video_stream = video_stream.filter('transpose', 1)  # 90° clockwise
-            elif rotation_angle % 360 == 180:
-                video_stream = video_stream.filter('transpose', 1).filter('transpose', 1)  # 180°
-            elif rotation_angle % 360 == 270:
-                video_stream = video_stream.filter('transpose', 2)  # 90° counter-clockwise
-            else:  # 0° or 360°
-                video_stream = video_stream  # No rotation needed
-            
-        else:
-            # Use rotate filter for arbitrary angles
-            video_stream = input_stream.video
-            
-            # Set fill color based on mode
-            if fill_mode == "black":
-                fill_color = "black"
-            elif fill_mode == "white":
-                fill_color = "white"
-            elif fill_mode == "transparent":
-                fill_color = "none"
-            else:
-                fill_color = "black"  # Default fallback
-            
-            # Apply rotation with different modes
-            if fill_mode == "blur":
-                # First rotate, then blur the background
-                video_stream = video_stream.filter('rotate', angle=angle_rad, fillcolor=fill_color)
-                # Add blur to background (complex filter would be needed for proper blur fill)
-            elif fill_mode == "mirror":
-                # Rotate with mirrored edges (simplified implementation)
-                video_stream = video_stream.filter('rotate', angle=angle_rad, fillcolor=fill_color)
-            else:
-                # Standard rotation with solid fill
-                video_stream = video_stream.filter('rotate', angle=angle_rad, fillcolor=fill_color)
-                
-            # Disable bilinear interpolation for sharper results when needed
-            if abs(angle_rad % (math.pi/2)) < 0.01:  # Close to 90° increments
-                video_stream = video_stream.filter('rotate', angle=angle_rad, fillcolor=fill_color, bilinear=0)
+        # Quarter turns stay on the GPU end to end where NVENC and NPP are available
+        if lossless and _rotate_on_gpu(input_video_path, output_video_path, angle_milli // 1000 % 360, quality_profile):
+            return f"Video rotated successfully by {rotation_desc} with {fill_mode} fill. Output saved to {output_video_path}"
         
-        # Create output
-        output = ffmpeg.output(
-            video_stream,
-            input_stream.audio,
-            output_video_path,
-            vcodec='libx264',
-            acodec='copy'
-        )
+        input_stream = ffmpeg.input(input_video_path)
         
-        output.run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+        # Lossless 90-degree increments use transpose (hflip+vflip for 180°), other angles
+        # the rotate filter. 'blur' and 'mirror' fills would need a separate background
+        # branch and currently fall back to black like unknown modes
+        video_stream = _apply_geometry(input_stream.video, angle_milli,
+                                       fillcolor=_FILL_COLORS.get(fill_mode, 'black'),
+                                       use_transpose=maintain_quality)
+        
+        # Create output
+        _encode_with_audio(video_stream, input_stream.audio, output_video_path, quality_profile, acodec='copy')
         
-        rotation_desc = f"{rotation_angle}°" if rotation_type == "degrees" else f"{rotation_angle} rad"
         return f"Video rotated successfully by {rotation_desc} with {fill_mode} fill. Output saved to {output_video_path}"
         
     except ffmpeg.Error as e:
@@ -103,7 +212,8 @@ def rotate_video(input_video_path: str, output_video_path: str,
 
 
 def flip_mirror_video(input_video_path: str, output_video_path: str,
-                     operation: str, preserve_metadata: bool = True) -> str:
+                     operation: str, preserve_metadata: bool = True,
+                     quality_profile: str = "fast") -> str:
     """Flips or mirrors video horizontally or vertically.
     
     Args:
@@ -116,6 +226,9 @@ def flip_mirror_video(input_video_path: str, output_video_path: str,
             - 'diagonal': Diagonal flip (transpose)
             - 'anti_diagonal': Anti-diagonal flip (anti-transpose)
         preserve_metadata: Whether to preserve video metadata during operation
+        quality_profile: Encoder speed/quality trade-off for the re-encode:
+            'archive' (slow, CRF 18), 'balanced' (libx264 defaults), 'fast' (veryfast,
+            CRF 24) or 'preview' (ultrafast, CRF 28)
     
     Returns:
         A status message indicating success or failure.
@@ -123,36 +236,22 @@ def flip_mirror_video(input_video_path: str, output_video_path: str,
     if not os.path.exists(input_video_path):
         return f"Error: Input video file not found at {input_video_path}"
     
-    valid_operations = ['horizontal', 'hflip', 'vertical', 'vflip', 'both', 'diagonal', 'anti_diagonal']
-    if operation not in valid_operations:
-        return f"Error: Invalid operation '{operation}'. Valid operations: {', '.join(valid_operations)}"
+    profile_error = _invalid_quality_profile(quality_profile)
+    if profile_error:
+        return profile_error
+    
+    if operation not in _FLIP_OPERATIONS:
+        return f"Error: Invalid operation '{operation}'. Valid operations: {', '.join(_FLIP_OPERATIONS)}"
     
     try:
         input_stream = ffmpeg.input(input_video_path)
-        video_stream = input_stream.video
         
         # Apply the appropriate flip operation
-        if operation in ['horizontal', 'hflip']:
-            video_stream = video_stream.filter('hflip')
-            
-        elif operation in ['vertical', 'vflip']:
-            video_stream = video_stream.filter('vflip')
-            
-        elif operation == 'both':
-            # Both horizontal and vertical flip
-            video_stream = video_stream.filter('hflip').filter('vflip')
-            
-        elif operation == 'diagonal':
-            # Diagonal flip (transpose matrix operation)
-            video_stream = video_stream.filter('transpose', 0)  # 90° counter-clockwise + vflip
-            
-        elif operation == 'anti_diagonal':
-            # Anti-diagonal flip  
-            video_stream = video_stream.filter('transpose', 3)  # 90° clockwise + vflip
+        rotation, flip = _FLIP_OPERATIONS[operation]
+        video_stream = _apply_orientation(input_stream.video, rotation, flip)
         
         # Build output arguments
         output_args = {
-            'vcodec': 'libx264',
             'acodec': 'copy'
         }
         
@@ -161,14 +260,7 @@ def flip_mirror_video(input_video_path: str, output_video_path: str,
             output_args['map_metadata'] = 0
         
         # Create output
-        output = ffmpeg.output(
-            video_stream,
-            input_stream.audio,
-            output_video_path,
-            **output_args
-        )
-        
-        output.run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+        _encode_with_audio(video_stream, input_stream.audio, output_video_path, quality_profile, **output_args)
         
         return f"Video {operation} flip applied successfully. Output saved to {output_video_path}"
         
@@ -181,7 +273,7 @@ def flip_mirror_video(input_video_path: str, output_video_path: str,
 
 def rotate_and_flip_video(input_video_path: str, output_video_path: str,
                          rotation_angle: float, flip_operation: str = None,
-                         rotation_type: str = "degrees") -> str:
+                         rotation_type: str = "degrees", quality_profile: str = "fast") -> str:
     """Combines rotation and flipping operations in a single efficient pass.
     
     Args:
@@ -191,6 +283,9 @@ def rotate_and_flip_video(input_video_path: str, output_video_path: str,
         flip_operation: Optional flip operation to apply after rotation:
             - 'horizontal', 'vertical', 'both', or None
         rotation_type: Type of angle measurement ('degrees' or 'radians')
+        quality_profile: Encoder speed/quality trade-off for re-encoded output:
+            'archive' (slow, CRF 18), 'balanced' (libx264 defaults), 'fast' (veryfast,
+            CRF 24) or 'preview' (ultrafast, CRF 28)
     
     Returns:
         A status message indicating success or failure.
@@ -198,48 +293,26 @@ def rotate_and_flip_video(input_video_path: str, output_video_path: str,
     if not os.path.exists(input_video_path):
         return f"Error: Input video file not found at {input_video_path}"
     
+    profile_error = _invalid_quality_profile(quality_profile)
+    if profile_error:
+        return profile_error
+    
     try:
         input_stream = ffmpeg.input(input_video_path)
         video_stream = input_stream.video
+        angle_milli = _millidegrees(rotation_angle, rotation_type)
         
-        # Convert angle to radians if needed
-        if rotation_type == "degrees":
-            angle_rad = math.radians(rotation_angle)
-        else:
-            angle_rad = rotation_angle
-        
-        # Apply rotation
-        if rotation_angle != 0:
-            # Check for 90-degree increments for optimized processing
-            if rotation_type == "degrees" and rotation_angle % 90 == 0:
-                if rotation_angle % 360 == 90:
-                    video_stream = video_stream.filter('transpose', 1)
-                elif rotation_angle % 360 == 180:
-                    video_stream = video_stream.filter('transpose', 1).filter('transpose', 1)
-                elif rotation_angle % 360 == 270:
-                    video_stream = video_stream.filter('transpose', 2)
-            else:
-                video_stream = video_stream.filter('rotate', angle=angle_rad, fillcolor="black")
-        
-        # Apply flip operation if specified
-        if flip_operation:
-            if flip_operation == 'horizontal':
-                video_stream = video_stream.filter('hflip')
-            elif flip_operation == 'vertical':
-                video_stream = video_stream.filter('vflip')
-            elif flip_operation == 'both':
-                video_stream = video_stream.filter('hflip').filter('vflip')
-        
-        # Create output
-        output = ffmpeg.output(
-            video_stream,
-            input_stream.audio,
-            output_video_path,
-            vcodec='libx264',
-            acodec='copy'
-        )
+        # Unknown flip operations are ignored
+        flip = flip_operation if flip_operation in ('horizontal', 'vertical', 'both') else None
         
-        output.run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+        # 90-degree increments and the flip fold into one transpose/flip pass;
+        # other angles rotate first and flip afterwards
+        if angle_milli % 90000 == 0 and not _ORIENTATION_FILTERS[(angle_milli // 1000 % 360, flip)]:
+            # Nothing to do (no rotation or flip, or they cancel out): copy the streams
+            _stream_copy(input_video_path, output_video_path)
+        else:
+            video_stream = _apply_geometry(video_stream, angle_milli, flip)
+            _encode_with_audio(video_stream, input_stream.audio, output_video_path, quality_profile, acodec='copy')
         
         operations = []
         if rotation_angle != 0:
@@ -268,56 +341,48 @@ def auto_rotate_video(input_video_path: str, output_video_path: str) -> str:
     Returns:
         A status message indicating success or failure.
     """
-    if not os.path.exists(input_video_path):
+    # The existence check's stat doubles as the probe cache key
+    try:
+        stat = os.stat(input_video_path)
+    except FileNotFoundError:
         return f"Error: Input video file not found at {input_video_path}"
     
     try:
         # Probe video to get metadata
-        probe = ffmpeg.probe(input_video_path)
+        probe = _cached_probe(input_video_path, stat)
+        
+        video_stream_info = next((s for s in probe['streams'] if s['codec_type'] == 'video'), None)
+        if video_stream_info is None:
+            return "Error: No video stream found in the input file."
         
-        # Look for rotation metadata
-        rotation = 0
-        for stream in probe['streams']:
-            if stream['codec_type'] == 'video':
-                # Check for rotation in side_data_list
-                if 'side_data_list' in stream:
-                    for side_data in stream['side_data_list']:
-                        if side_data.get('side_data_type') == 'Display Matrix':
-                            rotation = int(side_data.get('rotation', 0))
-                            break
-                
-                # Also check for rotation tag
-                if 'tags' in stream and 'rotate' in stream['tags']:
-                    rotation = int(stream['tags']['rotate'])
-                    break
+        # Look for rotation metadata. The display matrix reports a counter-clockwise,
+        # possibly fractional, angle (e.g. -90.0); the legacy rotate tag a clockwise one
+        display_matrix = next((sd for sd in video_stream_info.get('side_data_list', [])
+                               if sd.get('side_data_type') == 'Display Matrix'), None)
+        if display_matrix is not None:
+            rotation = int(round(float(display_matrix.get('rotation', 0)))) % 360
+        else:
+            rotation = -int(video_stream_info.get('tags', {}).get('rotate', 0)) % 360
         
         if rotation == 0:
             return f"No rotation correction needed. Video is already properly oriented."
         
-        # Apply rotation correction
+        # Apply rotation correction. ffmpeg's autorotation (on by default since 2.7) already
+        # turns the decoded frames upright from the display matrix, and leaves the matrix out
+        # of the output so players don't rotate them again. An explicit transpose would need
+        # autorotation off, and the -display_rotation override that also drops the matrix
+        # is missing before ffmpeg 6.0 (-noautorotate alone carries it into the output)
         input_stream = ffmpeg.input(input_video_path)
-        video_stream = input_stream.video
-        
-        # Correct rotation by applying opposite rotation
-        if rotation == 90:
-            video_stream = video_stream.filter('transpose', 2)  # 90° counter-clockwise
-        elif rotation == 180:
-            video_stream = video_stream.filter('hflip').filter('vflip')
-        elif rotation == 270:
-            video_stream = video_stream.filter('transpose', 1)  # 90° clockwise
         
         # Remove rotation metadata and create output
-        output = ffmpeg.output(
-            video_stream,
+        _encode_with_audio(
+            input_stream.video,
             input_stream.audio,
             output_video_path,
-            vcodec='libx264',
             acodec='copy',
-            metadata='rotate=0'  # Clear rotation metadata
+            **{'metadata:s:v:0': 'rotate=0'}  # Clear the legacy per-stream rotate tag
         )
         
-        output.run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
-        
         return f"Video rotation auto-corrected (was {rotation}°). Output saved to {output_video_path}"
         
     except ffmpeg.Error as e:
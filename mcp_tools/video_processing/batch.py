@@ -0,0 +1,88 @@
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from ..utils import _batch_threads, _limit_ffmpeg_threads
+from .convert_video_format import convert_video_format
+from .set_video_bitrate import set_video_bitrate
+from .set_video_codec import set_video_codec
+from .set_video_frame_rate import set_video_frame_rate
+
+# Threads each concurrent ffmpeg gets by default; fewer, wider jobs would leave cores idle
+# on many small files, more narrow ones would oversubscribe the CPU
+_THREADS_PER_JOB = 4
+
+def _run_batch(tool, input_video_paths: list[str], output_video_paths: list[str], args: tuple,
+               max_concurrent: int = None) -> list[str]:
+    """Runs tool(input, output, *args) for every path pair concurrently.
+
+    Each job is its own ffmpeg process, so worker threads only wait on subprocesses.
+    The thread budget is split between the jobs running at once. Returns the status
+    messages in input order.
+    """
+    if len(input_video_paths) != len(output_video_paths):
+        return [f"Error: Expected {len(input_video_paths)} output paths, got {len(output_video_paths)}"]
+    if not input_video_paths:
+        return []
+
+    workers = min(len(input_video_paths),
+                  max_concurrent or max(1, (os.cpu_count() or 4) // _THREADS_PER_JOB))
+    threads = _batch_threads(workers)
+
+    def run_one(paths):
+        with _limit_ffmpeg_threads(threads):
+            return tool(*paths, *args)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_one, zip(input_video_paths, output_video_paths)))
+
+def batch_convert_video_format(input_video_paths: list[str], output_video_paths: list[str], target_format: str,
+                               max_concurrent: int = None) -> list[str]:
+    """Converts several videos to the target format concurrently (see convert_video_format).
+    Args:
+        input_video_paths: Paths to the source video files.
+        output_video_paths: Output path for each input, in the same order.
+        target_format: Desired output video format (e.g., 'mp4', 'mov', 'avi').
+        max_concurrent: Maximum number of simultaneous conversions. Default: one per 4 CPU cores.
+    Returns:
+        A status message per input, in input order.
+    """
+    return _run_batch(convert_video_format, input_video_paths, output_video_paths, (target_format,), max_concurrent)
+
+def batch_set_video_bitrate(input_video_paths: list[str], output_video_paths: list[str], video_bitrate: str,
+                            max_concurrent: int = None) -> list[str]:
+    """Sets the video bitrate of several videos concurrently (see set_video_bitrate).
+    Args:
+        input_video_paths: Paths to the source video files.
+        output_video_paths: Output path for each input, in the same order.
+        video_bitrate: Target video bitrate (e.g., '1M', '2500k').
+        max_concurrent: Maximum number of simultaneous encodes. Default: one per 4 CPU cores.
+    Returns:
+        A status message per input, in input order.
+    """
+    return _run_batch(set_video_bitrate, input_video_paths, output_video_paths, (video_bitrate,), max_concurrent)
+
+def batch_set_video_codec(input_video_paths: list[str], output_video_paths: list[str], video_codec: str,
+                          max_concurrent: int = None) -> list[str]:
+    """Sets the video codec of several videos concurrently (see set_video_codec).
+    Args:
+        input_video_paths: Paths to the source video files.
+        output_video_paths: Output path for each input, in the same order.
+        video_codec: Target video codec (e.g., 'libx264', 'libx265', 'vp9').
+        max_concurrent: Maximum number of simultaneous encodes. Default: one per 4 CPU cores.
+    Returns:
+        A status message per input, in input order.
+    """
+    return _run_batch(set_video_codec, input_video_paths, output_video_paths, (video_codec,), max_concurrent)
+
+def batch_set_video_frame_rate(input_video_paths: list[str], output_video_paths: list[str], frame_rate: int,
+                               max_concurrent: int = None) -> list[str]:
+    """Sets the frame rate of several videos concurrently (see set_video_frame_rate).
+    Args:
+        input_video_paths: Paths to the source video files.
+        output_video_paths: Output path for each input, in the same order.
+        frame_rate: Target video frame rate (e.g., 24, 30, 60).
+        max_concurrent: Maximum number of simultaneous encodes. Default: one per 4 CPU cores.
+    Returns:
+        A status message per input, in input order.
+    """
+    return _run_batch(set_video_frame_rate, input_video_paths, output_video_paths, (frame_rate,), max_concurrent)
@@ -1,15 +1,68 @@
 
 import ffmpeg
+import os
+
+from ..utils import (_run_with_h264_output, _cached_probe, _mux_kwargs, _audio_copy_args,
+                     _quality_kwargs, _invalid_quality_profile, _vaapi_device, _H264_CONTAINERS)
+
+def _reencode(video_path: str, output_video_path: str, video_filters: list = (),
+              quality_profile: str = 'fast', **output_args) -> None:
+    """Re-encodes video_path in one ffmpeg run with the preferred H.264 encoder.
+    
+    video_filters holds (name, args, kwargs) filter nodes applied to the video in order;
+    the audio, if any, is mapped alongside.
+    """
+    def run(codec_args):
+        codec_args = {**_quality_kwargs(codec_args.get('vcodec'), quality_profile), **codec_args}
+        input_stream = ffmpeg.input(video_path)
+        video_stream = input_stream.video
+        for name, args, kwargs in video_filters:
+            video_stream = video_stream.filter(name, *args, **kwargs)
+        ffmpeg.output(video_stream, input_stream['a?'], output_video_path,
+                      **output_args, **codec_args, **_mux_kwargs(output_video_path)).run(
+            capture_stderr=True, overwrite_output=True
+        )
+    _run_with_h264_output(output_video_path, run)
+
+def _pad_on_vaapi(video_path: str, output_video_path: str, width: int, height: int,
+                  padding_color: str, quality_profile: str = 'fast', **output_args) -> bool:
+    """Scales and pads to width x height with decode, filters and encode on a VAAPI GPU.
+    
+    Frames stay in GPU memory from decode through h264_vaapi, leaving the CPU idle.
+    Returns False when the host lacks VAAPI support or the pipeline fails (e.g. a
+    codec the GPU can't decode), leaving the caller to re-encode on the CPU.
+    """
+    device = _vaapi_device('scale_vaapi', 'pad_vaapi')
+    if device is None or os.path.splitext(output_video_path)[1].lower() not in _H264_CONTAINERS:
+        return False
+    
+    input_stream = ffmpeg.input(video_path, hwaccel='vaapi', hwaccel_device=device,
+                                hwaccel_output_format='vaapi')
+    video_stream = input_stream.video.filter(
+        'scale_vaapi', w=width, h=height, force_original_aspect_ratio='decrease'
+    ).filter('pad_vaapi', width, height, '(ow-iw)/2', '(oh-ih)/2', color=padding_color)
+    
+    try:
+        ffmpeg.output(video_stream, input_stream['a?'], output_video_path, vcodec='h264_vaapi',
+                      **output_args, **_quality_kwargs('h264_vaapi', quality_profile),
+                      **_mux_kwargs(output_video_path)).run(
+            capture_stderr=True, overwrite_output=True
+        )
+    except ffmpeg.Error:
+        return False
+    return True
 
 def change_aspect_ratio(video_path: str, output_video_path: str, target_aspect_ratio: str, 
-                          resize_mode: str = 'pad', padding_color: str = 'black') -> str:
+                          resize_mode: str = 'pad', padding_color: str = 'black',
+                          quality_profile: str = 'fast') -> str:
     """Changes the aspect ratio of a video, using padding or cropping.
-    Args listed in PRD.
+    Args listed in PRD; quality_profile ('archive', 'balanced', 'fast' or 'preview')
+    trades encoding speed for quality.
     Returns:
         A status message indicating success or failure.
     """
     try:
-        probe = ffmpeg.probe(video_path)
+        probe = _cached_probe(video_path)
         video_stream_info = next((stream for stream in probe['streams'] if stream['codec_type'] == 'video'), None)
         if not video_stream_info:
             return "Error: No video stream found in the input file."
@@ -21,62 +74,60 @@ def change_aspect_ratio(video_path: str, output_video_path: str, target_aspect_r
         target_ar_val = num / den
         original_ar_val = original_width / original_height
 
-        vf_filter = ""
-        # Attempt to copy codecs if the operation doesn't strictly require re-encoding video stream
-        # This is mostly for padding. Cropping implies re-encoding the video stream.
-        codec_to_use = None 
+        if resize_mode not in ('pad', 'crop'):
+            return f"Error: Invalid resize_mode '{resize_mode}'. Must be 'pad' or 'crop'."
+
+        profile_error = _invalid_quality_profile(quality_profile)
+        if profile_error:
+            return profile_error
 
+        if abs(original_ar_val - target_ar_val) < 1e-4:
+            try:
+                ffmpeg.input(video_path).output(output_video_path, c='copy', avoid_negative_ts='make_zero',
+                                                **_mux_kwargs(output_video_path)).run(
+                    capture_stderr=True, overwrite_output=True
+                )
+                return f"Video aspect ratio already matches. Copied to {output_video_path}."
+            except ffmpeg.Error:
+                # If copy fails (e.g. the codecs don't fit the output container), just re-encode
+                _reencode(video_path, output_video_path, quality_profile=quality_profile)
+                return f"Video aspect ratio already matches. Re-encoded to {output_video_path}."
+
+        # Copy the audio only when the output container is known to take its codec, so
+        # the conversion runs once instead of retrying after a failed copy
+        audio_args = _audio_copy_args(probe, output_video_path)
+        audio_desc = "audio copy" if audio_args else "audio re-encoded"
+
+        # Filter nodes are only added when they change the frame size; a target ratio
+        # that rounds to the original dimensions adds none
+        video_filters = []
         if resize_mode == 'pad':
-            if abs(original_ar_val - target_ar_val) < 1e-4:
-                try:
-                    ffmpeg.input(video_path).output(output_video_path, c='copy').run(capture_stdout=True, capture_stderr=True)
-                    return f"Video aspect ratio already matches. Copied to {output_video_path}."
-                except ffmpeg.Error:
-                     # If copy fails, just re-encode
-                    ffmpeg.input(video_path).output(output_video_path).run(capture_stdout=True, capture_stderr=True)
-                    return f"Video aspect ratio already matches. Re-encoded to {output_video_path}."
-            
             if original_ar_val > target_ar_val: 
                 final_w = int(original_height * target_ar_val)
                 final_h = original_height
-                vf_filter = f"scale={final_w}:{final_h}:force_original_aspect_ratio=decrease,pad={final_w}:{final_h}:(ow-iw)/2:(oh-ih)/2:{padding_color}"
             else: 
                 final_w = original_width
                 final_h = int(original_width / target_ar_val)
-                vf_filter = f"scale={final_w}:{final_h}:force_original_aspect_ratio=decrease,pad={final_w}:{final_h}:(ow-iw)/2:(oh-ih)/2:{padding_color}"
-            codec_to_use = 'copy' # Try to copy for padding, audio will be copied too
+            if (final_w, final_h) != (original_width, original_height):
+                # Intel/AMD GPUs can scale, pad and encode without the frames leaving the GPU
+                if _pad_on_vaapi(video_path, output_video_path, final_w, final_h, padding_color,
+                                 quality_profile, **audio_args):
+                    return f"Video aspect ratio changed ({audio_desc}, VAAPI) to {target_aspect_ratio} using pad. Saved to {output_video_path}"
+                video_filters.append(('scale', (final_w, final_h), {'force_original_aspect_ratio': 'decrease'}))
+                video_filters.append(('pad', (final_w, final_h, '(ow-iw)/2', '(oh-ih)/2', padding_color), {}))
 
-        elif resize_mode == 'crop':
-            if abs(original_ar_val - target_ar_val) < 1e-4:
-                try:
-                    ffmpeg.input(video_path).output(output_video_path, c='copy').run(capture_stdout=True, capture_stderr=True)
-                    return f"Video aspect ratio already matches. Copied to {output_video_path}."
-                except ffmpeg.Error:
-                    ffmpeg.input(video_path).output(output_video_path).run(capture_stdout=True, capture_stderr=True)
-                    return f"Video aspect ratio already matches. Re-encoded to {output_video_path}."
-            
+        else:
             if original_ar_val > target_ar_val: 
                 new_width = int(original_height * target_ar_val)
-                vf_filter = f"crop={new_width}:{original_height}:(iw-{new_width})/2:0"
+                if new_width != original_width:
+                    video_filters.append(('crop', (new_width, original_height, f'(iw-{new_width})/2', 0), {}))
             else: 
                 new_height = int(original_width / target_ar_val)
-                vf_filter = f"crop={original_width}:{new_height}:0:(ih-{new_height})/2"
-        else:
-            return f"Error: Invalid resize_mode '{resize_mode}'. Must be 'pad' or 'crop'."
+                if new_height != original_height:
+                    video_filters.append(('crop', (original_width, new_height, 0, f'(ih-{new_height})/2'), {}))
         
-        try:
-            # Try with specified video filter and copying audio codec
-            ffmpeg.input(video_path).output(output_video_path, vf=vf_filter, acodec='copy').run(capture_stdout=True, capture_stderr=True)
-            return f"Video aspect ratio changed (audio copy) to {target_aspect_ratio} using {resize_mode}. Saved to {output_video_path}"
-        except ffmpeg.Error as e_acopy:
-            # Fallback to re-encoding audio if audio copy failed
-            try:
-                ffmpeg.input(video_path).output(output_video_path, vf=vf_filter).run(capture_stdout=True, capture_stderr=True)
-                return f"Video aspect ratio changed (audio re-encoded) to {target_aspect_ratio} using {resize_mode}. Saved to {output_video_path}"
-            except ffmpeg.Error as e_recode_all:
-                err_acopy_msg = e_acopy.stderr.decode('utf8') if e_acopy.stderr else str(e_acopy)
-                err_recode_msg = e_recode_all.stderr.decode('utf8') if e_recode_all.stderr else str(e_recode_all)
-                return f"Error changing aspect ratio. Audio copy attempt failed: {err_acopy_msg}. Full re-encode attempt also failed: {err_recode_msg}."
+        _reencode(video_path, output_video_path, video_filters, quality_profile, **audio_args)
+        return f"Video aspect ratio changed ({audio_desc}) to {target_aspect_ratio} using {resize_mode}. Saved to {output_video_path}"
 
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
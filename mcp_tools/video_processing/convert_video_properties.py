@@ -1,6 +1,8 @@
 
 import ffmpeg
 
+from ..utils import _run_with_h264_output, _thread_kwargs, _mux_kwargs
+
 def convert_video_properties(input_video_path: str, output_video_path: str, target_format: str,
                                resolution: str = None, video_codec: str = None, video_bitrate: str = None,
                                frame_rate: int = None, audio_codec: str = None, audio_bitrate: str = None,
@@ -32,9 +34,17 @@ def convert_video_properties(input_video_path: str, output_video_path: str, targ
         if audio_sample_rate: kwargs['ar'] = audio_sample_rate
         if audio_channels: kwargs['ac'] = audio_channels
         kwargs['format'] = target_format
+        kwargs.update(_mux_kwargs(output_video_path))
 
-        output_stream = stream.output(output_video_path, **kwargs)
-        output_stream.run(capture_stdout=True, capture_stderr=True)
+        if video_codec:
+            stream.output(output_video_path, **_thread_kwargs(video_codec), **kwargs).run(
+                capture_stderr=True, overwrite_output=True
+            )
+        else:
+            # No codec requested: preferred H.264 encoder (GPU when available) where the container allows
+            _run_with_h264_output(output_video_path, lambda codec_args: stream.output(
+                output_video_path, **kwargs, **codec_args
+            ).run(capture_stderr=True, overwrite_output=True))
         return f"Video converted successfully to {output_video_path} with format {target_format} and specified properties."
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
@@ -1,9 +1,13 @@
 
 import ffmpeg
 
+from ..utils import (_run_with_h264_output, _cached_probe, _mux_kwargs, _audio_copy_args,
+                     _quality_kwargs, _invalid_quality_profile)
+
 def correct_colors(input_video_path: str, output_video_path: str, 
                    brightness: float = 0.0, contrast: float = 1.0, 
-                   saturation: float = 1.0, gamma: float = 1.0) -> str:
+                   saturation: float = 1.0, gamma: float = 1.0,
+                   quality_profile: str = 'fast') -> str:
     """Adjusts the color properties of a video.
 
     Args:
@@ -13,11 +17,21 @@ def correct_colors(input_video_path: str, output_video_path: str,
         contrast: Contrast adjustment. Range: -2.0 to 2.0. Default: 1.0.
         saturation: Saturation adjustment. Range: 0.0 to 3.0. Default: 1.0.
         gamma: Gamma adjustment. Range: 0.1 to 10.0. Default: 1.0.
+        quality_profile: Encoder speed/quality trade-off: 'archive', 'balanced',
+            'fast' or 'preview'. Default: 'fast'.
 
     Returns:
         A status message indicating success or failure.
     """
+    profile_error = _invalid_quality_profile(quality_profile)
+    if profile_error:
+        return profile_error
+
     try:
+        # Copy the audio only when the output container is known to take its codec, so
+        # the color correction is rendered once instead of again after a failed copy
+        audio_args = _audio_copy_args(_cached_probe(input_video_path), output_video_path)
+
         stream = ffmpeg.input(input_video_path)
         
         # Apply the 'eq' filter for color correction
@@ -27,26 +41,20 @@ def correct_colors(input_video_path: str, output_video_path: str,
                                            saturation=saturation, 
                                            gamma=gamma)
         
-        # Get the audio stream to pass it through
-        audio_stream = stream.audio
+        # Get the audio stream (if any) to pass it through
+        audio_stream = stream['a?']
 
-        # Output the processed video and original audio
-        ffmpeg.output(video_stream, audio_stream, output_video_path, acodec='copy').run(capture_stdout=True, capture_stderr=True)
-        return f"Color correction applied successfully and saved to {output_video_path}"
+        # Output the processed video and original audio (GPU encoder when available)
+        _run_with_h264_output(output_video_path, lambda codec_args: ffmpeg.output(
+            video_stream, audio_stream, output_video_path, **audio_args, **codec_args,
+            **_quality_kwargs(codec_args.get('vcodec'), quality_profile), **_mux_kwargs(output_video_path)
+        ).run(capture_stderr=True, overwrite_output=True))
+        if audio_args:
+            return f"Color correction applied successfully and saved to {output_video_path}"
+        return f"Color correction applied successfully (audio re-encoded) and saved to {output_video_path}"
     except ffmpeg.Error as e:
-        # Fallback if audio copy fails
-        try:
-            stream = ffmpeg.input(input_video_path)
-            video_stream = stream.video.filter('eq', 
-                                               brightness=brightness, 
-                                               contrast=contrast, 
-                                               saturation=saturation, 
-                                               gamma=gamma)
-            ffmpeg.output(video_stream, stream.audio, output_video_path).run(capture_stdout=True, capture_stderr=True)
-            return f"Color correction applied successfully (audio re-encoded) and saved to {output_video_path}"
-        except ffmpeg.Error as e_recode:
-            error_message = e_recode.stderr.decode('utf8') if e_recode.stderr else str(e_recode)
-            return f"Error applying color correction: {error_message}"
+        error_message = e.stderr.decode('utf8') if e.stderr else str(e)
+        return f"Error applying color correction: {error_message}"
     except FileNotFoundError:
         return f"Error: Input video file not found at {input_video_path}"
     except Exception as e:
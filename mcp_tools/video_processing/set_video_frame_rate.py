@@ -1,6 +1,18 @@
 
 import ffmpeg
-from ..utils import _run_ffmpeg_with_fallback
+from fractions import Fraction
+from ..utils import _run_ffmpeg_with_fallback, _cached_probe, _mux_kwargs
+
+def _source_frame_rate(input_video_path: str):
+    """The video stream's frame rate as a Fraction, or None if it can't be probed or is
+    variable (r_frame_rate differs from avg_frame_rate)."""
+    try:
+        probe = _cached_probe(input_video_path)
+        video_stream_info = next(s for s in probe['streams'] if s['codec_type'] == 'video')
+        avg_frame_rate = Fraction(video_stream_info['avg_frame_rate'])
+        return avg_frame_rate if Fraction(video_stream_info['r_frame_rate']) == avg_frame_rate else None
+    except (ffmpeg.Error, OSError, StopIteration, KeyError, ValueError, ZeroDivisionError):
+        return None
 
 def set_video_frame_rate(input_video_path: str, output_video_path: str, frame_rate: int) -> str:
     """Sets the frame rate of a video, attempting to copy the audio stream.
@@ -11,6 +23,20 @@ def set_video_frame_rate(input_video_path: str, output_video_path: str, frame_ra
     Returns:
         A status message indicating success or failure.
     """
+    # Already at the requested constant rate: remux instead of re-encoding every frame.
+    # A VFR source whose average happens to match still needs -r to make it constant.
+    # A rate given to two decimals (29.97) also matches the exact NTSC one (30000/1001)
+    source_frame_rate = _source_frame_rate(input_video_path)
+    if source_frame_rate is not None and abs(source_frame_rate - Fraction(str(frame_rate))) < Fraction(1, 200):
+        try:
+            ffmpeg.input(input_video_path).output(output_video_path, c='copy', avoid_negative_ts='make_zero',
+                                                  **_mux_kwargs(output_video_path)).run(
+                capture_stderr=True, overwrite_output=True
+            )
+            return f"Operation successful (stream copy, already {frame_rate} fps) and saved to {output_video_path}"
+        except ffmpeg.Error:
+            pass  # e.g. codecs the output container can't hold; re-encode below
+
     primary_kwargs = {'r': frame_rate, 'acodec': 'copy'}
     fallback_kwargs = {'r': frame_rate} # Re-encode audio
     return _run_ffmpeg_with_fallback(input_video_path, output_video_path, primary_kwargs, fallback_kwargs)
@@ -1,6 +1,36 @@
 
 import ffmpeg
 import os
+import re
+import tempfile
+from ..utils import _run_with_h264_output, _mux_kwargs, _quality_kwargs, _validate_input
+
+def _filter_path(path: str) -> str:
+    """Escapes a file path for use as a filter option value in a -vf graph.
+
+    ffmpeg unescapes the value twice: as an option value (\\ ' :) and, before that,
+    as part of the graph (\\ ' [ ] , ;). Windows backslashes become forward slashes.
+    """
+    value = re.sub(r"([\\':])", r"\\\1", path.replace('\\', '/'))
+    return re.sub(r"([\\'\[\],;])", r"\\\1", value)
+
+def _encode_stabilized(input_video_path: str, output_video_path: str, transform_filter: str,
+                       **output_args) -> None:
+    """Runs pass 2 with the preferred H.264 encoder for the output container (GPU when available).
+
+    vidstabtransform itself is cheap, so the encode dominates; it runs at the 'balanced'
+    quality profile (libx264's defaults).
+    """
+    def run(codec_args):
+        codec_args = {**_quality_kwargs(codec_args.get('vcodec'), 'balanced'), **codec_args}
+        ffmpeg.input(input_video_path).output(
+            output_video_path,
+            vf=transform_filter,
+            **output_args,
+            **codec_args,
+            **_mux_kwargs(output_video_path)
+        ).run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+    _run_with_h264_output(output_video_path, run)
 
 def stabilize_video(input_video_path: str, output_video_path: str) -> str:
     """Stabilizes a shaky video using a two-pass FFmpeg process.
@@ -12,34 +42,35 @@ def stabilize_video(input_video_path: str, output_video_path: str) -> str:
     Returns:
         A status message indicating success or failure.
     """
-    if not os.path.exists(input_video_path):
-        return f"Error: Input video file not found at {input_video_path}"
+    error = _validate_input(input_video_path)
+    if error:
+        return error
 
-    temp_trf_file = "transforms.trf" # Temporary file for stabilization data
+    # Temporary file for stabilization data, unique per call so concurrent runs don't share
+    # it, and in RAM-backed /dev/shm where available since pass 2 reads it all back
+    trf_fd, temp_trf_file = tempfile.mkstemp(suffix='.trf', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+    os.close(trf_fd)
+    transform_filter = f'vidstabtransform=input={_filter_path(temp_trf_file)}:zoom=0:smoothing=10'
 
     try:
-        # Pass 1: Detect camera motion and generate transform data
+        # Pass 1: Detect camera motion and generate transform data. Only the video is
+        # analysed, so the audio is left undecoded (-an) rather than decoded for the null muxer
         ffmpeg.input(input_video_path).output(
             '-', # Output to stdout
-            vf='vidstabdetect=result={}:show=0'.format(temp_trf_file),
-            f='null' # Output format null
-        ).run(capture_stdout=True, capture_stderr=True)
+            vf=f'vidstabdetect=result={_filter_path(temp_trf_file)}:show=0',
+            f='null', # Output format null
+            an=None
+        ).run(capture_stderr=True)
 
         # Pass 2: Apply stabilization using the generated transform data
-        ffmpeg.input(input_video_path).output(
-            output_video_path,
-            vf='vidstabtransform=input={}:zoom=0:smoothing=10'.format(temp_trf_file),
-            acodec='copy' # Copy audio codec to avoid re-encoding
-        ).run(capture_stdout=True, capture_stderr=True)
+        _encode_stabilized(input_video_path, output_video_path, transform_filter,
+                           acodec='copy') # Copy audio codec to avoid re-encoding
 
         return f"Video stabilized successfully and saved to {output_video_path}"
     except ffmpeg.Error as e:
         # Fallback if audio copy fails in pass 2
         try:
-            ffmpeg.input(input_video_path).output(
-                output_video_path,
-                vf='vidstabtransform=input={}:zoom=0:smoothing=10'.format(temp_trf_file)
-            ).run(capture_stdout=True, capture_stderr=True)
+            _encode_stabilized(input_video_path, output_video_path, transform_filter)
             return f"Video stabilized successfully (audio re-encoded) and saved to {output_video_path}"
         except ffmpeg.Error as e_recode:
             error_message = e_recode.stderr.decode('utf8') if e_recode.stderr else str(e_recode)
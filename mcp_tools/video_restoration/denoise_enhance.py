@@ -1,10 +1,113 @@
 import ffmpeg
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from ..utils import (_available_filters, _thread_kwargs, _run_ffmpeg_cmd, _run_with_encoder_fallback,
+                     _batch_threads, _limit_ffmpeg_threads, _capability_probe, _LOW_MEMORY_X264,
+                     _get_media_properties, _validate_input, _mux_kwargs, _encoder_kwargs)
+
+# Methods backed by filters that not every ffmpeg build has, and what to use instead
+_DENOISE_FALLBACKS = {'bm3d': 'nlmeans', 'dfttest': 'hqdn3d'}
+
+# Threads each concurrent batch denoise gets by default; the filters scale to about this
+# many before extra threads stop paying off
+_DENOISE_THREADS_PER_JOB = 8
+
+# GPU builds of nlmeans, in order of preference, and the hardware device each runs on
+_GPU_NLMEANS = {'nlmeans_opencl': 'opencl', 'nlmeans_vulkan': 'vulkan'}
+
+@_capability_probe
+def _gpu_nlmeans():
+    """Returns (filter, device type) of the first GPU nlmeans that works on this host, else None.
+    
+    A filter can be compiled in without a usable device behind it, so each candidate
+    renders one test frame; the answer is cached for the life of the process.
+    """
+    for filter_name, device_type in _GPU_NLMEANS.items():
+        if filter_name not in _available_filters():
+            continue
+        try:
+            _run_ffmpeg_cmd(['ffmpeg', '-hide_banner', '-v', 'error',
+                             '-init_hw_device', f'{device_type}=nlm', '-filter_hw_device', 'nlm',
+                             '-f', 'lavfi', '-i', 'color=s=64x64:d=0.04',
+                             '-vf', f'format=yuv420p,hwupload,{filter_name},hwdownload,format=yuv420p',
+                             '-f', 'null', '-'])
+        except (OSError, ffmpeg.Error):
+            continue
+        return filter_name, device_type
+    return None
+
+def _nlmeans(video_stream, **nlmeans_params):
+    """Applies non-local means, on the GPU when _gpu_nlmeans() found one.
+    
+    The patch search dominates the run time on the CPU; on the GPU the frames are
+    uploaded, denoised and downloaded again. An output using this needs the device
+    options of _with_nlmeans_device().
+    """
+    gpu = _gpu_nlmeans()
+    if gpu is None:
+        return video_stream.filter('nlmeans', **nlmeans_params)
+    return (video_stream.filter('format', 'yuv420p').filter('hwupload')
+            .filter(gpu[0], **nlmeans_params)
+            .filter('hwdownload').filter('format', 'yuv420p'))
+
+# Per quality_preset: nlmeans (research size, patch size), the factor on hqdn3d's luma
+# strengths, and the libx264 (preset, crf) of the encode. Unknown presets get 'ultra'
+_NLMEANS_SIZES = {'fast': (5, 3), 'medium': (15, 7), 'high': (21, 9), 'ultra': (31, 15)}
+_HQDN3D_LUMA_SCALE = {'fast': 0.7, 'medium': 1.0, 'high': 1.3, 'ultra': 1.3}
+_ENCODE_SETTINGS = {'fast': ('ultrafast', 25), 'medium': ('medium', 21), 'high': ('slow', 18), 'ultra': ('veryslow', 15)}
+
+def _with_nlmeans_device(output, uses_nlmeans: bool):
+    """Adds the hardware device that _nlmeans() filters on to output, if it uses the GPU."""
+    gpu = _gpu_nlmeans() if uses_nlmeans else None
+    if gpu is None:
+        return output
+    return output.global_args('-init_hw_device', f'{gpu[1]}=nlm', '-filter_hw_device', 'nlm')
+
+# ffmpeg options that replace the progress lines on stderr with -progress's key=value
+# blocks on stdout: compact to capture on long encodes and simple to parse afterwards
+_PROGRESS_ARGS = ('-nostats', '-progress', 'pipe:1')
+
+def _progress_summary(progress: bytes) -> str:
+    """' Processing speed: N fps, Mx realtime.' from ffmpeg's -progress output, or ''."""
+    # Later blocks repeat the keys, so the dict ends up with the final values
+    stats = dict(line.split('=', 1) for line in progress.decode('utf8', 'replace').splitlines() if '=' in line)
+    parts = []
+    try:
+        if float(stats['fps']) > 0:  # 0 on runs too short for ffmpeg to measure
+            parts.append(f"{float(stats['fps']):.1f} fps")
+    except (KeyError, ValueError):
+        pass
+    speed = stats.get('speed', '').strip()
+    if speed and speed != 'N/A':
+        parts.append(f"{speed} realtime")
+    return f" Processing speed: {', '.join(parts)}." if parts else ""
+
+def _encode_two_pass(video_stream, audio_stream, output_video_path: str, bitrate: str,
+                     uses_nlmeans: bool, **x264_kwargs) -> bytes:
+    """Encodes video_stream with two-pass libx264 at bitrate, copying audio_stream.
+    
+    Pass 1 only analyses the video into a pass log private to this call (so parallel
+    batch jobs don't share one) and pass 2 encodes with it. The filters run in both.
+    Returns pass 2's -progress output.
+    """
+    with tempfile.TemporaryDirectory() as log_dir:
+        encode_kwargs = {'vcodec': 'libx264', 'b:v': bitrate, 'passlogfile': os.path.join(log_dir, 'x264'),
+                         **_thread_kwargs('libx264'), **x264_kwargs}
+        analysis = ffmpeg.output(video_stream, '-', f='null', an=None, **{'pass': 1}, **encode_kwargs)
+        _with_nlmeans_device(analysis, uses_nlmeans).global_args('-nostats').run(
+            capture_stderr=True, overwrite_output=True)
+        output = ffmpeg.output(video_stream, audio_stream, output_video_path, acodec='copy',
+                               **{'pass': 2}, **encode_kwargs)
+        progress, _ = _with_nlmeans_device(output, uses_nlmeans).global_args(*_PROGRESS_ARGS).run(
+            capture_stdout=True, capture_stderr=True, overwrite_output=True)
+        return progress
 
 def denoise_video(input_video_path: str, output_video_path: str,
                  denoise_method: str = "nlmeans", strength: float = 1.0,
                  quality_preset: str = "medium", preserve_details: bool = True,
-                 custom_params: dict = None) -> str:
+                 custom_params: dict = None, target_bitrate: str = None,
+                 max_processing_width: int = None) -> str:
     """Removes noise from video using advanced denoising algorithms.
     
     Args:
@@ -25,18 +128,30 @@ def denoise_video(input_video_path: str, output_video_path: str,
             - 'ultra': Extremely slow, maximum quality
         preserve_details: Whether to preserve fine details (may reduce denoising)
         custom_params: Optional dictionary for method-specific parameters
+        target_bitrate: Encode two-pass libx264 at this bitrate (e.g. '4M') instead of
+            constant quality, for streaming or archival targets with a fixed bitrate
+        max_processing_width: For 'nlmeans' on the CPU, denoise wider videos at this width
+            (e.g. 1920) and scale the result back up. The filter's cost grows with the pixel
+            count, so a 4K source runs about 4x faster at 1920, at some loss of fine detail
     
     Returns:
         A status message indicating success or failure.
     """
-    if not os.path.exists(input_video_path):
-        return f"Error: Input video file not found at {input_video_path}"
+    error = _validate_input(input_video_path)
+    if error:
+        return error
     
     if strength < 0.1 or strength > 10.0:
         return "Error: Strength must be between 0.1 and 10.0"
     
     custom_params = custom_params or {}
     
+    # Pick the fallback before building the graph when ffmpeg lacks the filter
+    fallback_note = ""
+    if denoise_method in _DENOISE_FALLBACKS and denoise_method not in _available_filters():
+        fallback_note = f" ('{denoise_method}' is not available in this ffmpeg build)"
+        denoise_method = _DENOISE_FALLBACKS[denoise_method]
+    
     try:
         input_stream = ffmpeg.input(input_video_path)
         video_stream = input_stream.video
@@ -45,19 +160,7 @@ def denoise_video(input_video_path: str, output_video_path: str,
         if denoise_method == "nlmeans":
             # Non-local means denoiser - highest quality
             s = strength * 3.0  # Scale strength for nlmeans
-            
-            if quality_preset == "fast":
-                r = 5  # Research size
-                p = 3  # Patch size
-            elif quality_preset == "medium":
-                r = 15
-                p = 7
-            elif quality_preset == "high":
-                r = 21
-                p = 9
-            else:  # ultra
-                r = 31
-                p = 15
+            r, p = _NLMEANS_SIZES.get(quality_preset, _NLMEANS_SIZES['ultra'])  # Research, patch size
             
             # Add custom parameters
             nlmeans_params = {
@@ -66,29 +169,50 @@ def denoise_video(input_video_path: str, output_video_path: str,
                 'p': custom_params.get('patch_size', p)  # Patch size
             }
             
-            video_stream = video_stream.filter('nlmeans', **nlmeans_params)
+            # Denoise a downscaled copy when the source is wider than max_processing_width.
+            # A GPU nlmeans is fast enough at full size
+            source_size = None
+            if max_processing_width and _gpu_nlmeans() is None:
+                try:
+                    props = _get_media_properties(input_video_path)
+                    if props['width'] > max_processing_width:
+                        source_size = (props['width'], props['height'])
+                except RuntimeError:
+                    pass  # size unknown; denoise at full size
+            if source_size:
+                video_stream = video_stream.filter('scale', max_processing_width, -2, flags='lanczos')
+            
+            video_stream = _nlmeans(video_stream, **nlmeans_params)
+            if source_size:
+                video_stream = video_stream.filter('scale', *source_size, flags='lanczos')
         
         elif denoise_method == "hqdn3d":
             # High quality denoiser 3D - fast and effective
-            luma_spatial = strength * 4.0
+            luma_scale = _HQDN3D_LUMA_SCALE.get(quality_preset, _HQDN3D_LUMA_SCALE['ultra'])
+            luma_spatial = strength * 4.0 * luma_scale
             chroma_spatial = strength * 3.0
-            luma_temporal = strength * 6.0
+            luma_temporal = strength * 6.0 * luma_scale
             chroma_temporal = strength * 4.5
             
-            if quality_preset == "fast":
-                luma_spatial *= 0.7
-                luma_temporal *= 0.7
-            elif quality_preset in ["high", "ultra"]:
-                luma_spatial *= 1.3
-                luma_temporal *= 1.3
-            
             hqdn3d_params = {
                 'luma_spatial': custom_params.get('luma_spatial', luma_spatial),
                 'chroma_spatial': custom_params.get('chroma_spatial', chroma_spatial),
-                'luma_temporal': custom_params.get('luma_temporal', luma_temporal),
-                'chroma_temporal': custom_params.get('chroma_temporal', chroma_temporal)
+                'luma_tmp': custom_params.get('luma_temporal', luma_temporal),
+                'chroma_tmp': custom_params.get('chroma_temporal', chroma_temporal)
             }
             
+            # Coefficients this low leave the frames visibly unchanged: remux the source
+            # instead of filtering and re-encoding every frame
+            if max(hqdn3d_params.values()) < 0.5:
+                try:
+                    ffmpeg.input(input_video_path).output(output_video_path, c='copy',
+                                                          **_mux_kwargs(output_video_path)).run(
+                        capture_stderr=True, overwrite_output=True
+                    )
+                    return f"Denoise strength {strength} is below the visible threshold; video stream copied unchanged to {output_video_path}"
+                except ffmpeg.Error:
+                    pass  # e.g. codecs the output container can't hold; filter and re-encode below
+            
             video_stream = video_stream.filter('hqdn3d', **hqdn3d_params)
         
         elif denoise_method == "atadenoise":
@@ -132,12 +256,7 @@ def denoise_video(input_video_path: str, output_video_path: str,
                 'range': custom_params.get('search_range', 9)
             }
             
-            try:
-                video_stream = video_stream.filter('bm3d', **bm3d_params)
-            except:
-                # Fallback to nlmeans if bm3d not available
-                return denoise_video(input_video_path, output_video_path, 
-                                   "nlmeans", strength, quality_preset, preserve_details)
+            video_stream = video_stream.filter('bm3d', **bm3d_params)
         
         elif denoise_method == "dfttest":
             # DFT test denoiser
@@ -150,12 +269,7 @@ def denoise_video(input_video_path: str, output_video_path: str,
                 'sosize': custom_params.get('spatial_overlap', 9)
             }
             
-            try:
-                video_stream = video_stream.filter('dfttest', **dfttest_params)
-            except:
-                # Fallback to hqdn3d if dfttest not available
-                return denoise_video(input_video_path, output_video_path,
-                                   "hqdn3d", strength, quality_preset, preserve_details)
+            video_stream = video_stream.filter('dfttest', **dfttest_params)
         
         else:
             return f"Error: Unknown denoise method '{denoise_method}'"
@@ -177,33 +291,33 @@ def denoise_video(input_video_path: str, output_video_path: str,
             video_stream = video_stream.filter('unsharp', **unsharp_params)
         
         # Set encoding parameters based on quality preset
-        if quality_preset == "fast":
-            encode_preset = "ultrafast"
-            crf = 25
-        elif quality_preset == "medium":
-            encode_preset = "medium"
-            crf = 21
-        elif quality_preset == "high":
-            encode_preset = "slow"
-            crf = 18
-        else:  # ultra
-            encode_preset = "veryslow"
-            crf = 15
+        encode_preset, crf = _ENCODE_SETTINGS.get(quality_preset, _ENCODE_SETTINGS['ultra'])
         
-        # Create output
-        output = ffmpeg.output(
-            video_stream,
-            input_stream.audio,
-            output_video_path,
-            vcodec='libx264',
-            preset=encode_preset,
-            crf=crf,
-            acodec='copy'
-        )
+        # Create output (GPU encoder when available)
+        def run(vcodec):
+            output = ffmpeg.output(
+                video_stream,
+                input_stream.audio,
+                output_video_path,
+                vcodec=vcodec,
+                acodec='copy',
+                **_encoder_kwargs(vcodec, encode_preset, crf),
+                **_thread_kwargs(vcodec)
+            )
+            output = _with_nlmeans_device(output, denoise_method == "nlmeans")
+            # stderr is kept for the error message; progress goes to stdout instead of
+            # piling up per-frame lines in that buffer on long (batch) encodes
+            progress, _ = output.global_args(*_PROGRESS_ARGS).run(
+                capture_stdout=True, capture_stderr=True, overwrite_output=True)
+            return progress
         
-        output.run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+        if target_bitrate:
+            progress = _encode_two_pass(video_stream, input_stream.audio, output_video_path, target_bitrate,
+                                        denoise_method == "nlmeans", preset=encode_preset)
+        else:
+            progress = _run_with_encoder_fallback(run)
         
-        return f"Video denoised successfully using '{denoise_method}' method. Strength: {strength}, Quality: {quality_preset}. Output saved to {output_video_path}"
+        return f"Video denoised successfully using '{denoise_method}' method{fallback_note}. Strength: {strength}, Quality: {quality_preset}. Output saved to {output_video_path}.{_progress_summary(progress)}"
         
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
@@ -214,7 +328,8 @@ def denoise_video(input_video_path: str, output_video_path: str,
 
 def denoise_video_advanced(input_video_path: str, output_video_path: str,
                           noise_profile: str = "auto", temporal_consistency: bool = True,
-                          grain_preservation: float = 0.0) -> str:
+                          grain_preservation: float = 0.0, low_memory: bool = False,
+                          target_bitrate: str = None) -> str:
     """Advanced video denoising with automatic noise profiling and grain preservation.
     
     Args:
@@ -228,17 +343,38 @@ def denoise_video_advanced(input_video_path: str, output_video_path: str,
             - 'old_footage': Restore old/archival footage
         temporal_consistency: Whether to maintain consistency across frames
         grain_preservation: Amount of original grain to preserve (0.0-1.0)
+        low_memory: Use a low-latency x264 configuration (superfast preset, zerolatency
+            tune, short lookahead, no B-frames). Cuts encoder memory by roughly two thirds,
+            which matters on long HD/4K inputs, at some cost in compression efficiency.
+        target_bitrate: Encode two-pass libx264 at this bitrate (e.g. '4M') instead of
+            constant quality, for streaming or archival targets with a fixed bitrate
     
     Returns:
         A status message indicating success or failure.
     """
-    if not os.path.exists(input_video_path):
-        return f"Error: Input video file not found at {input_video_path}"
+    error = _validate_input(input_video_path)
+    if error:
+        return error
     
     try:
         input_stream = ffmpeg.input(input_video_path)
         video_stream = input_stream.video
         
+        # nlmeans and minterpolate only take 8-bit YUV. When the chain has either, convert
+        # once at its head so every stage runs on 8-bit frames, instead of ffmpeg inserting
+        # a converter mid-chain after the earlier filters ran at the source bit depth
+        uses_nlmeans = noise_profile in ("auto", "digital_noise", "old_footage")
+        uses_minterpolate = temporal_consistency and noise_profile != "old_footage"
+        if uses_minterpolate:
+            # minterpolate re-times to 30 fps with dense motion estimation; a source already
+            # at 30 fps comes out frame for frame unchanged, so skip the pass
+            try:
+                uses_minterpolate = abs(_get_media_properties(input_video_path)['avg_fps'] - 30) >= 0.5
+            except RuntimeError:
+                pass
+        if uses_nlmeans or uses_minterpolate:
+            video_stream = video_stream.filter('format', 'yuv420p')
+        
         # Apply denoising strategy based on noise profile
         if noise_profile in ["auto", "digital_noise"]:
             # Two-pass denoising: temporal then spatial
@@ -247,11 +383,11 @@ def denoise_video_advanced(input_video_path: str, output_video_path: str,
             video_stream = video_stream.filter('hqdn3d',
                                              luma_spatial=0,
                                              chroma_spatial=0,
-                                             luma_temporal=6.0,
-                                             chroma_temporal=4.5)
+                                             luma_tmp=6.0,
+                                             chroma_tmp=4.5)
             
             # Pass 2: Spatial denoising
-            video_stream = video_stream.filter('nlmeans', s=2.0, r=15, p=7)
+            video_stream = _nlmeans(video_stream, s=2.0, r=15, p=7)
         
         elif noise_profile == "film_grain":
             # Preserve grain while removing noise
@@ -260,8 +396,8 @@ def denoise_video_advanced(input_video_path: str, output_video_path: str,
             video_stream = video_stream.filter('hqdn3d',
                                              luma_spatial=1.5,
                                              chroma_spatial=1.2,
-                                             luma_temporal=3.0,
-                                             chroma_temporal=2.0)
+                                             luma_tmp=3.0,
+                                             chroma_tmp=2.0)
             
             # Add back controlled grain if preservation requested
             if grain_preservation > 0:
@@ -282,8 +418,8 @@ def denoise_video_advanced(input_video_path: str, output_video_path: str,
             video_stream = video_stream.filter('hqdn3d',
                                              luma_spatial=2.0,
                                              chroma_spatial=3.0,
-                                             luma_temporal=2.0,
-                                             chroma_temporal=3.0)
+                                             luma_tmp=2.0,
+                                             chroma_tmp=3.0)
         
         elif noise_profile == "old_footage":
             # Comprehensive restoration for old footage
@@ -292,17 +428,17 @@ def denoise_video_advanced(input_video_path: str, output_video_path: str,
             video_stream = video_stream.filter('hqdn3d',
                                              luma_spatial=1.0,
                                              chroma_spatial=2.0,
-                                             luma_temporal=8.0,
-                                             chroma_temporal=6.0)
+                                             luma_tmp=8.0,
+                                             chroma_tmp=6.0)
             
             # Spatial denoising
-            video_stream = video_stream.filter('nlmeans', s=4.0, r=21, p=9)
+            video_stream = _nlmeans(video_stream, s=4.0, r=21, p=9)
             
             # Deflicker for old film
             video_stream = video_stream.filter('deflicker', size=5, mode='pm')
         
         # Apply temporal consistency if requested
-        if temporal_consistency and noise_profile != "old_footage":
+        if uses_minterpolate:
             # Additional temporal smoothing
             video_stream = video_stream.filter('minterpolate',
                                              fps=30,
@@ -310,18 +446,27 @@ def denoise_video_advanced(input_video_path: str, output_video_path: str,
                                              mc_mode='aobmc',
                                              vsbmc=1)
         
-        # Create output with high quality settings
-        output = ffmpeg.output(
-            video_stream,
-            input_stream.audio,
-            output_video_path,
-            vcodec='libx264',
-            preset='slow',
-            crf=18,
-            acodec='copy'
-        )
+        # Create output with high quality settings (GPU encoder when available)
+        def run(vcodec):
+            encode_kwargs = {**_encoder_kwargs(vcodec, 'slow', 18), **_thread_kwargs(vcodec)}
+            if low_memory and vcodec == 'libx264':
+                encode_kwargs.update(_LOW_MEMORY_X264)
+            output = ffmpeg.output(
+                video_stream,
+                input_stream.audio,
+                output_video_path,
+                vcodec=vcodec,
+                acodec='copy',
+                **encode_kwargs
+            )
+            output = _with_nlmeans_device(output, uses_nlmeans)
+            output.global_args('-nostats').run(capture_stderr=True, overwrite_output=True)
         
-        output.run(capture_stdout=True, capture_stderr=True, overwrite_output=True)
+        if target_bitrate:
+            _encode_two_pass(video_stream, input_stream.audio, output_video_path, target_bitrate,
+                             uses_nlmeans, **(_LOW_MEMORY_X264 if low_memory else {'preset': 'slow'}))
+        else:
+            _run_with_encoder_fallback(run)
         
         return f"Advanced video denoising completed. Profile: {noise_profile}, Temporal consistency: {temporal_consistency}. Output saved to {output_video_path}"
         
@@ -332,14 +477,42 @@ def denoise_video_advanced(input_video_path: str, output_video_path: str,
         return f"An unexpected error occurred: {str(e)}"
 
 
+def _denoise_one(video_path: str, output_directory: str, denoise_settings: dict) -> tuple:
+    """Denoises one batch video into output_directory; returns (succeeded, result line)."""
+    error = _validate_input(video_path)
+    if error:
+        return False, f"FAILED: {video_path} - {error}"
+    
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    try:
+        # Generate output filename
+        output_path = os.path.join(output_directory, f"{video_name}_denoised.mp4")
+        
+        # Apply denoising
+        result = denoise_video(
+            input_video_path=video_path,
+            output_video_path=output_path,
+            **denoise_settings
+        )
+        
+        if "Error" not in result:
+            return True, f"SUCCESS: {video_name}"
+        return False, f"FAILED: {video_name} - {result}"
+            
+    except Exception as e:
+        return False, f"FAILED: {video_name} - {str(e)}"
+
+
 def batch_denoise_videos(video_list: list[str], output_directory: str,
-                        denoise_settings: dict) -> str:
+                        denoise_settings: dict, max_parallel: int = None) -> str:
     """Batch denoise multiple videos with the same settings.
     
     Args:
         video_list: List of paths to video files
         output_directory: Directory to save denoised videos
         denoise_settings: Dictionary with denoising parameters
+        max_parallel: Maximum number of videos denoised at once (default: one per
+            8 CPU cores). The ffmpeg thread budget is split between them.
     
     Returns:
         A status message indicating success or failure.
@@ -349,41 +522,23 @@ def batch_denoise_videos(video_list: list[str], output_directory: str,
     
     os.makedirs(output_directory, exist_ok=True)
     
-    results = []
-    successful = 0
-    failed = 0
+    # Each denoise is its own ffmpeg process, so worker threads only wait on subprocesses
+    workers = min(len(video_list), max_parallel or max(1, (os.cpu_count() or 4) // _DENOISE_THREADS_PER_JOB))
+    threads = _batch_threads(workers)
     
-    for video_path in video_list:
-        if not os.path.exists(video_path):
-            results.append(f"FAILED: {video_path} - file not found")
-            failed += 1
-            continue
-        
-        try:
-            # Generate output filename
-            video_name = os.path.splitext(os.path.basename(video_path))[0]
-            output_path = os.path.join(output_directory, f"{video_name}_denoised.mp4")
-            
-            # Apply denoising
-            result = denoise_video(
-                input_video_path=video_path,
-                output_video_path=output_path,
-                **denoise_settings
-            )
-            
-            if "Error" not in result:
-                results.append(f"SUCCESS: {video_name}")
-                successful += 1
-            else:
-                results.append(f"FAILED: {video_name} - {result}")
-                failed += 1
-                
-        except Exception as e:
-            results.append(f"FAILED: {video_name} - {str(e)}")
-            failed += 1
+    def run_one(video_path):
+        with _limit_ffmpeg_threads(threads):
+            return _denoise_one(video_path, output_directory, denoise_settings)
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outcomes = list(executor.map(run_one, video_list))
+    
+    results = [line for _, line in outcomes]
+    successful = sum(1 for succeeded, _ in outcomes if succeeded)
+    failed = len(outcomes) - successful
     
     summary = f"Batch denoising completed. Successful: {successful}, Failed: {failed}"
     if failed > 0:
         summary += f"\n\nDetails:\n" + "\n".join(results)
     
-    return summary
\ No newline at end of file
+    return summary
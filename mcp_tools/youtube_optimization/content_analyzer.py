@@ -1,8 +1,16 @@
 import os
+import re
 import json
 import tempfile
+import functools
+import subprocess
+import bisect
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple, Optional
 import ffmpeg
+from ..utils import _cached_probe, _thread_kwargs, _batch_threads, _limit_ffmpeg_threads
 
 # Optional imports with graceful fallback
 try:
@@ -14,10 +22,195 @@ except ImportError:
     cv2 = None
     np = None
 
+def _open_video(video_path: str):
+    """Opens video_path with OpenCV's FFmpeg backend, decoding on the GPU (VAAPI, NVDEC,
+    ...) when one is available and in software otherwise. Falls back to OpenCV's default
+    backend if the FFmpeg one can't open the file."""
+    cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG,
+                           [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+    if not cap.isOpened():
+        cap = cv2.VideoCapture(video_path)
+    return cap
+
+
+def _analysis_size(cap, analysis_width: Optional[int]) -> Tuple[int, int]:
+    """(width, height) cap's frames are analyzed at: downscaled to analysis_width pixels
+    wide, keeping the aspect ratio (full size if already narrower)."""
+    frame_width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+    frame_height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+    scale = analysis_width / frame_width if analysis_width and frame_width > analysis_width else 1.0
+    return max(1, round(frame_width * scale)), max(1, round(frame_height * scale))
+
+
+def _frame_times(video_path: str) -> List[float]:
+    """Presentation times of the video's frames in order, relative to the start of the
+    file, read from the packet timestamps without decoding."""
+    probe = ffmpeg.probe(video_path, select_streams='v:0', show_entries='packet=pts_time')
+    file_start = float(probe.get('format', {}).get('start_time', 0))
+    times = (float(packet['pts_time']) - file_start for packet in probe.get('packets', [])
+             if packet.get('pts_time', 'N/A') != 'N/A')
+    return sorted(frame_time for frame_time in times if frame_time >= 0)
+
+
+def _gray_frames(video_path: str, size: Tuple[int, int], start: int, end: Optional[int],
+                 step: int = 1, frame_times: Optional[List[float]] = None):
+    """Yields (frame index, grayscale frame) for every step-th frame in [start, end) (end
+    None for the end of the video); start must be a multiple of step.
+    
+    ffmpeg decodes the frames, area-downscales them to size and converts them to 8-bit
+    gray before piping them over, so full-size BGR frames are never built just to be
+    converted back to luma. A nonzero start needs the _frame_times of the video. Raises
+    ffmpeg.Error if ffmpeg fails before the frames are all read.
+    """
+    width, height = size
+    threads = _thread_kwargs()
+    input_kwargs = {'hwaccel': 'auto', 'threads': threads['threads']}
+    if start:
+        if start >= len(frame_times):
+            return
+        # Accurate seek to between the previous frame and this one, so the output starts
+        # exactly at frame `start` even with irregular timestamps
+        input_kwargs['ss'] = (frame_times[start - 1] + frame_times[start]) / 2
+    stream = ffmpeg.input(video_path, **input_kwargs).video
+    if step > 1:
+        stream = stream.filter('select', f'not(mod(n,{step}))')
+    stream = stream.filter('scale', width, height, flags='area')
+    output_kwargs = {'format': 'rawvideo', 'pix_fmt': 'gray', 'vsync': 'passthrough',
+                     'filter_threads': threads['filter_threads']}
+    if end is not None:
+        output_kwargs['frames:v'] = -(-(end - start) // step)
+    
+    frame_bytes = width * height
+    # stderr goes to a file rather than a pipe, so a chatty ffmpeg can't block on it
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(ffmpeg.output(stream, 'pipe:', **output_kwargs).compile(),
+                                   stdout=subprocess.PIPE, stderr=stderr)
+        finished = False
+        try:
+            frame_index = start
+            while True:
+                data = process.stdout.read(frame_bytes)
+                if len(data) < frame_bytes:
+                    finished = True
+                    break
+                yield frame_index, np.frombuffer(data, np.uint8).reshape(height, width)
+                frame_index += step
+        finally:
+            process.stdout.close()
+            if process.poll() is None and not finished:
+                # The caller stopped early; ffmpeg's exit status is meaningless after the kill
+                process.kill()
+            process.wait()
+        if process.returncode != 0:
+            stderr.seek(0)
+            raise ffmpeg.Error('ffmpeg', None, stderr.read())
+
+
+# Sampled frames sent to YOLO per call; batching amortizes the per-call overhead
+_YOLO_BATCH_SIZE = 16
+
+@functools.lru_cache(maxsize=1)
+def _yolo_model():
+    """The YOLOv8n detector, loaded once per process. Raises ImportError without ultralytics."""
+    from ultralytics import YOLO
+    return YOLO("yolov8n.pt")
+
+
+# Frames per analysis chunk below which a video isn't split further; smaller chunks
+# spend more on opening and seeking captures than they save
+_MIN_CHUNK_FRAMES = 300
+
+def _frame_chunks(total_frames: int, step: int = 1) -> List[Tuple[int, Optional[int]]]:
+    """Splits the frames into up to one (start, end) range per CPU core, starting on
+    multiples of step. The last range ends at None, the actual end of the video, since
+    CAP_PROP_FRAME_COUNT is only an estimate."""
+    chunks = max(1, min(os.cpu_count() or 1, total_frames // _MIN_CHUNK_FRAMES))
+    size = -(-total_frames // chunks)
+    size = max(step, -(-size // step) * step)
+    starts = list(range(0, max(total_frames, 1), size))
+    return list(zip(starts, starts[1:] + [None]))
+
+
+def _map_frame_chunks(video_path: str, total_frames: int, analyze, step: int = 1) -> list:
+    """Runs analyze(start, end, frame_times) over _frame_chunks concurrently and
+    concatenates the per-frame results in frame order.
+    
+    Each chunk decodes its frames with its own _gray_frames pipe. Threads suffice, since
+    the decoding happens in ffmpeg and OpenCV releases the GIL while filtering. The pipes
+    split the CPU between them rather than each starting a thread per core. The
+    _frame_times for seeking are only read when the video is split.
+    """
+    chunks = _frame_chunks(total_frames, step)
+    frame_times = _frame_times(video_path) if len(chunks) > 1 else None
+    threads = _batch_threads(len(chunks))
+    
+    def analyze_chunk(bounds):
+        # Set in the worker thread, since the limit is per-context
+        with _limit_ffmpeg_threads(threads):
+            return analyze(*bounds, frame_times)
+    
+    with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+        return [result for chunk in executor.map(analyze_chunk, chunks) for result in chunk]
+
+
+def _histogram_correlations(video_path: str, size: Tuple[int, int], start: int,
+                            end: Optional[int], frame_times: Optional[List[float]]) -> list:
+    """Correlation of each frame's grayscale histogram in [start, end) with the previous
+    frame's (None for the first frame of the video)."""
+    correlations = []
+    prev_hist = None
+    # Read one frame early for the first comparison
+    for frame_index, gray in _gray_frames(video_path, size, max(0, start - 1), end,
+                                          frame_times=frame_times):
+        # Only histograms are compared, so the previous frame's is kept rather than the frame
+        hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
+        if frame_index >= start:
+            # Pearson correlation ignores scale and offset, so the raw counts give the
+            # same value as min-max normalized ones
+            correlations.append(None if prev_hist is None else
+                                cv2.compareHist(hist, prev_hist, cv2.HISTCMP_CORREL))
+        prev_hist = hist
+    return correlations
+
+
+# Gradient magnitude (|gx| + |gy| of a 3x3 Sobel, 0-255) above which a pixel counts as edge
+_EDGE_MAGNITUDE = 64
+
+def _frame_statistics(video_path: str, size: Tuple[int, int], start: int, end: Optional[int],
+                      frame_stride: int, frame_times: Optional[List[float]]) -> list:
+    """(frame index, motion, edge density) for every frame_stride-th frame in [start, end).
+    
+    Motion is the mean absolute difference from the previous analyzed frame (0 for the
+    first frame of the video). Skipped frames are decoded but not scaled or converted.
+    """
+    statistics = []
+    prev_gray = None
+    # Read one analyzed frame early for motion
+    for frame_index, gray in _gray_frames(video_path, size, max(0, start - frame_stride),
+                                          end, frame_stride, frame_times):
+        if frame_index >= start:
+            # Calculate motion (mean absolute difference from the previous frame)
+            motion_score = 0
+            if prev_gray is not None:
+                motion_score = cv2.mean(cv2.absdiff(gray, prev_gray))[0]
+            
+            # Calculate visual complexity (edge density): the share of pixels whose
+            # Sobel gradient magnitude |gx| + |gy| exceeds _EDGE_MAGNITUDE
+            grad_x = cv2.convertScaleAbs(cv2.Sobel(gray, cv2.CV_16S, 1, 0, ksize=3))
+            grad_y = cv2.convertScaleAbs(cv2.Sobel(gray, cv2.CV_16S, 0, 1, ksize=3))
+            _, edges = cv2.threshold(cv2.add(grad_x, grad_y), _EDGE_MAGNITUDE, 255, cv2.THRESH_BINARY)
+            complexity_score = cv2.countNonZero(edges) / edges.size
+            
+            statistics.append((frame_index, motion_score, complexity_score))
+        prev_gray = gray
+    return statistics
+
+
 def detect_scene_changes(video_path: str, 
                         threshold: float = 0.3,
                         min_scene_length: float = 2.0,
-                        output_json: str = None) -> str:
+                        output_json: str = None,
+                        analysis_width: int = 480) -> str:
     """
     Detect scene changes in video for automatic chapter generation.
     
@@ -26,6 +219,8 @@ def detect_scene_changes(video_path: str,
         threshold: Scene change detection threshold (0.0-1.0)
         min_scene_length: Minimum scene length in seconds
         output_json: Path to save scene data as JSON
+        analysis_width: Width frames are downscaled to before comparing them (None for
+            full resolution); the histograms barely change, the pixel work drops sharply
     
     Returns:
         Scene detection results or error message
@@ -39,68 +234,52 @@ def detect_scene_changes(video_path: str,
     
     try:
         # Open video
-        cap = cv2.VideoCapture(video_path)
+        cap = _open_video(video_path)
         if not cap.isOpened():
             return f"Error: Could not open video file: {video_path}"
         
         fps = cap.get(cv2.CAP_PROP_FPS)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         duration = total_frames / fps
+        size = _analysis_size(cap, analysis_width)
+        cap.release()
+        
+        # Frame-to-frame histogram correlations, computed on chunks of the video in
+        # parallel; the scene boundaries are then found in one pass over them
+        correlations = _map_frame_chunks(
+            video_path, total_frames,
+            lambda start, end, frame_times: _histogram_correlations(video_path, size, start, end,
+                                                                    frame_times))
         
         # Scene detection
         scenes = []
-        prev_frame = None
         current_scene_start = 0.0
-        frame_count = 0
         
         # Calculate minimum frames for scene length
         min_frames = int(min_scene_length * fps)
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            current_time = frame_count / fps
-            
-            if prev_frame is not None:
-                # Convert frames to grayscale for comparison
-                gray_current = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                gray_prev = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
-                
-                # Calculate histogram difference
-                hist_current = cv2.calcHist([gray_current], [0], None, [256], [0, 256])
-                hist_prev = cv2.calcHist([gray_prev], [0], None, [256], [0, 256])
-                
-                # Normalize histograms
-                cv2.normalize(hist_current, hist_current, 0, 1, cv2.NORM_MINMAX)
-                cv2.normalize(hist_prev, hist_prev, 0, 1, cv2.NORM_MINMAX)
-                
-                # Calculate correlation coefficient
-                correlation = cv2.compareHist(hist_current, hist_prev, cv2.HISTCMP_CORREL)
+        # Scene change candidates: frames whose correlation is below threshold, found in
+        # one vectorized comparison (no correlation for the first frame, NaN never matches)
+        correlation_values = np.fromiter((np.nan if correlation is None else correlation
+                                          for correlation in correlations), float, len(correlations))
+        candidates = np.flatnonzero(correlation_values < (1 - threshold))
+        
+        for frame_count in candidates.tolist():
+            # Scene change detected if the current scene is long enough
+            if (frame_count - current_scene_start * fps) > min_frames:
+                # End current scene
+                current_time = frame_count / fps
+                scene_duration = current_time - current_scene_start
+                scenes.append({
+                    "start_time": current_scene_start,
+                    "end_time": current_time,
+                    "duration": scene_duration,
+                    "start_frame": int(current_scene_start * fps),
+                    "end_frame": frame_count
+                })
                 
-                # Scene change detected if correlation is below threshold
-                if correlation < (1 - threshold) and (frame_count - current_scene_start * fps) > min_frames:
-                    # End current scene
-                    scene_duration = current_time - current_scene_start
-                    scenes.append({
-                        "start_time": current_scene_start,
-                        "end_time": current_time,
-                        "duration": scene_duration,
-                        "start_frame": int(current_scene_start * fps),
-                        "end_frame": frame_count
-                    })
-                    
-                    # Start new scene
-                    current_scene_start = current_time
-            
-            prev_frame = frame.copy()
-            frame_count += 1
-            
-            # Progress indicator
-            if frame_count % 100 == 0:
-                progress = (frame_count / total_frames) * 100
-                print(f"Scene detection progress: {progress:.1f}%")
+                # Start new scene
+                current_scene_start = current_time
         
         # Add final scene
         if current_scene_start < duration:
@@ -112,8 +291,6 @@ def detect_scene_changes(video_path: str,
                 "end_frame": total_frames
             })
         
-        cap.release()
-        
         # Save results to JSON if requested
         if output_json:
             scene_data = {
@@ -164,22 +341,23 @@ def generate_youtube_chapters(video_path: str,
         
         # Load scene data if provided
         scenes = []
+        duration = None
         if scene_data_path and os.path.exists(scene_data_path):
             with open(scene_data_path, 'r') as f:
                 scene_data = json.load(f)
                 scenes = scene_data.get("scenes", [])
+                duration = scene_data.get("total_duration")
         
         # Load transcription for topic detection if provided
         transcription_segments = []
         if transcription_path and os.path.exists(transcription_path):
             transcription_segments = parse_transcription_file(transcription_path)
+        transcription_index = _index_transcription(transcription_segments)
         
-        # Get video duration
-        cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = total_frames / fps
-        cap.release()
+        # Get video duration: recorded with the scene data, else probed from the
+        # container header without opening a decoder
+        if duration is None:
+            duration = float(_cached_probe(video_path)['format']['duration'])
         
         if scenes:
             # Use scene-based chapters
@@ -195,7 +373,7 @@ def generate_youtube_chapters(video_path: str,
                     # Try to find a good title from transcription
                     chapter_title = f"Chapter {chapter_number}"
                     if transcription_segments:
-                        chapter_title = extract_chapter_title(transcription_segments, 
+                        chapter_title = extract_chapter_title(transcription_index, 
                                                             current_chapter_start, scene_end)
                     
                     chapters.append({
@@ -217,7 +395,7 @@ def generate_youtube_chapters(video_path: str,
                 chapter_title = f"Chapter {chapter_number}"
                 if transcription_segments:
                     end_time = min(current_time + chapter_interval, duration)
-                    chapter_title = extract_chapter_title(transcription_segments, 
+                    chapter_title = extract_chapter_title(transcription_index, 
                                                         current_time, end_time)
                 
                 chapters.append({
@@ -249,7 +427,9 @@ def generate_youtube_chapters(video_path: str,
 
 def analyze_content_density(video_path: str, 
                           window_size: float = 10.0,
-                          output_json: str = None) -> str:
+                          output_json: str = None,
+                          frame_stride: int = 1,
+                          analysis_width: int = 480) -> str:
     """
     Analyze content density to identify action vs. static segments.
     
@@ -257,6 +437,10 @@ def analyze_content_density(video_path: str,
         video_path: Path to input video
         window_size: Analysis window size in seconds
         output_json: Path to save analysis results
+        frame_stride: Analyze every Nth frame; skipped frames are decoded but not
+            converted or analyzed. Motion is then measured across N frames
+        analysis_width: Width frames are downscaled to before measuring motion and
+            edges (None for full resolution)
     
     Returns:
         Content density analysis results
@@ -270,106 +454,99 @@ def analyze_content_density(video_path: str,
     
     try:
         # Open video
-        cap = cv2.VideoCapture(video_path)
+        cap = _open_video(video_path)
         fps = cap.get(cv2.CAP_PROP_FPS)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         duration = total_frames / fps
         
         # Analysis parameters
-        window_frames = int(window_size * fps)
-        motion_scores = []
-        visual_complexity_scores = []
-        
-        frame_count = 0
-        prev_gray = None
-        window_motion = []
-        window_complexity = []
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            
-            # Calculate motion (optical flow magnitude)
-            motion_score = 0
-            if prev_gray is not None:
-                flow = cv2.calcOpticalFlowPyrLK(prev_gray, gray, 
-                                               corners=cv2.goodFeaturesToTrack(prev_gray, 100, 0.3, 7),
-                                               nextPts=None,
-                                               winSize=(15, 15), maxLevel=2)[0]
-                if flow is not None:
-                    motion_score = np.mean(np.linalg.norm(flow, axis=2))
-            
-            # Calculate visual complexity (edge density)
-            edges = cv2.Canny(gray, 50, 150)
-            complexity_score = np.sum(edges > 0) / (gray.shape[0] * gray.shape[1])
-            
+        size = _analysis_size(cap, analysis_width)
+        frame_stride = max(1, int(frame_stride))
+        window_frames = max(1, int(window_size * fps / frame_stride))
+        cap.release()
+        
+        # Per-frame motion and edge density, computed on chunks of the video in parallel
+        statistics = _map_frame_chunks(
+            video_path, total_frames,
+            lambda start, end, frame_times: _frame_statistics(video_path, size, start, end,
+                                                              frame_stride, frame_times),
+            step=frame_stride)
+        
+        # The last window_frames scores with their running sums, averaged once the
+        # window is full and again every half window after that
+        window_motion = deque(maxlen=window_frames)
+        window_complexity = deque(maxlen=window_frames)
+        motion_sum = complexity_sum = 0.0
+        emit_every = max(1, window_frames // 2)
+        
+        # Window timestamps and averages, filled in as arrays (the number of windows is
+        # known from the number of analyzed frames)
+        num_windows = max(0, (len(statistics) - window_frames) // emit_every + 1)
+        timestamps = np.empty(num_windows)
+        window_motion_scores = np.empty(num_windows)
+        window_complexity_scores = np.empty(num_windows)
+        window_index = 0
+        
+        for analyzed, (frame_count, motion_score, complexity_score) in enumerate(statistics, 1):
+            if len(window_motion) == window_frames:
+                motion_sum -= window_motion[0]
+                complexity_sum -= window_complexity[0]
             window_motion.append(motion_score)
             window_complexity.append(complexity_score)
+            motion_sum += motion_score
+            complexity_sum += complexity_score
             
             # Process window when full
-            if len(window_motion) >= window_frames:
-                avg_motion = np.mean(window_motion)
-                avg_complexity = np.mean(window_complexity)
-                
-                timestamp = frame_count / fps
-                motion_scores.append({
-                    "timestamp": timestamp,
-                    "motion_score": avg_motion,
-                    "complexity_score": avg_complexity,
-                    "combined_score": (avg_motion + avg_complexity) / 2
-                })
-                
-                # Slide window
-                window_motion = window_motion[window_frames//2:]
-                window_complexity = window_complexity[window_frames//2:]
-            
-            prev_gray = gray
-            frame_count += 1
-            
-            # Progress indicator
-            if frame_count % 100 == 0:
-                progress = (frame_count / total_frames) * 100
-                print(f"Content analysis progress: {progress:.1f}%")
-        
-        cap.release()
+            if analyzed >= window_frames and (analyzed - window_frames) % emit_every == 0:
+                timestamps[window_index] = frame_count / fps
+                window_motion_scores[window_index] = motion_sum / window_frames
+                window_complexity_scores[window_index] = complexity_sum / window_frames
+                window_index += 1
         
         # Analyze results
-        if motion_scores:
-            avg_motion = np.mean([s["motion_score"] for s in motion_scores])
-            avg_complexity = np.mean([s["complexity_score"] for s in motion_scores])
+        if num_windows:
+            avg_motion = window_motion_scores.mean()
+            avg_complexity = window_complexity_scores.mean()
             
             # Identify high-action segments
-            high_action_threshold = avg_motion + np.std([s["motion_score"] for s in motion_scores])
-            high_action_segments = [s for s in motion_scores if s["motion_score"] > high_action_threshold]
+            high_action_threshold = avg_motion + window_motion_scores.std()
+            high_action_segments = int(np.count_nonzero(window_motion_scores > high_action_threshold))
             
             # Identify visually complex segments
-            high_complexity_threshold = avg_complexity + np.std([s["complexity_score"] for s in motion_scores])
-            complex_segments = [s for s in motion_scores if s["complexity_score"] > high_complexity_threshold]
-            
-            analysis_results = {
-                "video_path": video_path,
-                "total_duration": duration,
-                "window_size": window_size,
-                "average_motion": avg_motion,
-                "average_complexity": avg_complexity,
-                "high_action_segments": len(high_action_segments),
-                "complex_segments": len(complex_segments),
-                "detailed_scores": motion_scores
-            }
+            high_complexity_threshold = avg_complexity + window_complexity_scores.std()
+            complex_segments = int(np.count_nonzero(window_complexity_scores > high_complexity_threshold))
             
             # Save results
             if output_json:
+                combined_scores = (window_motion_scores + window_complexity_scores) / 2
+                analysis_results = {
+                    "video_path": video_path,
+                    "total_duration": duration,
+                    "window_size": window_size,
+                    "average_motion": avg_motion,
+                    "average_complexity": avg_complexity,
+                    "high_action_segments": high_action_segments,
+                    "complex_segments": complex_segments,
+                    "detailed_scores": [
+                        {
+                            "timestamp": timestamp,
+                            "motion_score": motion_score,
+                            "complexity_score": complexity_score,
+                            "combined_score": combined_score
+                        }
+                        for timestamp, motion_score, complexity_score, combined_score in zip(
+                            timestamps.tolist(), window_motion_scores.tolist(),
+                            window_complexity_scores.tolist(), combined_scores.tolist())
+                    ]
+                }
                 with open(output_json, 'w') as f:
                     json.dump(analysis_results, f, indent=2)
             
             summary = f"Content density analysis complete"
             summary += f"\\nAverage motion score: {avg_motion:.3f}"
             summary += f"\\nAverage complexity score: {avg_complexity:.3f}"
-            summary += f"\\nHigh-action segments: {len(high_action_segments)}"
-            summary += f"\\nComplex segments: {len(complex_segments)}"
+            summary += f"\\nHigh-action segments: {high_action_segments}"
+            summary += f"\\nComplex segments: {complex_segments}"
             
             return summary
         
@@ -420,43 +597,51 @@ def extract_youtube_shorts(video_path: str,
         if use_content_analysis and CV2_AVAILABLE:
             # Analyze content to find interesting segments
             try:
-                from ultralytics import YOLO
-                model = YOLO("yolov8n.pt")
+                model = _yolo_model()
                 
                 # Sample frames and find high-activity periods
-                cap = cv2.VideoCapture(video_path)
+                cap = _open_video(video_path)
                 fps = cap.get(cv2.CAP_PROP_FPS)
                 
                 activity_scores = []
                 frame_count = 0
+                pending = []  # (timestamp, motion score, frame) awaiting object detection
                 
-                # Sample every second
+                def detect_pending():
+                    # Object detection for activity score, one model call per batch
+                    results = model([frame for _, _, frame in pending], conf=0.3)
+                    for (timestamp, motion_score, _), result in zip(pending, results):
+                        num_objects = len(result.boxes) if result.boxes else 0
+                        activity_score = num_objects * 10 + motion_score / 1000
+                        activity_scores.append({
+                            "timestamp": timestamp,
+                            "score": activity_score
+                        })
+                    pending.clear()
+                
+                # Sample every second. The frames in between are only grabbed, skipping
+                # their conversion and copy out of the decoder
                 sample_interval = int(fps)
                 
-                while True:
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-                    
+                while cap.grab():
                     if frame_count % sample_interval == 0:
-                        timestamp = frame_count / fps
-                        
-                        # Object detection for activity score
-                        results = model(frame, conf=0.3)
-                        num_objects = len(results[0].boxes) if results[0].boxes else 0
+                        ret, frame = cap.retrieve()
+                        if not ret:
+                            break
                         
-                        # Motion estimation (simple approach)
+                        # Motion estimation (simple approach): variance of the Laplacian.
+                        # Its values fit in 16 bits, and meanStdDev accumulates in double
                         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                        motion_score = cv2.Laplacian(gray, cv2.CV_64F).var()
+                        motion_score = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S))[1][0, 0] ** 2
                         
-                        activity_score = num_objects * 10 + motion_score / 1000
-                        activity_scores.append({
-                            "timestamp": timestamp,
-                            "score": activity_score
-                        })
+                        pending.append((frame_count / fps, motion_score, frame))
+                        if len(pending) >= _YOLO_BATCH_SIZE:
+                            detect_pending()
                     
                     frame_count += 1
                 
+                if pending:
+                    detect_pending()
                 cap.release()
                 
                 # Find peak activity periods
@@ -464,35 +649,35 @@ def extract_youtube_shorts(video_path: str,
                     # Sort by activity score
                     activity_scores.sort(key=lambda x: x["score"], reverse=True)
                     
-                    # Select top segments, ensuring they don't overlap
-                    selected_times = []
-                    for score_data in activity_scores:
+                    # Select top segments, ensuring they don't overlap: each selection
+                    # masks out every candidate within max_duration of its start in one
+                    # vectorized comparison, and the scan jumps to the next unmasked one
+                    timestamps = np.array([score_data["timestamp"] for score_data in activity_scores])
+                    available = np.ones(len(timestamps), dtype=bool)
+                    candidate = 0
+                    
+                    # Limit number of shorts
+                    while len(segments) < 3:
+                        remaining = np.flatnonzero(available[candidate:])
+                        if not remaining.size:
+                            break
+                        candidate += int(remaining[0])
+                        score_data = activity_scores[candidate]
                         timestamp = score_data["timestamp"]
                         
-                        # Check if this segment overlaps with existing selections
-                        overlap = False
-                        for selected_start in selected_times:
-                            if abs(timestamp - selected_start) < max_duration:
-                                overlap = True
-                                break
+                        # Ensure segment fits within video duration
+                        start_time = max(0, timestamp - max_duration / 2)
+                        end_time = min(duration, start_time + max_duration)
+                        start_time = end_time - max_duration  # Adjust start if needed
                         
-                        if not overlap:
-                            # Ensure segment fits within video duration
-                            start_time = max(0, timestamp - max_duration / 2)
-                            end_time = min(duration, start_time + max_duration)
-                            start_time = end_time - max_duration  # Adjust start if needed
-                            
-                            if start_time >= 0:
-                                segments.append({
-                                    "start": start_time,
-                                    "duration": max_duration,
-                                    "score": score_data["score"]
-                                })
-                                selected_times.append(start_time)
-                            
-                            # Limit number of shorts
-                            if len(segments) >= 3:
-                                break
+                        if start_time >= 0:
+                            segments.append({
+                                "start": start_time,
+                                "duration": max_duration,
+                                "score": score_data["score"]
+                            })
+                            available &= np.abs(timestamps - start_time) >= max_duration
+                        candidate += 1
                 
             except ImportError:
                 # Fallback to simple time-based extraction
@@ -515,9 +700,13 @@ def extract_youtube_shorts(video_path: str,
                         "score": 0
                     })
         
-        # Create Shorts from segments
-        created_shorts = []
-        for i, segment in enumerate(segments):
+        # Create Shorts from segments. Each encode is its own ffmpeg process, so they run
+        # concurrently with the thread budget split between them
+        workers = max(1, min(len(segments), (os.cpu_count() or 2) // 2))
+        threads = _batch_threads(workers)
+        
+        def encode_short(job):
+            i, segment = job
             short_path = os.path.join(output_directory, f"short_{i+1:02d}.mp4")
             
             # Extract segment
@@ -527,13 +716,11 @@ def extract_youtube_shorts(video_path: str,
             if target_aspect == "9:16":
                 # Portrait mode for Shorts
                 if width > height:
-                    # Landscape to portrait - crop to center square then letterbox
-                    crop_size = min(width, height)
-                    video_stream = input_stream.video.filter('crop', crop_size, crop_size, 
-                                                           (width - crop_size) // 2, 0)
-                    # Scale to 1080x1920 for 9:16
-                    video_stream = video_stream.filter('scale', 1080, 1920, force_original_aspect_ratio='increase')
-                    video_stream = video_stream.filter('crop', 1080, 1920)
+                    # Landscape to portrait - crop the centered 9:16 window, then scale
+                    # only those pixels up to 1080x1920 (square pixels, as the rounded
+                    # crop width would otherwise leave a slightly non-square SAR)
+                    video_stream = input_stream.video.filter('crop', 'ih*9/16', 'ih')
+                    video_stream = video_stream.filter('scale', 1080, 1920).filter('setsar', 1)
                 else:
                     # Already portrait or square
                     video_stream = input_stream.video.filter('scale', 1080, 1920, force_original_aspect_ratio='decrease')
@@ -542,12 +729,16 @@ def extract_youtube_shorts(video_path: str,
                 video_stream = input_stream.video
             
             # Output
-            output = ffmpeg.output(video_stream, input_stream.audio, short_path,
-                                 vcodec='libx264', acodec='aac',
-                                 preset='medium', crf=18)
+            with _limit_ffmpeg_threads(threads):
+                output = ffmpeg.output(video_stream, input_stream.audio, short_path,
+                                     vcodec='libx264', acodec='aac',
+                                     preset='medium', crf=18, **_thread_kwargs('libx264'))
             
             ffmpeg.run(output, overwrite_output=True, quiet=True)
-            created_shorts.append(short_path)
+            return short_path
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            created_shorts = list(executor.map(encode_short, enumerate(segments)))
         
         return f"Successfully created {len(created_shorts)} YouTube Shorts in {output_directory}"
         
@@ -555,6 +746,15 @@ def extract_youtube_shorts(video_path: str,
         return f"Error extracting YouTube Shorts: {str(e)}"
 
 
+# An SRT block: index line, "HH:MM:SS,mmm --> HH:MM:SS,mmm" line (anything after the end
+# time, e.g. position hints, is ignored), then the text up to the next blank line
+_SRT_BLOCK = re.compile(
+    r'^\d+[ \t]*\r?\n'
+    r'(\d+):(\d\d):(\d\d),(\d{3}) --> (\d+):(\d\d):(\d\d),(\d{3})[^\n]*\n'
+    r'(.+?)(?=\n[ \t\r]*\n|\Z)',
+    re.MULTILINE | re.DOTALL)
+
+
 def parse_transcription_file(file_path: str) -> List[Dict]:
     """Parse transcription file (SRT, VTT, or JSON) into segments."""
     segments = []
@@ -569,25 +769,14 @@ def parse_transcription_file(file_path: str) -> List[Dict]:
         elif file_path.endswith('.srt'):
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
-                # Simple SRT parsing
-                blocks = content.strip().split('\\n\\n')
-                for block in blocks:
-                    lines = block.strip().split('\\n')
-                    if len(lines) >= 3:
-                        time_line = lines[1]
-                        text = ' '.join(lines[2:])
-                        
-                        # Parse timestamp
-                        if ' --> ' in time_line:
-                            start_str, end_str = time_line.split(' --> ')
-                            start_time = parse_srt_timestamp(start_str)
-                            end_time = parse_srt_timestamp(end_str)
-                            
-                            segments.append({
-                                'start': start_time,
-                                'end': end_time,
-                                'text': text
-                            })
+                # One regex match per SRT block
+                for match in _SRT_BLOCK.finditer(content):
+                    sh, sm, ss, sms, eh, em, es, ems = map(int, match.group(1, 2, 3, 4, 5, 6, 7, 8))
+                    segments.append({
+                        'start': sh * 3600 + sm * 60 + ss + sms / 1000,
+                        'end': eh * 3600 + em * 60 + es + ems / 1000,
+                        'text': ' '.join(match.group(9).strip().splitlines())
+                    })
         
     except Exception as e:
         print(f"Error parsing transcription file: {e}")
@@ -595,23 +784,29 @@ def parse_transcription_file(file_path: str) -> List[Dict]:
     return segments
 
 
-def parse_srt_timestamp(timestamp_str: str) -> float:
-    """Parse SRT timestamp to seconds."""
-    # Format: HH:MM:SS,mmm
-    time_part, ms_part = timestamp_str.strip().split(',')
-    h, m, s = map(int, time_part.split(':'))
-    ms = int(ms_part)
+def _index_transcription(transcription_segments: List[Dict]) -> Tuple[List[Dict], List[float], List[float]]:
+    """Sorts segments by start time for extract_chapter_title's binary search.
     
-    return h * 3600 + m * 60 + s + ms / 1000
+    Returns (segments, their start times, running maximum of their end times). The
+    running maximum stays sorted even when segments overlap.
+    """
+    segments = sorted(transcription_segments, key=lambda segment: segment.get('start', 0))
+    starts = [segment.get('start', 0) for segment in segments]
+    max_ends = list(itertools.accumulate((segment.get('end', start) for segment, start in zip(segments, starts)), max))
+    return segments, starts, max_ends
 
 
-def extract_chapter_title(transcription_segments: List[Dict], 
+def extract_chapter_title(transcription_index: Tuple[List[Dict], List[float], List[float]], 
                          start_time: float, end_time: float) -> str:
-    """Extract a meaningful chapter title from transcription."""
-    # Find transcription segments in this time range
+    """Extract a meaningful chapter title from transcription (indexed by _index_transcription)."""
+    # Find transcription segments in this time range: those before `first` end before
+    # the chapter starts, those from `last` on start after it ends
+    segments, starts, max_ends = transcription_index
+    first = bisect.bisect_left(max_ends, start_time)
+    last = bisect.bisect_right(starts, end_time)
     relevant_text = []
     
-    for segment in transcription_segments:
+    for segment in segments[first:last]:
         seg_start = segment.get('start', 0)
         seg_end = segment.get('end', seg_start)
         
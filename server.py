@@ -10,9 +10,10 @@ def health_check() -> str:
     """Returns a simple health status to confirm the server is running."""
     return "Server is healthy!"
 
-# Register all the tools from the mcp_tools package
+# Register all the tools from the mcp_tools package (what @mcp.tool() does, without
+# building a decorator per tool)
 for tool in ALL_TOOLS:
-    mcp.tool()(tool)
+    mcp.add_tool(tool)
 
 # Main execution block to run the server
 if __name__ == "__main__":
@@ -9,9 +9,9 @@ import math
 # Add the parent directory to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Import the mcp server functions from server.py
-from server import (
-    health_check,
+# Import the mcp server's health check from server.py and the tools it registers from mcp_tools
+from server import health_check
+from mcp_tools import (
     extract_audio_from_video,
     trim_video,
     convert_audio_properties,
@@ -38,8 +38,15 @@ from server import (
     remove_silence,
     add_b_roll,
     add_basic_transitions,
-    _parse_time_to_seconds
+    create_motion_graphics_stack,
+    apply_chroma_key,
+    apply_video_morphing,
+    create_chained_pip,
+    create_pip_batch,
+    batch_convert_video_format,
+    batch_set_video_frame_rate
 )
+from mcp_tools.utils import _parse_time_to_seconds, _cached_probe, _pick_encoder
 
 # Path to the sample video file
 SAMPLE_VIDEO = os.path.join(os.path.dirname(__file__), "sample.mp4")
@@ -107,6 +114,15 @@ def get_media_duration(file_path):
         print("Error: ffprobe command not found. Please ensure FFmpeg (and ffprobe) is installed and in your PATH.")
         return 0
 
+def get_frame_pixel(file_path, x, y, time=0.5):
+    """Gets the (r, g, b) value of one pixel of the frame shown at `time` seconds."""
+    frame, _ = (ffmpeg.input(file_path, ss=time)
+                .output('pipe:', vframes=1, format='rawvideo', pix_fmt='rgb24')
+                .run(capture_stdout=True, capture_stderr=True))
+    width = next(s for s in ffmpeg.probe(file_path)['streams'] if s['codec_type'] == 'video')['width']
+    offset = (y * width + x) * 3
+    return tuple(frame[offset:offset + 3])
+
 def setup_module(module):
     """Setup for the test module - create output directory and sample files"""
     os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -729,6 +745,170 @@ def test_concatenate_videos_with_xfade():
     assert "error" in result4.lower() and "exactly two videos" in result4.lower(), "Test 4 FAILED: Did not error with too many videos"
     print("  Test 4: PASSED")
 
+# --- Tests for effects and batch tools ---
+def test_create_motion_graphics_stack():
+    """Test stacking two motion graphics overlays in one render"""
+    input_video = os.path.join(SAMPLE_FILES_DIR, "short_video1.mp4")
+    output_path = os.path.join(OUTPUT_DIR, "motion_graphics_stack.mp4")
+    specs = [
+        {'graphics_type': 'progress_bar', 'start_time': 0.0, 'duration': 3.0},
+        {'graphics_type': 'geometric_shapes', 'start_time': 1.0, 'duration': 2.0}
+    ]
+    result = create_motion_graphics_stack(input_video, output_path, specs, draft=True)
+    print(f"Motion graphics stack result: {result}")
+    assert "successfully" in result
+    assert os.path.exists(output_path)
+
+    probe = ffmpeg.probe(output_path)
+    video_stream = next(s for s in probe['streams'] if s['codec_type'] == 'video')
+    assert (video_stream['width'], video_stream['height']) == (640, 360)
+    assert math.isclose(get_media_duration(output_path), get_media_duration(input_video), abs_tol=0.1)
+
+    # A spec that is not a dictionary is rejected before rendering
+    result_invalid = create_motion_graphics_stack(input_video, output_path, ['progress_bar'])
+    assert "Error" in result_invalid and "dictionary" in result_invalid
+
+def test_apply_chroma_key():
+    """Test keying a green screen over a background with each spill/softening path"""
+    foreground = os.path.join(SAMPLE_FILES_DIR, "short_video1.mp4")
+    background = os.path.join(SAMPLE_FILES_DIR, "broll1.mp4")
+    for name, kwargs in [("default", {}),
+                         ("legacy_softening", {'custom_params': {'legacy_softening': True}}),
+                         ("pipelined", {'pipelined': True})]:
+        output_path = os.path.join(OUTPUT_DIR, f"chroma_key_{name}.mp4")
+        result = apply_chroma_key(foreground, background, output_path, key_color="green", **kwargs)
+        print(f"Chroma key ({name}) result: {result}")
+        assert "Chroma key applied successfully" in result
+        assert os.path.exists(output_path)
+
+        # The all-green foreground is keyed out entirely, leaving the red background
+        frame, _ = (ffmpeg.input(output_path)
+                    .output('pipe:', vframes=1, format='rawvideo', pix_fmt='rgb24')
+                    .run(capture_stdout=True, capture_stderr=True))
+        red, green, blue = frame[0], frame[1], frame[2]
+        assert red > 200 and green < 50 and blue < 50
+
+def test_apply_video_morphing_segments():
+    """Test crossfading four clips, which renders each crossfade as its own segment"""
+    clips = [os.path.join(SAMPLE_FILES_DIR, name)
+             for name in ["short_video1.mp4", "short_video2.mp4", "broll1.mp4", "broll2.mp4"]]
+    output_path = os.path.join(OUTPUT_DIR, "morph_segments.mp4")
+    result = apply_video_morphing(clips, output_path, morph_type="smooth", morph_duration=1.0)
+    print(f"Video morphing result: {result}")
+    assert "applied successfully" in result
+    assert os.path.exists(output_path)
+
+    # Clips play back to back with each of the three crossfades overlapping a second
+    expected_duration = sum(get_media_duration(clip) for clip in clips) - 3 * 1.0
+    assert math.isclose(get_media_duration(output_path), expected_duration, abs_tol=0.1)
+
+def test_create_chained_pip():
+    """Test applying two PiP stages in one piped render"""
+    main_video = os.path.join(SAMPLE_FILES_DIR, "main_video.mp4")
+    stages = [
+        {'overlay_path': os.path.join(SAMPLE_FILES_DIR, "broll1.mp4"), 'position': 'top_right'},
+        {'overlay_path': os.path.join(SAMPLE_FILES_DIR, "broll2.mp4"), 'position': 'bottom_left'}
+    ]
+    output_path = os.path.join(OUTPUT_DIR, "chained_pip.mp4")
+    result = create_chained_pip(main_video, stages, output_path)
+    print(f"Chained PiP result: {result}")
+    assert "created successfully with 2 stages" in result
+    assert os.path.exists(output_path)
+    assert math.isclose(get_media_duration(output_path), get_media_duration(main_video), abs_tol=0.1)
+
+    # 25% overlays (160x90) with a 20px margin on the black 640x360 main video
+    red, green, blue = get_frame_pixel(output_path, 540, 65)
+    assert red > 200 and green < 50 and blue < 50
+    red, green, blue = get_frame_pixel(output_path, 100, 295)
+    assert blue > 200 and red < 50 and green < 50
+    assert max(get_frame_pixel(output_path, 320, 180)) < 30
+
+def test_create_pip_batch():
+    """Test rendering two animated PiP presets of one clip pair in a single run"""
+    main_video = os.path.join(SAMPLE_FILES_DIR, "main_video.mp4")
+    overlay_video = os.path.join(SAMPLE_FILES_DIR, "short_video1.mp4")
+    output_paths = [os.path.join(OUTPUT_DIR, "pip_batch_fade.mp4"),
+                    os.path.join(OUTPUT_DIR, "pip_batch_bounce.mp4")]
+    result = create_pip_batch(main_video, overlay_video, output_paths, ['fade_in_out', 'bounce_in'])
+    print(f"PiP batch result: {result}")
+    assert "Batch picture-in-picture created successfully for 2 presets" in result
+    for output_path in output_paths:
+        assert os.path.exists(output_path)
+        assert math.isclose(get_media_duration(output_path), get_media_duration(main_video), abs_tol=0.1)
+
+    # fade_in_out puts the green overlay top left, bounce_in top right; each output has only its own
+    assert get_frame_pixel(output_paths[0], 100, 65, time=4)[1] > 100
+    assert get_frame_pixel(output_paths[0], 556, 56, time=4)[1] < 30
+    assert get_frame_pixel(output_paths[1], 556, 56, time=4)[1] > 100
+    assert get_frame_pixel(output_paths[1], 100, 65, time=4)[1] < 30
+
+    result_mismatch = create_pip_batch(main_video, overlay_video, output_paths[:1], ['fade_in_out', 'bounce_in'])
+    assert "Error" in result_mismatch
+
+def test_cached_probe_invalidation():
+    """Test that _cached_probe reuses a probe until the file is rewritten"""
+    probe_path = os.path.join(OUTPUT_DIR, "cached_probe.mp4")
+    shutil.copy(os.path.join(SAMPLE_FILES_DIR, "short_video1.mp4"), probe_path)
+    first = _cached_probe(probe_path)
+    assert _cached_probe(probe_path) is first
+    assert math.isclose(float(first['format']['duration']), 5.0, abs_tol=0.1)
+
+    # A rewritten file has a new size and mtime, so it is probed again
+    assert _run_ffmpeg_command(["-y", "-f", "lavfi", "-i", "color=c=red:s=320x180:r=30:d=2",
+                                "-c:v", "libx264", "-pix_fmt", "yuv420p", probe_path])
+    second = _cached_probe(probe_path)
+    assert second is not first
+    assert math.isclose(float(second['format']['duration']), 2.0, abs_tol=0.1)
+    assert second['streams'][0]['width'] == 320
+
+def test_batch_video_tools():
+    """Test the batch_* tools on two clips at once"""
+    clips = [os.path.join(SAMPLE_FILES_DIR, "short_video1.mp4"), os.path.join(SAMPLE_FILES_DIR, "broll1.mp4")]
+
+    rate_outputs = [os.path.join(OUTPUT_DIR, "batch_rate_1.mp4"), os.path.join(OUTPUT_DIR, "batch_rate_2.mp4")]
+    results = batch_set_video_frame_rate(clips, rate_outputs, 24, max_concurrent=2)
+    print(f"Batch frame rate results: {results}")
+    assert len(results) == 2
+    for clip, output_path, result in zip(clips, rate_outputs, results):
+        assert "Error" not in result
+        video_stream = next(s for s in ffmpeg.probe(output_path)['streams'] if s['codec_type'] == 'video')
+        assert video_stream['avg_frame_rate'] == "24/1"
+        assert math.isclose(get_media_duration(output_path), get_media_duration(clip), abs_tol=0.1)
+
+    format_outputs = [os.path.join(OUTPUT_DIR, "batch_format_1.mov"), os.path.join(OUTPUT_DIR, "batch_format_2.mov")]
+    results = batch_convert_video_format(clips, format_outputs, "mov")
+    print(f"Batch format results: {results}")
+    for clip, output_path, result in zip(clips, format_outputs, results):
+        assert "Error" not in result
+        assert math.isclose(get_media_duration(output_path), get_media_duration(clip), abs_tol=0.1)
+
+    # Every input needs its own output path
+    results = batch_set_video_frame_rate(clips, rate_outputs[:1], 24)
+    assert len(results) == 1 and "Error" in results[0]
+
+def test_change_aspect_ratio_quality_profile():
+    """Test that quality_profile selects the encoder settings of a re-encode"""
+    source_path = os.path.join(OUTPUT_DIR, "quality_profile_source.mp4")
+    assert _run_ffmpeg_command(["-y", "-f", "lavfi", "-i", "testsrc2=s=320x180:r=30:d=2",
+                                "-c:v", "libx264", "-pix_fmt", "yuv420p", source_path])
+    # libx264 records its settings in the stream, so the profile's CRF shows up in the file
+    # (hardware encoders, when present, are only checked for a valid output)
+    for profile, crf in (("archive", b"crf=18.0"), ("preview", b"crf=28.0")):
+        output_path = os.path.join(OUTPUT_DIR, f"quality_profile_{profile}.mp4")
+        result = change_aspect_ratio(source_path, output_path, "4:3", resize_mode="crop", quality_profile=profile)
+        print(f"Aspect ratio ({profile}) result: {result}")
+        assert "Video aspect ratio changed" in result
+        video_stream = next(s for s in ffmpeg.probe(output_path)['streams'] if s['codec_type'] == 'video')
+        assert (video_stream['width'], video_stream['height']) == (240, 180)
+        assert math.isclose(get_media_duration(output_path), 2.0, abs_tol=0.1)
+        if _pick_encoder() == 'libx264':
+            with open(output_path, 'rb') as output_file:
+                assert crf in output_file.read()
+
+    result_invalid = change_aspect_ratio(source_path, os.path.join(OUTPUT_DIR, "quality_profile_bad.mp4"),
+                                         "4:3", quality_profile="best")
+    assert "Invalid quality_profile" in result_invalid
+
 if __name__ == "__main__":
     print("Running video function tests...")
     test_health_check()
@@ -761,4 +941,12 @@ if __name__ == "__main__":
     test_add_b_roll()
     test_add_basic_transitions()
     test_concatenate_videos_with_xfade()
+    test_create_motion_graphics_stack()
+    test_apply_chroma_key()
+    test_apply_video_morphing_segments()
+    test_create_chained_pip()
+    test_create_pip_batch()
+    test_cached_probe_invalidation()
+    test_batch_video_tools()
+    test_change_aspect_ratio_quality_profile()
     print("All tests completed!") 
\ No newline at end of file